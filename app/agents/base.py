@@ -1,9 +1,10 @@
+import asyncio
+import dataclasses
 import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from claude_agent_sdk import (
-    query,
     ClaudeAgentOptions,
     AssistantMessage,
     ResultMessage,
@@ -14,8 +15,16 @@ from claude_agent_sdk import (
     ThinkingBlock,
 )
 
+from app.config import DATA_DIR
 from app.core.logging import TaskLogger
+from app.core.task_queue import TaskFailedError
 from app.core.task_registry import task_registry
+from app.services.disk_cache import DiskLRUCache
+from app.services.session_pool import session_pool
+
+# 已完成任务的结果缓存（按 Agent + 规范化输入寻址）
+RESULT_CACHE_MAX_BYTES = 100 * 1024 * 1024
+result_cache = DiskLRUCache(DATA_DIR / "result_cache", max_bytes=RESULT_CACHE_MAX_BYTES)
 
 
 class BaseAgent(ABC):
@@ -24,9 +33,19 @@ class BaseAgent(ABC):
     # 子类必须定义模块名称
     MODULE_NAME: str = ""
 
+    # 结果缓存有效期（秒），0 表示不使用结果缓存
+    RESULT_CACHE_TTL: float = 0
+    # 命中结果缓存时的处理方式: link（复用已有 Notion 页面）| republish（用缓存内容重新发布）
+    RESULT_CACHE_MODE: str = "link"
+
     def __init__(self):
         if not self.MODULE_NAME:
             raise ValueError("子类必须定义 MODULE_NAME")
+        self.task_id: str = ""
+        # 子类写入 Notion 后设置，任务结束时记录到 TaskRegistry
+        self.notion_page_url: str | None = None
+        # 子类写入 Notion 的文档（{"title", "blocks"}），任务成功后写入结果缓存
+        self.result_document: dict | None = None
 
     @abstractmethod
     def get_prompt(self, **kwargs) -> str:
@@ -38,6 +57,55 @@ class BaseAgent(ABC):
         """获取 Agent 配置选项"""
         pass
 
+    def use_session_pool(self) -> bool:
+        """
+        是否使用会话池中预启动的 CLI 进程（子类可覆盖）
+
+        只有 get_options() 与具体任务无关（同一 Agent 的每个任务配置相同）时才能复用会话，
+        默认不使用。
+        """
+        return False
+
+    def warm_session_pool(self) -> None:
+        """
+        按 run() 使用的配置在后台预启动会话（不使用会话池的 Agent 不做处理）
+
+        需在配置中的 MCP 服务器就绪后调用，否则配置 key 与任务运行时不同，预启动的会话不会被使用。
+        """
+        if self.use_session_pool():
+            session_pool.warm(self.get_options())
+
+    def get_direct_task(self, **kwargs) -> Optional[str]:
+        """
+        直接执行模式的任务描述（子类可覆盖）
+
+        get_options() 只注册了一个 subagent、且 Python 已确定要调用它时，顶层模型只是转发调用和结果。
+        返回交给该 subagent 的任务描述后，run() 跳过顶层分发模型，
+        以该 subagent 的 prompt、工具和模型直接执行（保留 output_format）。
+        返回 None 表示使用分发模式。
+
+        Args:
+            **kwargs: 传递给 get_prompt() 的参数
+        """
+        return None
+
+    def get_direct_options(self, options: ClaudeAgentOptions) -> ClaudeAgentOptions:
+        """
+        将只注册了一个 subagent 的分发配置转换为直接执行该 subagent 的配置（子类可覆盖以调整参数）
+
+        subagent 的 prompt 作为 system prompt；只启用其声明的工具（内置工具和 MCP 工具）。
+        """
+        (agent,) = options.agents.values()
+        tools = list(agent.tools or [])
+        return dataclasses.replace(
+            options,
+            model=options.model if agent.model in (None, "inherit") else agent.model,
+            system_prompt=agent.prompt,
+            tools=[t for t in tools if not t.startswith("mcp__")],
+            allowed_tools=tools,
+            agents=None,
+        )
+
     def get_input_data(self, **kwargs) -> Dict[str, Any]:
         """获取用于日志记录的输入数据"""
         return kwargs
@@ -81,38 +149,138 @@ class BaseAgent(ABC):
         """
         return {}
 
-    async def run(self, **kwargs) -> None:
+    async def post_run(self, logger) -> None:
+        """
+        运行结束后的清理钩子（子类可覆盖）
+
+        无论成功或失败都会调用，可用于释放 pre_run 中创建的资源。
+
+        Args:
+            logger: TaskLogger 实例
+        """
+        pass
+
+    @staticmethod
+    def get_prompt_bytes(prompt: str, options: ClaudeAgentOptions) -> int:
+        """
+        计算发送给模型的 prompt 总字节数（主 prompt、system prompt 和所有 subagent prompt）
+
+        按任务记录到 TaskRegistry，便于发现 prompt 体积的回归。
+        """
+        total = len(prompt.encode("utf-8"))
+        if isinstance(options.system_prompt, str):
+            total += len(options.system_prompt.encode("utf-8"))
+        for agent in (options.agents or {}).values():
+            total += len(agent.prompt.encode("utf-8"))
+        return total
+
+    def get_result_cache_key(self, **kwargs) -> Optional[str]:
+        """
+        获取结果缓存 key（子类可覆盖）
+
+        相同 key 的任务在有效期内直接复用上次的结果，返回 None 表示不缓存。
+
+        Args:
+            **kwargs: 传递给 run() 的参数
+        """
+        return None
+
+    async def republish(self, document: dict) -> None:
+        """
+        用缓存的文档重新发布到 Notion（RESULT_CACHE_MODE 为 republish 时调用，子类可覆盖）
+
+        未覆盖时不支持重新发布，命中缓存时回退到 link 模式。
+
+        Args:
+            document: 上次任务写入 Notion 的文档
+        """
+        pass
+
+    def supports_republish(self) -> bool:
+        """子类是否实现了 republish()"""
+        return type(self).republish is not BaseAgent.republish
+
+    async def _reuse_cached_result(self, cached: dict, logger) -> bool:
+        """
+        复用缓存的结果
+
+        Returns:
+            是否成功复用（失败时回退到正常执行）
+        """
+        logger.info(f"命中结果缓存（来源任务 {cached.get('task_id')}），跳过 LLM 执行")
+        republish = self.RESULT_CACHE_MODE == "republish"
+        if republish and not self.supports_republish():
+            logger.warning(f"{self.MODULE_NAME} 未实现 republish，改为复用已有 Notion 页面")
+            republish = False
+        if republish:
+            try:
+                await self.republish(cached["document"])
+            except Exception as e:
+                logger.warning(f"重新发布缓存结果失败，回退到正常执行: {e}")
+                return False
+        else:
+            self.notion_page_url = cached.get("notion_url")
+        return True
+
+    async def run(self, task_id: str | None = None, force_refresh: bool = False, **kwargs) -> None:
         """
         执行 Agent 任务
 
         Args:
+            task_id: 任务 ID（由路由生成并经任务队列传入；为空时自动生成）
+            force_refresh: 为 True 时忽略结果缓存，重新执行
             **kwargs: 传递给 get_prompt() 的参数
+
+        Raises:
+            TaskFailedError: 执行失败（任务日志和 task_registry 已记录失败状态）
         """
-        # 生成任务 ID
-        task_id = task_registry.generate_id(self.MODULE_NAME)
+        if not task_id:
+            task_id = task_registry.generate_id(self.MODULE_NAME)
+        self.task_id = task_id
 
         # 创建任务日志记录器
         input_data = self.get_input_data(**kwargs)
         logger = TaskLogger(task_id, input_data)
-
-        # 调用预处理钩子，合并返回的额外参数
-        extra_kwargs = await self.pre_run(logger, **kwargs)
-        prompt_kwargs = {**kwargs, **extra_kwargs}
-
-        prompt = self.get_prompt(**prompt_kwargs)
-        options = self.get_options()
-
-        # 记录用户 Prompt
-        logger.log_user_prompt(prompt)
+        await asyncio.to_thread(task_registry.mark_running, task_id, self.MODULE_NAME, input_data)
+
+        # 有效期内的结果缓存直接复用
+        cache_key = self.get_result_cache_key(**kwargs) if self.RESULT_CACHE_TTL > 0 else None
+        if cache_key and not force_refresh:
+            cached = await asyncio.to_thread(result_cache.get, cache_key, self.RESULT_CACHE_TTL)
+            if cached is not None and await self._reuse_cached_result(cached, logger):
+                logger.finish(success=True, num_turns=0, cost_usd=0.0)
+                await asyncio.to_thread(
+                    task_registry.finish, task_id, success=True, notion_url=self.notion_page_url
+                )
+                return
 
         tool_start_times: Dict[str, float] = {}  # tool_use_id -> start_time
         num_turns = 0
         cost_usd = 0.0
         structured_output = None  # 结构化输出（使用 output_format 时）
         messages_collected = []  # 收集所有消息
+        messages = None
 
         try:
-            async for message in query(prompt=prompt, options=options):
+            # 调用预处理钩子，合并返回的额外参数（预处理失败时不调用 LLM）
+            extra_kwargs = await self.pre_run(logger, **kwargs)
+            prompt_kwargs = {**kwargs, **extra_kwargs}
+
+            prompt = self.get_prompt(**prompt_kwargs)
+            options = self.get_options()
+            direct_task = self.get_direct_task(**prompt_kwargs)
+            if direct_task is not None and len(options.agents or {}) == 1:
+                logger.info(f"直接执行 subagent {next(iter(options.agents))}，跳过分发模型")
+                prompt, options = direct_task, self.get_direct_options(options)
+
+            # 记录用户 Prompt 和本次发送的 prompt 总大小
+            logger.log_user_prompt(prompt)
+            prompt_bytes = self.get_prompt_bytes(prompt, options)
+            logger.info(f"Prompt 大小: {prompt_bytes} 字节")
+            await asyncio.to_thread(task_registry.update, task_id, prompt_bytes=prompt_bytes)
+
+            messages = session_pool.query(prompt, options, pooled=self.use_session_pool())
+            async for message in messages:
                 messages_collected.append(message)
                 if isinstance(message, AssistantMessage):
                     # 新的 Turn 开始
@@ -211,8 +379,36 @@ class BaseAgent(ABC):
                 else:
                     logger.warning("[OUTPUT_DEBUG] 未找到符合条件的 final_text，跳过 process_final_output")
 
+            if cache_key and self.result_document is not None:
+                try:
+                    await asyncio.to_thread(result_cache.set, cache_key, {
+                        "task_id": task_id,
+                        "document": self.result_document,
+                        "structured_output": structured_output,
+                        "notion_url": self.notion_page_url,
+                    })
+                except OSError as e:
+                    logger.warning(f"写入结果缓存失败: {e}")
+
             logger.finish(success=True, num_turns=num_turns, cost_usd=cost_usd)
+            await asyncio.to_thread(
+                task_registry.finish, task_id, success=True, num_turns=num_turns, cost_usd=cost_usd,
+                notion_url=self.notion_page_url,
+            )
 
         except Exception as e:
             logger.log_error(e)
             logger.finish(success=False, error=str(e), num_turns=num_turns, cost_usd=cost_usd)
+            await asyncio.to_thread(
+                task_registry.finish, task_id, success=False, error=str(e),
+                num_turns=num_turns, cost_usd=cost_usd,
+                notion_url=self.notion_page_url,
+            )
+            # 交给任务队列标记失败（失败状态已记录，队列不再重复登记）
+            raise TaskFailedError(str(e)) from e
+
+        finally:
+            # 及时归还会话（异常中断时会话不再复用）
+            if messages is not None:
+                await messages.aclose()
+            await self.post_run(logger)
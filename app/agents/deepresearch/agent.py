@@ -1,4 +1,6 @@
-from claude_agent_sdk import AgentDefinition, ClaudeAgentOptions
+import json
+
+from claude_agent_sdk import AgentDefinition, ClaudeAgentOptions, HookMatcher
 
 from app.agents.base import BaseAgent
 from app.agents.deepresearch.config import (
@@ -10,21 +12,66 @@ from app.agents.deepresearch.config import (
     SEARCH_DEPTH,
     MAX_RESULTS,
     RESEARCHER_MODEL,
+    PUBLISH_MODE,
+    RESULT_CACHE_TTL_HOURS,
+    RESULT_CACHE_MODE,
+    TAVILY_CACHE_TTL_HOURS,
+    TAVILY_CACHE_MAX_MB,
+    COMPACT_RESULTS,
+    MAX_EXCERPT_CHARS,
 )
+from app.agents.deepresearch.compaction import TavilyResultCompactor
 from app.agents.deepresearch.prompts.lead_agent import get_lead_agent_prompt
 from app.agents.deepresearch.prompts.researcher import get_researcher_prompt
 from app.agents.deepresearch.schema import NOTION_OUTPUT_SCHEMA
+from app.config import DATA_DIR
+from app.core.canonical import canonical_search_query, canonical_topic
+from app.services.disk_cache import DiskLRUCache
+from app.services.mcp_pool import ToolResultCache, mcp_pool
 from app.services.notion import (
-    NotionService,
+    AsyncNotionService,
     blocks_to_notion_format,
+    notion_page_url,
     parse_agent_output,
 )
 
 
+def tavily_search_cache_key(args: dict) -> str:
+    """
+    生成 Tavily 搜索缓存 key
+
+    查询按 canonical_search_query 规范化；未显式传入的 search_depth / max_results 取配置值，
+    其余参数（时间范围、域名过滤等）原样参与 key。
+    """
+    params = {k: v for k, v in args.items() if k not in ("query", "search_depth", "max_results")}
+    return json.dumps({
+        "query": canonical_search_query(args.get("query", "")),
+        "search_depth": args.get("search_depth", SEARCH_DEPTH),
+        "max_results": args.get("max_results", MAX_RESULTS),
+        "params": params,
+    }, sort_keys=True, ensure_ascii=False)
+
+
+# researcher 的 Tavily 搜索经 MCP 服务器池转发时先查缓存（并行 researcher 的相同查询只请求一次）
+if TAVILY_CACHE_TTL_HOURS > 0:
+    mcp_pool.set_tool_cache("tavily", "tavily-search", ToolResultCache(
+        DiskLRUCache(DATA_DIR / "tavily_cache", max_bytes=TAVILY_CACHE_MAX_MB * 1024 * 1024),
+        ttl=TAVILY_CACHE_TTL_HOURS * 3600,
+        key_fn=tavily_search_cache_key,
+    ))
+
+# 搜索结果进入 researcher 上下文前压缩（按会话去重，所有任务共用一个实例）
+tavily_compactor = TavilyResultCompactor(max_excerpt_chars=MAX_EXCERPT_CHARS)
+
+TAVILY_SEARCH_TOOL = "mcp__tavily__tavily-search"
+
+
 class DeepResearchAgent(BaseAgent):
     """深度研究 Agent - 多 Agent 协作完成研究任务"""
 
     MODULE_NAME = "deepresearch"
+    RESULT_CACHE_TTL = RESULT_CACHE_TTL_HOURS * 3600
+    RESULT_CACHE_MODE = RESULT_CACHE_MODE
 
     def get_prompt(self, topic: str) -> str:
         return get_lead_agent_prompt(topic)
@@ -38,30 +85,46 @@ class DeepResearchAgent(BaseAgent):
                     search_depth=SEARCH_DEPTH,
                     max_results=MAX_RESULTS,
                 ),
-                tools=["mcp__tavily__tavily-search"],
+                tools=[TAVILY_SEARCH_TOOL],
                 model=RESEARCHER_MODEL,
             ),
         }
 
+        # 搜索结果进入 researcher 上下文前压缩
+        hooks = None
+        if COMPACT_RESULTS:
+            hooks = {"PostToolUse": [HookMatcher(matcher=TAVILY_SEARCH_TOOL, hooks=[tavily_compactor.hook])]}
+
         return ClaudeAgentOptions(
             model=MODEL,
             max_turns=MAX_TURNS,
             permission_mode="bypassPermissions",
-            mcp_servers=MCP_SERVERS,
+            mcp_servers=mcp_pool.get_mcp_servers(MCP_SERVERS),
             agents=agents,
             allowed_tools=["Task"],
             output_format=NOTION_OUTPUT_SCHEMA,
+            hooks=hooks,
         )
 
+    def use_session_pool(self) -> bool:
+        # 配置与主题无关（主题只出现在 prompt 中），所有任务可共用会话
+        return True
+
     def get_input_data(self, topic: str) -> dict:
         return {"topic": topic}
 
+    def get_result_cache_key(self, topic: str) -> str:
+        return f"{self.MODULE_NAME}:{canonical_topic(topic)}"
+
+    async def republish(self, document: dict) -> None:
+        await self._write_to_notion(document)
+
     async def process_structured_output(self, structured_output: dict, **kwargs) -> None:
         """处理结构化输出，写入 Notion"""
         if not structured_output:
             return
 
-        self._write_to_notion(structured_output)
+        await self._write_to_notion(structured_output)
 
     async def process_final_output(self, final_text: str, **kwargs) -> None:
         """处理文本输出（回退方案），解析 JSON 后写入 Notion"""
@@ -69,21 +132,32 @@ class DeepResearchAgent(BaseAgent):
             return
 
         parsed = parse_agent_output(final_text)
-        self._write_to_notion(parsed)
+        await self._write_to_notion(parsed)
 
-    def _write_to_notion(self, data: dict) -> None:
+    async def _write_to_notion(self, data: dict) -> None:
         """写入 Notion 页面"""
         notion_blocks = blocks_to_notion_format(data["blocks"])
 
-        notion_service = NotionService(NOTION_TOKEN)
-        notion_service.create_page(
-            parent_page_id=NOTION_PARENT_PAGE_ID,
-            title=data["title"],
-            blocks=notion_blocks,
-        )
-
-
-async def run_deepresearch_agent(topic: str) -> None:
+        notion_service = AsyncNotionService(NOTION_TOKEN)
+        if PUBLISH_MODE == "subpages":
+            page_id = await notion_service.create_page_with_subpages(
+                parent_page_id=NOTION_PARENT_PAGE_ID,
+                title=data["title"],
+                blocks=notion_blocks,
+            )
+        else:
+            page_id = await notion_service.create_page(
+                parent_page_id=NOTION_PARENT_PAGE_ID,
+                title=data["title"],
+                blocks=notion_blocks,
+            )
+        self.notion_page_url = notion_page_url(page_id)
+        self.result_document = data
+
+
+async def run_deepresearch_agent(
+    topic: str, task_id: str | None = None, force_refresh: bool = False
+) -> None:
     """执行 DeepResearch Agent"""
     agent = DeepResearchAgent()
-    await agent.run(topic=topic)
+    await agent.run(task_id=task_id, force_refresh=force_refresh, topic=topic)
@@ -0,0 +1,250 @@
+"""Tavily 搜索结果压缩（在结果进入 researcher 上下文之前执行）"""
+import json
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.canonical import canonical_url
+
+logger = logging.getLogger(__name__)
+
+# 导航、页脚、Cookie 提示等样板文字（整行就是这些短语时才丢弃，正文中提到这些词的句子保留）
+_BOILERPLATE_LINE_PATTERN = re.compile(
+    r"^(?:"
+    r"sign (?:in|up|out)|log ?(?:in|out)|register|create (?:an )?account|my account|"
+    r"(?:accept|allow|reject|manage)(?: all)? cookies|cookie (?:settings|preferences|policy)|"
+    r"subscribe(?: to (?:our|the) newsletter)?|newsletter|"
+    r"skip to (?:main )?content|back to top|read more|load more|show more|"
+    r"privacy policy|terms of (?:service|use)|"
+    r"follow us(?: on \w+)?|share (?:on \w+|this(?: article| post| page)?)|advertisement|"
+    r"登录|注册|登录\s*/\s*注册|关注我们|订阅|分享到.{0,10}|返回顶部|广告|免责声明|阅读(?:更多|全文)"
+    r")[\s.!:：。]*$"
+    r"|^(?:©|\(c\)|copyright\s*(?:©|\(c\))?\s*\d{4}|版权所有).{0,100}$"
+    r"|^.{0,100}\ball rights reserved\.?$",
+    re.IGNORECASE,
+)
+# 只由链接、图片和分隔符组成的行（菜单、面包屑、社交按钮）
+_LINK_ONLY_PATTERN = re.compile(r"^(?:[\s|•·>»/\-*#]*!?\[[^\]]*\]\([^)]*\))+[\s|•·>»/\-*]*$")
+_NAV_SEPARATOR_PATTERN = re.compile(r"\s*[|•·»]\s*")
+_MARKDOWN_LINK_PATTERN = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_SENTENCE_END_PATTERN = re.compile(r"[.!?;:。！？；：]")
+# 链接文字占比超过一半、少于该词数且没有标点的短行视为菜单项
+MIN_LINE_WORDS = 4
+# 最多保留的去重范围（会话内的主线程或 subagent）数，超出后淘汰最早的去重记录
+MAX_TRACKED_SCOPES = 256
+
+DUPLICATE_NOTICE = "(本任务之前的搜索已返回过该页面，内容从略)"
+
+
+def _link_text_ratio(line: str) -> float:
+    """链接（含图片）在行中所占的字符比例"""
+    linked = sum(len(m.group(0)) for m in _MARKDOWN_LINK_PATTERN.finditer(line))
+    return linked / len(line) if line else 0.0
+
+
+def clean_page_text(text: str) -> str:
+    """
+    去掉网页正文中的导航、页脚等样板文字
+
+    - 丢弃只由链接组成的行、整行是样板短语的行（"Sign in"、"© 2024 …"）、以链接为主的菜单短行
+    - 合并重复行，链接只保留文字
+    """
+    lines = []
+    seen = set()
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or _LINK_ONLY_PATTERN.match(line):
+            continue
+        link_ratio = _link_text_ratio(line)
+        line = _MARKDOWN_LINK_PATTERN.sub(r"\1", line).strip()
+        if not line or _BOILERPLATE_LINE_PATTERN.match(line):
+            continue
+        words = len(line.split()) + len(re.findall(r"[一-鿿]", line)) // 2
+        if (
+            link_ratio > 0.5
+            and words < MIN_LINE_WORDS
+            and not _SENTENCE_END_PATTERN.search(line)
+        ):
+            continue
+        # "Home | About | Blog" 式的菜单行（Markdown 表格行以 | 开头，不在此列）
+        segments = _NAV_SEPARATOR_PATTERN.split(line)
+        if (
+            not line.startswith("|")
+            and len(segments) >= 3
+            and all(len(seg.split()) <= 3 for seg in segments)
+        ):
+            continue
+        key = line.casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """按字符数截断，尽量在换行或句末处截断"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n"), *(cut.rfind(p) for p in ".。!！?？"))
+    if boundary >= max_chars // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " …"
+
+
+class TavilyResultCompactor:
+    """
+    Tavily 搜索结果压缩
+
+    作为 PostToolUse hook 改写 mcp__tavily__tavily-search 的返回内容：
+    - 每条结果保留标题、URL 和摘要，正文（Raw Content）去掉样板文字后与摘要合计不超过 max_excerpt_chars
+    - 同一 agent（Claude 会话中的主线程或某个 subagent）已看到过的 URL 只保留标题和 URL；
+      并行的 researcher 上下文相互独立，各自去重
+    标题和 URL 始终保留，researcher 的来源列表不受影响。
+    """
+
+    def __init__(self, max_excerpt_chars: int = 2000):
+        """
+        Args:
+            max_excerpt_chars: 每条结果摘要 + 正文的最大字符数
+        """
+        self.max_excerpt_chars = max_excerpt_chars
+        self._seen: OrderedDict[tuple[str, str], set[str]] = OrderedDict()
+
+    def _seen_urls(self, session_id: str, agent_id: str = "") -> set[str]:
+        scope = (session_id, agent_id)
+        seen = self._seen.get(scope)
+        if seen is None:
+            seen = self._seen[scope] = set()
+            while len(self._seen) > MAX_TRACKED_SCOPES:
+                self._seen.popitem(last=False)
+        else:
+            self._seen.move_to_end(scope)
+        return seen
+
+    def _excerpt(self, content: str, raw_content: str) -> str:
+        content = " ".join(content.split())
+        excerpt = truncate_text(content, self.max_excerpt_chars)
+        remaining = self.max_excerpt_chars - len(excerpt)
+        if raw_content and remaining > 200:
+            page = clean_page_text(raw_content)
+            if page:
+                excerpt += "\n" + truncate_text(page, remaining)
+        return excerpt
+
+    def compact_text(self, text: str, seen: set[str]) -> str:
+        """
+        压缩 tavily-mcp 的文本输出
+
+        格式为可选的 "Answer: ..."，之后每条结果以 "Title: / URL: / Content: / Raw Content:" 开头；
+        无法识别的内容原样返回。
+        """
+        if text.lstrip().startswith("{"):
+            return self._compact_json(text, seen)
+
+        blocks = re.split(r"(?m)^(?=Title: )", text)
+        if len(blocks) < 2:
+            return text
+        output = [blocks[0].rstrip()]
+        for block in blocks[1:]:
+            match = re.match(
+                r"Title: (?P<title>.*)\nURL: (?P<url>\S*)\n"
+                r"(?:Content: (?P<content>.*?))?(?:\nRaw Content: (?P<raw>.*?))?"
+                r"(?:\nFavicon: .*)?\s*$",
+                block,
+                re.DOTALL,
+            )
+            if match is None:
+                output.append(block.rstrip())
+                continue
+            title, url = match.group("title"), match.group("url")
+            lines = [f"\nTitle: {title}", f"URL: {url}"]
+            key = canonical_url(url)
+            if key in seen:
+                lines.append(f"Content: {DUPLICATE_NOTICE}")
+            else:
+                seen.add(key)
+                excerpt = self._excerpt(match.group("content") or "", match.group("raw") or "")
+                lines.append(f"Content: {excerpt}")
+            output.append("\n".join(lines))
+        return "\n".join(output).strip()
+
+    def _compact_json(self, text: str, seen: set[str]) -> str:
+        """压缩 JSON 格式的输出（{"results": [{"title", "url", "content", "raw_content"}]}）"""
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text
+        if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+            return text
+        results = []
+        for item in data["results"]:
+            if not isinstance(item, dict) or not item.get("url"):
+                results.append(item)
+                continue
+            key = canonical_url(item["url"])
+            compacted = {k: v for k, v in item.items() if k not in ("content", "raw_content")}
+            if key in seen:
+                compacted["content"] = DUPLICATE_NOTICE
+            else:
+                seen.add(key)
+                compacted["content"] = self._excerpt(
+                    item.get("content") or "", item.get("raw_content") or ""
+                )
+            results.append(compacted)
+        return json.dumps({**data, "results": results}, ensure_ascii=False)
+
+    def compact_response(self, session_id: str, response: Any, agent_id: str = "") -> Optional[Any]:
+        """
+        压缩工具输出，结构与输入一致
+
+        Args:
+            session_id: Claude 会话 ID
+            response: 工具输出（字符串、内容块列表或 {"content": [...]}）
+            agent_id: subagent ID，主线程为空（与 session_id 一起作为 URL 去重范围）
+
+        Returns:
+            压缩后的输出，无法识别时返回 None
+        """
+        seen = self._seen_urls(session_id, agent_id)
+        if isinstance(response, str):
+            return self.compact_text(response, seen)
+        if isinstance(response, dict) and isinstance(response.get("content"), list):
+            content = self.compact_response(session_id, response["content"], agent_id)
+            return {**response, "content": content} if content is not None else None
+        if isinstance(response, list):
+            return [
+                {**block, "text": self.compact_text(block["text"], seen)}
+                if isinstance(block, dict) and isinstance(block.get("text"), str)
+                else block
+                for block in response
+            ]
+        return None
+
+    async def hook(self, input_data: dict, tool_use_id: Optional[str], context: Any) -> dict:
+        """PostToolUse hook：用压缩后的内容替换工具输出"""
+        if input_data.get("hook_event_name") != "PostToolUse":
+            return {}
+        response = input_data.get("tool_response")
+        try:
+            # 并行 subagent 的 hook 交错触发，按 agent_id 区分
+            compacted = self.compact_response(
+                input_data.get("session_id", ""), response, input_data.get("agent_id") or ""
+            )
+        except Exception as e:
+            logger.warning(f"压缩搜索结果失败，保留原始输出: {e}")
+            return {}
+        if compacted is None:
+            return {}
+        if logger.isEnabledFor(logging.DEBUG):
+            before = len(json.dumps(response, ensure_ascii=False))
+            after = len(json.dumps(compacted, ensure_ascii=False))
+            logger.debug(f"搜索结果压缩: {before} -> {after} 字符")
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PostToolUse",
+                "updatedMCPToolOutput": compacted,
+            }
+        }
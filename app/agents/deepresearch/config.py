@@ -5,6 +5,12 @@ _config = get_agent_config("deepresearch")
 # 基础配置
 MODEL: str = _config.get("model", "claude-sonnet-4-20250514")
 MAX_TURNS: int = _config.get("max_turns", 20)
+# 任务队列中同时执行的最大任务数
+CONCURRENCY: int = _config.get("concurrency", 1)
+# 结果缓存有效期（小时），0 表示不缓存；有效期内重复提交直接复用上次结果
+RESULT_CACHE_TTL_HOURS: float = _config.get("result_cache_ttl_hours", 24)
+# 命中结果缓存时: link（返回已有 Notion 页面）| republish（用缓存内容重新发布新页面）
+RESULT_CACHE_MODE: str = _config.get("result_cache_mode", "link")
 # researcher subagent model: sonnet | haiku | opus
 RESEARCHER_MODEL: str = _config.get("researcher_model", "haiku")
 
@@ -12,12 +18,20 @@ RESEARCHER_MODEL: str = _config.get("researcher_model", "haiku")
 _notion_config = get_agent_notion_config("deepresearch")
 NOTION_TOKEN: str = _notion_config.get("token", "")
 NOTION_PARENT_PAGE_ID: str = _notion_config.get("parent_page_id", "")
+# 发布模式: subpages（长报告按 heading_1 拆分为并发写入的子页面）| single（单页面）
+PUBLISH_MODE: str = _config.get("publish_mode", "subpages")
 
 # Tavily 配置
 TAVILY_CONFIG: dict = _config.get("tavily", {})
 SEARCH_DEPTH: str = TAVILY_CONFIG.get("search_depth", "advanced")
 MAX_RESULTS: int = TAVILY_CONFIG.get("max_results", 10)
 INCLUDE_IMAGES: bool = TAVILY_CONFIG.get("include_images", False)
+# 搜索结果缓存（按规范化查询 + search_depth + max_results 寻址），有效期 0 表示不缓存
+TAVILY_CACHE_TTL_HOURS: float = TAVILY_CONFIG.get("cache_ttl_hours", 24)
+TAVILY_CACHE_MAX_MB: int = TAVILY_CONFIG.get("cache_max_mb", 100)
+# 搜索结果压缩：去掉样板文字、任务内 URL 去重、限制每条结果的摘要长度
+COMPACT_RESULTS: bool = TAVILY_CONFIG.get("compact_results", True)
+MAX_EXCERPT_CHARS: int = TAVILY_CONFIG.get("max_excerpt_chars", 2000)
 
 # MCP 服务器配置（移除 notion）
 MCP_SERVERS: dict = _config.get("mcp_servers", {})
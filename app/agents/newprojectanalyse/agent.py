@@ -1,5 +1,5 @@
 # app/agents/newprojectanalyse/agent.py
-import re
+from datetime import datetime
 
 from claude_agent_sdk import ClaudeAgentOptions
 
@@ -10,139 +10,121 @@ from app.agents.newprojectanalyse.config import (
     NOTION_PARENT_PAGE_ID,
     MAX_TURNS,
     MCP_SERVERS,
-    GITHUB_EXCLUDE_PATTERNS,
-    GITHUB_INCLUDE_PATTERNS,
-)
-from app.agents.newprojectanalyse.handlers import (
-    get_github_agent_definition,
-    get_web_agent_definition,
+    DIRECT_MODE,
+    DIRECT_MAX_TURNS,
+    RESULT_CACHE_TTL_HOURS,
+    RESULT_CACHE_MODE,
 )
+from app.agents.newprojectanalyse.handlers import UrlHandler, handler_registry
 from app.agents.newprojectanalyse.prompts import get_dispatcher_prompt
-from app.agents.newprojectanalyse.schema import (
-    GITHUB_OUTPUT_SCHEMA,
-    WEB_OUTPUT_SCHEMA,
-    github_output_to_blocks,
-    web_output_to_blocks,
-)
+from app.core.canonical import canonical_url
+from app.services.mcp_pool import mcp_pool
 from app.services.notion import (
-    NotionService,
+    AsyncNotionService,
     parse_agent_output,
     blocks_to_notion_format,
+    notion_page_url,
 )
 
 
-def is_github_repo_url(url: str) -> bool:
-    """判断是否为 GitHub 仓库 URL"""
-    pattern = r'^https?://github\.com/[\w.-]+/[\w.-]+/?'
-    return bool(re.match(pattern, url))
-
-
-async def fetch_github_repo_content(url: str) -> tuple[str, str, str]:
-    """
-    获取 GitHub 仓库内容
-
-    Args:
-        url: GitHub 仓库 URL
-
-    Returns:
-        tuple: (summary, tree, content)
-    """
-    from gitingest import ingest_async
-
-    summary, tree, content = await ingest_async(
-        url,
-        include_patterns=GITHUB_INCLUDE_PATTERNS,
-        exclude_patterns=GITHUB_EXCLUDE_PATTERNS,
-    )
-    return summary, tree, content
-
-
 class NewProjectAnalyseAgent(BaseAgent):
     """新项目分析 Agent - 入口分发器"""
 
     MODULE_NAME = "newprojectanalyse"
+    RESULT_CACHE_TTL = RESULT_CACHE_TTL_HOURS * 3600
+    RESULT_CACHE_MODE = RESULT_CACHE_MODE
 
     def __init__(self):
         super().__init__()
         self._url: str = ""
-        self._github_content: tuple[str, str, str] | None = None
-        self._is_github: bool = False
+        self._started_at: datetime = datetime.now()
+        self._handler: UrlHandler | None = None
 
     async def pre_run(self, logger, **kwargs) -> dict:
         """
-        运行前预处理：判断是否为 GitHub 仓库并获取内容
+        运行前预处理：由 URL 处理器注册表选择处理器（GitHub 仓库、arXiv、PDF、网页等）并在本地获取内容
 
         Args:
             logger: TaskLogger 实例
             **kwargs: 包含 url 参数
 
         Returns:
-            dict: 包含 github_content 的额外参数
+            dict: 包含 agent_name、prefetch_context 的额外参数
         """
         url = kwargs.get("url")
         if not url:
             raise ValueError("url 参数是必需的")
 
         self._url = url
-        self._github_content = None
-        self._is_github = False
-
-        if is_github_repo_url(url):
-            logger.info("检测到 GitHub 仓库 URL，使用 gitingest 获取内容...")
-            try:
-                self._github_content = await fetch_github_repo_content(url)
-                self._is_github = True
-                logger.info("gitingest 获取成功")
-            except Exception as e:
-                logger.warning(f"gitingest 获取失败，回退到 web 分析: {e}")
-                self._github_content = None
-                self._is_github = False
-
-        return {"github_content": self._github_content}
-
-    def get_prompt(self, url: str, github_content: tuple[str, str, str] | None = None, **kwargs) -> str:
+        self._started_at = datetime.now()
+        self._handler = await handler_registry.resolve(url, self.task_id, logger)
+
+        # 预获取的内容只进入 analyser 的 prompt，分发 prompt 只说明预处理情况
+        return {
+            "agent_name": self._handler.AGENT_NAME,
+            "prefetch_context": self._handler.get_dispatcher_context(),
+        }
+
+    async def post_run(self, logger) -> None:
+        """释放处理器的本地资源（如仓库存储）"""
+        if self._handler is not None:
+            await self._handler.cleanup()
+
+    def get_prompt(
+        self, url: str, agent_name: str = "web_analyser", prefetch_context: str = "", **kwargs
+    ) -> str:
         """生成入口 agent 的分发 prompt"""
-        return get_dispatcher_prompt(url, github_content)
+        return get_dispatcher_prompt(url, agent_name, prefetch_context)
 
     def get_options(self) -> ClaudeAgentOptions:
-        """注册所有 subagent，根据类型选择不同的 schema"""
-        agents = {}
-
-        if self._github_content:
-            summary, _tree, content = self._github_content
-            agents["github_analyser"] = get_github_agent_definition(
-                self._url, summary, content
-            )
-            output_schema = GITHUB_OUTPUT_SCHEMA
-        else:
-            agents["web_analyser"] = get_web_agent_definition(self._url)
-            output_schema = WEB_OUTPUT_SCHEMA
+        """注册 URL 处理器的 analyser，使用处理器的 schema"""
+        mcp_servers = mcp_pool.get_mcp_servers(MCP_SERVERS)
+        mcp_servers.update(self._handler.get_mcp_servers())
 
         return ClaudeAgentOptions(
             model=MODEL,
             max_turns=MAX_TURNS,
             permission_mode="bypassPermissions",
-            mcp_servers=MCP_SERVERS,
-            agents=agents,
+            mcp_servers=mcp_servers,
+            agents={self._handler.AGENT_NAME: self._handler.get_agent_definition()},
             allowed_tools=["Task"],
-            output_format=output_schema,
+            output_format=self._handler.OUTPUT_SCHEMA,
         )
 
+    def get_direct_task(self, url: str, **kwargs) -> str | None:
+        """
+        分析方式已在 pre_run 中确定（只注册了一个 analyser），直接执行该 analyser
+
+        任务描述与分发器转交给 subagent 的一致，只包含 URL。
+        """
+        if not DIRECT_MODE:
+            return None
+        return f"请分析以下 URL：{url}"
+
+    def get_direct_options(self, options: ClaudeAgentOptions) -> ClaudeAgentOptions:
+        # analyser 的工具调用计入顶层轮次
+        options = super().get_direct_options(options)
+        options.max_turns = max(options.max_turns or 0, DIRECT_MAX_TURNS)
+        return options
+
+    def use_session_pool(self) -> bool:
+        return self._handler is not None and self._handler.use_session_pool()
+
     def get_input_data(self, url: str) -> dict:
         return {"url": url}
 
+    def get_result_cache_key(self, url: str) -> str:
+        return f"{self.MODULE_NAME}:{canonical_url(url)}"
+
+    async def republish(self, document: dict) -> None:
+        await self._write_to_notion(document)
+
     async def process_structured_output(self, structured_output: dict, **kwargs) -> None:
-        """处理结构化输出，转换并写入 Notion"""
+        """处理结构化输出，由处理器与服务端字段合并后写入 Notion"""
         if not structured_output:
             return
 
-        # 根据类型转换为 blocks 格式
-        if self._is_github:
-            data = github_output_to_blocks(structured_output)
-        else:
-            data = web_output_to_blocks(structured_output)
-
-        self._write_to_notion(data)
+        await self._write_to_notion(self._handler.output_to_blocks(structured_output, self._started_at))
 
     async def process_final_output(self, final_text: str, **kwargs) -> None:
         """处理文本输出（回退方案），解析 JSON 后写入 Notion"""
@@ -151,30 +133,31 @@ class NewProjectAnalyseAgent(BaseAgent):
 
         parsed = parse_agent_output(final_text)
 
-        # 检查是否是新格式（有 stats 或 content_structure 字段）
-        if "stats" in parsed:
-            data = github_output_to_blocks(parsed)
-        elif "content_structure" in parsed:
-            data = web_output_to_blocks(parsed)
-        else:
-            # 旧格式，直接使用 blocks
+        # 旧格式直接使用 blocks，否则按处理器的 schema 转换
+        if "blocks" in parsed:
             data = parsed
+        else:
+            data = self._handler.output_to_blocks(parsed, self._started_at)
 
-        self._write_to_notion(data)
+        await self._write_to_notion(data)
 
-    def _write_to_notion(self, data: dict) -> None:
+    async def _write_to_notion(self, data: dict) -> None:
         """写入 Notion 页面"""
         notion_blocks = blocks_to_notion_format(data["blocks"])
 
-        notion_service = NotionService(NOTION_TOKEN)
-        notion_service.create_page(
+        notion_service = AsyncNotionService(NOTION_TOKEN)
+        page_id = await notion_service.create_page(
             parent_page_id=NOTION_PARENT_PAGE_ID,
             title=data["title"],
             blocks=notion_blocks,
         )
+        self.notion_page_url = notion_page_url(page_id)
+        self.result_document = data
 
 
-async def run_newprojectanalyse_agent(url: str) -> None:
+async def run_newprojectanalyse_agent(
+    url: str, task_id: str | None = None, force_refresh: bool = False
+) -> None:
     """执行 newprojectanalyse Agent"""
     agent = NewProjectAnalyseAgent()
-    await agent.run(url=url)
+    await agent.run(task_id=task_id, force_refresh=force_refresh, url=url)
@@ -5,8 +5,18 @@ _agent_config = get_agent_config("newprojectanalyse")
 # 通用配置
 MODEL: str = _agent_config.get("model", "claude-sonnet-4-20250514")
 MAX_TURNS: int = _agent_config.get("max_turns", 15)
+# 任务队列中同时执行的最大任务数
+CONCURRENCY: int = _agent_config.get("concurrency", 2)
+# 结果缓存有效期（小时），0 表示不缓存；有效期内重复提交直接复用上次结果
+RESULT_CACHE_TTL_HOURS: float = _agent_config.get("result_cache_ttl_hours", 24)
+# 命中结果缓存时: link（返回已有 Notion 页面）| republish（用缓存内容重新发布新页面）
+RESULT_CACHE_MODE: str = _agent_config.get("result_cache_mode", "link")
 # subagent model: sonnet | haiku | opus
 SUBAGENT_MODEL: str = _agent_config.get("subagent_model", "sonnet")
+# 直接执行模式：已在 Python 中确定分析方式（GitHub / 网页）时跳过分发模型，直接运行对应的 analyser
+DIRECT_MODE: bool = _agent_config.get("direct_mode", True)
+# 直接执行时的最大轮次（analyser 的工具调用都计入顶层轮次）
+DIRECT_MAX_TURNS: int = _agent_config.get("direct_max_turns", 30)
 
 # Notion 配置
 _notion_config = get_agent_notion_config("newprojectanalyse")
@@ -16,6 +26,34 @@ NOTION_PARENT_PAGE_ID: str = _notion_config.get("parent_page_id", "")
 # MCP 服务器配置
 MCP_SERVERS: dict = _agent_config.get("mcp_servers", {})
 
+# 文档本地提取（PDF、arXiv 论文、GitHub 单个文件和 Gist），内容直接写入 analyser 的 prompt
+_document_config: dict = _agent_config.get("document_extract", {})
+DOCUMENT_TIMEOUT: float = _document_config.get("timeout", 30)
+DOCUMENT_MAX_BYTES: int = _document_config.get("max_bytes", 30 * 1024 * 1024)
+DOCUMENT_MAX_PDF_PAGES: int = _document_config.get("max_pdf_pages", 50)
+# PDF 正文少于该字符数时视为扫描件，交给网页分析（Firecrawl）
+DOCUMENT_MIN_PDF_CHARS: int = _document_config.get("min_pdf_chars", 500)
+DOCUMENT_MAX_CHARS: int = _document_config.get("max_text_chars", 60000)
+
+# 本地网页提取：静态页面直接抓取并提取正文写入 web_analyser 的 prompt，
+# 请求失败、正文过短或 JavaScript 渲染的页面才由 web_analyser 调用 Firecrawl
+_web_extract_config: dict = _agent_config.get("web_extract", {})
+WEB_EXTRACT_ENABLED: bool = _web_extract_config.get("enabled", True)
+WEB_EXTRACT_TIMEOUT: float = _web_extract_config.get("timeout", 15)
+WEB_EXTRACT_MAX_BYTES: int = _web_extract_config.get("max_bytes", 3 * 1024 * 1024)
+WEB_EXTRACT_MIN_CHARS: int = _web_extract_config.get("min_text_chars", 500)
+WEB_EXTRACT_MAX_CHARS: int = _web_extract_config.get("max_text_chars", 60000)
+
+# Firecrawl 抓取结果缓存：再次抓取前用条件请求向源站确认页面未变化
+_scrape_cache_config: dict = _agent_config.get("scrape_cache", {})
+SCRAPE_CACHE_ENABLED: bool = _scrape_cache_config.get("enabled", True)
+SCRAPE_CACHE_MAX_MB: int = _scrape_cache_config.get("max_mb", 200)
+# 条目最长保留时间（小时），超过后无论页面是否变化都重新抓取
+SCRAPE_CACHE_MAX_AGE_HOURS: float = _scrape_cache_config.get("max_age_hours", 168)
+# 验证结果有效时间（分钟），期间直接使用缓存不再请求源站
+SCRAPE_CACHE_FRESH_MINUTES: float = _scrape_cache_config.get("fresh_minutes", 10)
+SCRAPE_CACHE_TIMEOUT: float = _scrape_cache_config.get("timeout", 10)
+
 # GitHub 预处理配置
 GITHUB_EXCLUDE_PATTERNS: list = _agent_config.get("github_exclude_patterns", [
     "node_modules/*", "vendor/*", ".venv/*", "venv/*",
@@ -33,3 +71,33 @@ GITHUB_INCLUDE_PATTERNS: list = _agent_config.get("github_include_patterns", [
     "Makefile", "Dockerfile", "docker-compose*.yml",
     "*.toml", "*.yaml", "*.yml", "*.json",
 ])
+
+# 仓库内容 token 预算：按重要性筛选文件（README、依赖清单优先），超出部分丢弃；0 表示不限制
+GITHUB_TOKEN_BUDGET: int = _agent_config.get("github_token_budget", 200000)
+
+# gitingest 结果缓存（按提交 SHA + 文件匹配规则寻址）
+GITINGEST_CACHE_MAX_MB: int = _agent_config.get("gitingest_cache_max_mb", 500)
+
+# GitHub API（获取 star、fork 数和最后提交时间）：token 为空时匿名请求（每小时 60 次）
+GITHUB_API_TOKEN: str = _agent_config.get("github_api_token", "")
+# API 响应缓存（ETag 条件请求，未变化时不消耗速率限额）
+GITHUB_API_CACHE_MAX_MB: int = _agent_config.get("github_api_cache_max_mb", 10)
+
+# 仓库获取（克隆 + gitingest 在独立子进程中执行）
+_ingest_config: dict = _agent_config.get("ingest", {})
+INGEST_MAX_WORKERS: int = _ingest_config.get("max_workers", 2)
+INGEST_TIMEOUT: float = _ingest_config.get("timeout", 300)
+# 单个任务进程树（含 git）的常驻内存上限（MB），0 表示不限制
+INGEST_MAX_RSS_MB: int = _ingest_config.get("max_rss_mb", 1024)
+# 单个文件大小上限（MB），更大的文件跳过
+INGEST_MAX_FILE_MB: float = _ingest_config.get("max_file_mb", 10)
+# 仓库大小上限（MB，GitHub 元数据中的 size，克隆前检查），0 表示不限制
+INGEST_MAX_REPO_MB: int = _ingest_config.get("max_repo_mb", 500)
+# 超过上限时的处理：readme（只通过 API 获取 README 和目录列表）或 reject（任务失败）
+INGEST_OVERSIZE_ACTION: str = _ingest_config.get("oversize_action", "readme")
+# 本地 bare 镜像总大小上限（MB）：重复获取同一仓库时增量 fetch，不再完整克隆；0 表示不使用镜像
+INGEST_MIRROR_MAX_MB: int = _ingest_config.get("mirror_max_mb", 5000)
+# 首次获取只浅克隆；间隔不超过该天数的再次获取才建立镜像
+INGEST_MIRROR_REPEAT_DAYS: float = _ingest_config.get("mirror_repeat_days", 30)
+# 首次获取就建立镜像的仓库（owner/repo）
+INGEST_MIRROR_WATCH: list = _ingest_config.get("mirror_watch", [])
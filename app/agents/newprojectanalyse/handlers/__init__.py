@@ -1,5 +1,34 @@
 # app/agents/newprojectanalyse/handlers/__init__.py
-from app.agents.newprojectanalyse.handlers.github import get_github_agent_definition
-from app.agents.newprojectanalyse.handlers.web import get_web_agent_definition
+from app.agents.newprojectanalyse.handlers.arxiv import ArxivHandler
+from app.agents.newprojectanalyse.handlers.base import UrlHandler
+from app.agents.newprojectanalyse.handlers.document import (
+    DocumentHandler,
+    GistHandler,
+    GitHubFileHandler,
+    PdfHandler,
+)
+from app.agents.newprojectanalyse.handlers.github import GitHubRepoHandler
+from app.agents.newprojectanalyse.handlers.registry import HandlerRegistry
+from app.agents.newprojectanalyse.handlers.web import WebHandler
 
-__all__ = ["get_github_agent_definition", "get_web_agent_definition"]
+# 按注册顺序匹配 URL；arXiv 的 PDF 链接需在通用 PDF 之前匹配
+handler_registry = HandlerRegistry()
+handler_registry.register(GitHubRepoHandler)
+handler_registry.register(GitHubFileHandler)
+handler_registry.register(GistHandler)
+handler_registry.register(ArxivHandler)
+handler_registry.register(PdfHandler)
+handler_registry.register(WebHandler, default=True)
+
+__all__ = [
+    "UrlHandler",
+    "DocumentHandler",
+    "HandlerRegistry",
+    "handler_registry",
+    "GitHubRepoHandler",
+    "GitHubFileHandler",
+    "GistHandler",
+    "ArxivHandler",
+    "PdfHandler",
+    "WebHandler",
+]
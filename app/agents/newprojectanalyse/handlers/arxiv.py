@@ -0,0 +1,97 @@
+# app/agents/newprojectanalyse/handlers/arxiv.py
+import asyncio
+from datetime import datetime
+
+from claude_agent_sdk import AgentDefinition
+
+from app.agents.newprojectanalyse.config import (
+    SUBAGENT_MODEL,
+    DOCUMENT_TIMEOUT,
+    DOCUMENT_MAX_BYTES,
+    DOCUMENT_MAX_PDF_PAGES,
+    DOCUMENT_MAX_CHARS,
+)
+from app.agents.newprojectanalyse.handlers.base import UrlHandler
+from app.agents.newprojectanalyse.prompts.paper import get_paper_prompt
+from app.agents.newprojectanalyse.schema import (
+    PAPER_OUTPUT_SCHEMA,
+    paper_output_to_blocks,
+    paper_server_fields,
+)
+from app.services.arxiv import ARXIV_PDF_URL, ArxivPaper, fetch_arxiv_metadata, parse_arxiv_url
+from app.services.pdf_extract import ExtractedPdf, fetch_and_extract_pdf
+from app.services.web_extract import ExtractionError
+
+
+class ArxivHandler(UrlHandler):
+    """
+    arXiv 论文（abs / pdf / html 页面）
+
+    并发获取 API 元数据（标题、作者、摘要、分类）和 PDF 正文，论文内容直接写入 paper_analyser 的 prompt；
+    PDF 提取失败时只用摘要分析，元数据和 PDF 都获取失败时交给网页分析。
+    """
+
+    AGENT_NAME = "paper_analyser"
+    OUTPUT_SCHEMA = PAPER_OUTPUT_SCHEMA
+
+    def __init__(self, url: str, task_id: str):
+        super().__init__(url, task_id)
+        self.arxiv_id = parse_arxiv_url(url)
+        self._paper: ArxivPaper | None = None
+        self._content = ""
+
+    @classmethod
+    def match_url(cls, url: str) -> bool:
+        return parse_arxiv_url(url) is not None
+
+    async def _fetch_pdf(self, logger) -> ExtractedPdf | None:
+        try:
+            return await fetch_and_extract_pdf(
+                f"{ARXIV_PDF_URL}/{self.arxiv_id}",
+                timeout=DOCUMENT_TIMEOUT,
+                max_bytes=DOCUMENT_MAX_BYTES,
+                max_pages=DOCUMENT_MAX_PDF_PAGES,
+                max_chars=DOCUMENT_MAX_CHARS,
+            )
+        except ExtractionError as e:
+            logger.info(f"本地提取论文 PDF 失败: {e}")
+            return None
+
+    async def prepare(self, logger) -> bool:
+        logger.info(f"检测到 arXiv 论文: {self.arxiv_id}")
+        self._paper, pdf = await asyncio.gather(
+            fetch_arxiv_metadata(self.arxiv_id), self._fetch_pdf(logger)
+        )
+        if self._paper is None and pdf is None:
+            logger.warning("获取 arXiv 元数据和 PDF 均失败，交给网页分析")
+            return False
+
+        parts = [f"URL: {self.url}", f"arXiv ID: {self.arxiv_id}"]
+        if self._paper:
+            parts += [
+                f"标题: {self._paper.title}",
+                f"作者: {', '.join(self._paper.authors)}",
+                f"分类: {', '.join(self._paper.categories)}",
+                f"\n### 摘要\n\n{self._paper.abstract}",
+            ]
+        if pdf:
+            parts.append(f"\n### 正文（共 {pdf.pages} 页，提取了前 {pdf.extracted_pages} 页）\n\n{pdf.text}")
+            logger.info(f"本地提取论文 PDF 成功: {pdf.extracted_pages}/{pdf.pages} 页, {len(pdf.text)} 字符")
+        self._content = "\n".join(parts)
+        return True
+
+    def get_agent_definition(self) -> AgentDefinition:
+        return AgentDefinition(
+            description="分析学术论文，提炼研究问题、方法、结果和局限性",
+            prompt=get_paper_prompt(self._content),
+            tools=[],
+            model=SUBAGENT_MODEL,
+        )
+
+    def get_dispatcher_context(self) -> str:
+        return f"论文元数据和正文已预获取，并已提供给 {self.AGENT_NAME}。"
+
+    def output_to_blocks(self, data: dict, started_at: datetime) -> dict:
+        return paper_output_to_blocks(
+            data, paper_server_fields(self.url, started_at, self._paper._asdict() if self._paper else None)
+        )
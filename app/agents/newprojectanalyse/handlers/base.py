@@ -0,0 +1,96 @@
+# app/agents/newprojectanalyse/handlers/base.py
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from claude_agent_sdk import AgentDefinition
+
+
+class UrlHandler(ABC):
+    """
+    URL 处理器基类
+
+    每类 URL（GitHub 仓库、arXiv 论文、PDF、普通网页等）一个子类，负责：
+    - 预处理（pre_run 阶段在本地获取内容，失败时交给下一个处理器）
+    - analyser subagent 的定义（prompt 和工具）以及额外的 MCP 服务器
+    - 输出 schema，以及合并服务端字段后生成 Notion blocks
+
+    每个任务创建一个实例，预处理结果保存在实例上。
+    新增处理器只需继承本类并在 handlers/__init__.py 中注册，无需修改 agent.py。
+    """
+
+    # analyser subagent 名称（分发模式下由入口 agent 调用）
+    AGENT_NAME: str = ""
+    # 匹配的 URL 正则（按注册顺序依次尝试）
+    URL_PATTERNS: tuple[re.Pattern, ...] = ()
+    # 匹配的 Content-Type（其他处理器预处理时请求得到该类型时改由本处理器处理）
+    CONTENT_TYPES: tuple[str, ...] = ()
+    # 输出 JSON Schema
+    OUTPUT_SCHEMA: dict = {}
+
+    def __init__(self, url: str, task_id: str):
+        """
+        Args:
+            url: 目标 URL
+            task_id: 任务 ID（用于任务专属的本地存储）
+        """
+        self.url = url
+        self.task_id = task_id
+        # 预处理时请求得到的 Content-Type（为空表示未知），由 HandlerRegistry 据此改选处理器
+        self.content_type = ""
+
+    @classmethod
+    def match_url(cls, url: str) -> bool:
+        return any(pattern.match(url) for pattern in cls.URL_PATTERNS)
+
+    @classmethod
+    def match_content_type(cls, content_type: str) -> bool:
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return media_type in cls.CONTENT_TYPES
+
+    async def prepare(self, logger) -> bool:
+        """
+        预处理：在本地获取内容
+
+        Args:
+            logger: TaskLogger 实例
+
+        Returns:
+            是否可以处理该 URL，False 时由下一个处理器处理
+        """
+        return True
+
+    async def cleanup(self) -> None:
+        """释放预处理产生的资源（任务结束或处理器放弃时调用）"""
+        pass
+
+    @abstractmethod
+    def get_agent_definition(self) -> AgentDefinition:
+        """analyser subagent 的定义"""
+        pass
+
+    def get_mcp_servers(self) -> dict:
+        """analyser 需要的额外 MCP 服务器（如进程内的 repo 服务器）"""
+        return {}
+
+    def get_dispatcher_context(self) -> str:
+        """写入分发 prompt 的上下文（如"内容已预获取"）"""
+        return ""
+
+    def use_session_pool(self) -> bool:
+        """agent 配置与具体 URL 无关时可复用会话池中的会话"""
+        return False
+
+    @abstractmethod
+    def output_to_blocks(self, data: dict, started_at: datetime) -> dict:
+        """
+        合并模型输出和服务端字段，转换为 Notion blocks 格式
+
+        Args:
+            data: 模型按 OUTPUT_SCHEMA 生成的输出
+            started_at: 任务开始时间（标题日期和任务时间）
+
+        Returns:
+            {"title": ..., "blocks": [...]}
+        """
+        pass
@@ -0,0 +1,174 @@
+# app/agents/newprojectanalyse/handlers/document.py
+import re
+from abc import abstractmethod
+from datetime import datetime
+
+from claude_agent_sdk import AgentDefinition
+
+from app.agents.newprojectanalyse.config import (
+    SUBAGENT_MODEL,
+    GITHUB_API_TOKEN,
+    DOCUMENT_TIMEOUT,
+    DOCUMENT_MAX_BYTES,
+    DOCUMENT_MAX_PDF_PAGES,
+    DOCUMENT_MIN_PDF_CHARS,
+    DOCUMENT_MAX_CHARS,
+)
+from app.agents.newprojectanalyse.handlers.base import UrlHandler
+from app.agents.newprojectanalyse.handlers.github import github_api_cache
+from app.agents.newprojectanalyse.prompts.document import get_document_prompt
+from app.agents.newprojectanalyse.schema import (
+    WEB_OUTPUT_SCHEMA,
+    web_output_to_blocks,
+    web_server_fields,
+)
+from app.services.github import fetch_gist, fetch_raw_text, github_raw_url, parse_gist_url
+from app.services.pdf_extract import fetch_and_extract_pdf
+from app.services.web_extract import ExtractionError
+
+# 读取文本文件时每个字符按 3 字节估算读取上限（UTF-8 中文每字 3 字节）
+_MAX_TEXT_BYTES_PER_CHAR = 3
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "\n…（内容过长，已截断）"
+
+
+class DocumentHandler(UrlHandler):
+    """
+    本地获取全文的文档（预处理得到的内容直接写入 document_analyser 的 prompt，不调用任何工具）
+
+    子类实现 fetch_content()，输出结构与网页分析相同。
+    """
+
+    AGENT_NAME = "document_analyser"
+    OUTPUT_SCHEMA = WEB_OUTPUT_SCHEMA
+    # 文档类型描述（写入 prompt）
+    KIND = "文档"
+
+    def __init__(self, url: str, task_id: str):
+        super().__init__(url, task_id)
+        self._content = ""
+
+    @abstractmethod
+    async def fetch_content(self, logger) -> str | None:
+        """
+        获取文档内容
+
+        Returns:
+            写入 prompt 的内容（开头为 URL、标题等信息），获取失败时返回 None
+        """
+        pass
+
+    async def prepare(self, logger) -> bool:
+        content = await self.fetch_content(logger)
+        if not content:
+            return False
+        self._content = content
+        return True
+
+    def get_agent_definition(self) -> AgentDefinition:
+        return AgentDefinition(
+            description=f"分析{self.KIND}，提取核心信息并总结",
+            prompt=get_document_prompt(self.KIND, self._content),
+            tools=[],
+            model=SUBAGENT_MODEL,
+        )
+
+    def get_dispatcher_context(self) -> str:
+        return f"{self.KIND}的内容已预获取，并已提供给 {self.AGENT_NAME}。"
+
+    def output_to_blocks(self, data: dict, started_at: datetime) -> dict:
+        return web_output_to_blocks(data, web_server_fields(self.url, started_at))
+
+
+class PdfHandler(DocumentHandler):
+    """
+    PDF 文档（URL 以 .pdf 结尾或 Content-Type 为 application/pdf）
+
+    流式下载后在本地逐页提取文本；扫描件、加密文件或未安装 pypdf 时交给网页分析（Firecrawl）。
+    """
+
+    URL_PATTERNS = (re.compile(r"^https?://[^?#]+\.pdf(?:[?#].*)?$", re.IGNORECASE),)
+    CONTENT_TYPES = ("application/pdf",)
+    KIND = "PDF 文档"
+
+    async def fetch_content(self, logger) -> str | None:
+        try:
+            pdf = await fetch_and_extract_pdf(
+                self.url,
+                timeout=DOCUMENT_TIMEOUT,
+                max_bytes=DOCUMENT_MAX_BYTES,
+                max_pages=DOCUMENT_MAX_PDF_PAGES,
+                max_chars=DOCUMENT_MAX_CHARS,
+                min_text_chars=DOCUMENT_MIN_PDF_CHARS,
+            )
+        except ExtractionError as e:
+            logger.info(f"本地提取 PDF 失败，交给网页分析: {e}")
+            return None
+        logger.info(
+            f"本地提取 PDF 成功: {pdf.extracted_pages}/{pdf.pages} 页, "
+            f"{len(pdf.text)} 字符 (文件 {pdf.pdf_bytes} 字节)"
+        )
+        return pdf.to_prompt()
+
+
+class GitHubFileHandler(DocumentHandler):
+    """GitHub 上的单个文件（blob 页面或 raw.githubusercontent.com），直接读取原始内容"""
+
+    KIND = "GitHub 上的文件"
+
+    @classmethod
+    def match_url(cls, url: str) -> bool:
+        return github_raw_url(url) is not None
+
+    async def fetch_content(self, logger) -> str | None:
+        raw_url = github_raw_url(self.url)
+        result = await fetch_raw_text(
+            raw_url,
+            timeout=DOCUMENT_TIMEOUT,
+            max_bytes=DOCUMENT_MAX_CHARS * _MAX_TEXT_BYTES_PER_CHAR,
+        )
+        if result is None:
+            logger.info(f"读取文件原始内容失败或为二进制文件，交给网页分析: {raw_url}")
+            return None
+        text, truncated = result
+        logger.info(f"读取文件原始内容成功: {len(text)} 字符{'（已截断）' if truncated else ''}")
+        path = raw_url.split("githubusercontent.com/", 1)[-1]
+        return f"URL: {self.url}\n文件: {path}\n\n" + _truncate(text, DOCUMENT_MAX_CHARS)
+
+
+class GistHandler(DocumentHandler):
+    """GitHub Gist，通过 GitHub API 获取全部文件"""
+
+    KIND = "GitHub Gist"
+
+    @classmethod
+    def match_url(cls, url: str) -> bool:
+        return parse_gist_url(url) is not None
+
+    async def fetch_content(self, logger) -> str | None:
+        gist = await fetch_gist(parse_gist_url(self.url), github_api_cache, GITHUB_API_TOKEN)
+        if not gist or not gist.get("files"):
+            logger.info("获取 Gist 失败，交给网页分析")
+            return None
+
+        parts = [f"URL: {self.url}"]
+        if gist.get("description"):
+            parts.append(f"描述: {gist['description']}")
+        for name, file in gist["files"].items():
+            content = file.get("content") or ""
+            # 超过 1 MB 的文件 API 只返回部分内容，从 raw_url 读取
+            if file.get("truncated") and file.get("raw_url"):
+                result = await fetch_raw_text(
+                    file["raw_url"],
+                    timeout=DOCUMENT_TIMEOUT,
+                    max_bytes=DOCUMENT_MAX_CHARS * _MAX_TEXT_BYTES_PER_CHAR,
+                )
+                content = result[0] if result else content
+            language = f" ({file['language']})" if file.get("language") else ""
+            parts.append(f"## 文件: {name}{language}\n\n{content}")
+        logger.info(f"获取 Gist 成功: {len(gist['files'])} 个文件")
+        return _truncate("\n\n".join(parts), DOCUMENT_MAX_CHARS)
@@ -1,22 +1,278 @@
 # app/agents/newprojectanalyse/handlers/github.py
+import asyncio
+import json
+from datetime import datetime
+
 from claude_agent_sdk import AgentDefinition
 
-from app.agents.newprojectanalyse.config import SUBAGENT_MODEL
+from app.agents.newprojectanalyse.config import (
+    SUBAGENT_MODEL,
+    GITHUB_EXCLUDE_PATTERNS,
+    GITHUB_INCLUDE_PATTERNS,
+    GITINGEST_CACHE_MAX_MB,
+    GITHUB_API_TOKEN,
+    GITHUB_API_CACHE_MAX_MB,
+    GITHUB_TOKEN_BUDGET,
+    INGEST_MAX_WORKERS,
+    INGEST_TIMEOUT,
+    INGEST_MAX_RSS_MB,
+    INGEST_MAX_FILE_MB,
+    INGEST_MAX_REPO_MB,
+    INGEST_OVERSIZE_ACTION,
+    INGEST_MIRROR_MAX_MB,
+    INGEST_MIRROR_REPEAT_DAYS,
+    INGEST_MIRROR_WATCH,
+)
+from app.agents.newprojectanalyse.handlers.base import UrlHandler
 from app.agents.newprojectanalyse.prompts.github import get_github_prompt
+from app.agents.newprojectanalyse.schema import (
+    GITHUB_OUTPUT_SCHEMA,
+    github_output_to_blocks,
+    github_server_fields,
+)
+from app.agents.newprojectanalyse.selection import RepoBudgetExceededError, select_repo_files
+from app.agents.newprojectanalyse.tools import REPO_MCP_SERVER, REPO_TOOLS, create_repo_mcp_server
+from app.config import DATA_DIR
+from app.services.disk_cache import DiskLRUCache
+from app.services.github import (
+    GitHubRepo,
+    fetch_readme,
+    fetch_repo_info,
+    fetch_repo_listing,
+    fetch_repo_stats,
+    parse_github_repo_url,
+    resolve_commit_sha,
+    resolve_repo_ref,
+)
+from app.services.repo_ingest import IngestPool, RepoTooLargeError, ingest_repo
+from app.services.repo_store import RepoStore, split_gitingest_content
+
+# gitingest 结果缓存：同一提交 + 同一匹配规则的内容不会变化
+gitingest_cache = DiskLRUCache(
+    DATA_DIR / "gitingest_cache",
+    max_bytes=GITINGEST_CACHE_MAX_MB * 1024 * 1024,
+)
+
+# GitHub API 响应缓存（按 API 路径存 ETag 和响应，条件请求未变化时直接复用）
+github_api_cache = DiskLRUCache(
+    DATA_DIR / "github_api_cache",
+    max_bytes=GITHUB_API_CACHE_MAX_MB * 1024 * 1024,
+)
+
+# 克隆和 gitingest 在独立子进程中执行，限制并发数、耗时和内存
+ingest_pool = IngestPool(
+    max_workers=INGEST_MAX_WORKERS,
+    timeout=INGEST_TIMEOUT,
+    max_rss_mb=INGEST_MAX_RSS_MB,
+)
+
 
+async def get_gitingest_cache_key(repo: GitHubRepo) -> str | None:
+    """
+    生成 gitingest 缓存 key
 
-def get_github_agent_definition(url: str, summary: str, content: str) -> AgentDefinition:
+    由仓库、子目录、解析到的提交 SHA 和 include/exclude 规则组成；
+    无法解析提交 SHA 时返回 None（不使用缓存）。
     """
-    返回 GitHub 分析 subagent 的定义
+    sha = await resolve_commit_sha(repo)
+    if sha is None:
+        return None
+    return json.dumps({
+        "repo": f"{repo.owner}/{repo.repo}".lower(),
+        "subpath": repo.subpath,
+        "sha": sha,
+        "include": sorted(GITHUB_INCLUDE_PATTERNS),
+        "exclude": sorted(GITHUB_EXCLUDE_PATTERNS),
+        "max_file_mb": INGEST_MAX_FILE_MB,
+    }, sort_keys=True)
+
+
+async def fetch_github_repo_content(repo: GitHubRepo) -> tuple[str, str, str]:
+    """
+    获取 GitHub 仓库内容（优先读取按提交 SHA 寻址的缓存）
+
+    未命中缓存时由 ingest_pool 在子进程中从本地镜像增量更新（无镜像时浅克隆）、
+    稀疏检出（URL 指向子目录时只检出该目录）并运行 gitingest。
 
     Args:
-        url: GitHub 仓库 URL
-        summary: gitingest 获取的仓库概要
-        content: gitingest 获取的文件内容
-    """
-    return AgentDefinition(
-        description="分析 GitHub 仓库，提取项目信息、技术栈、部署说明等",
-        prompt=get_github_prompt(url, summary, content),
-        tools=["mcp__fetch__fetch"],
-        model=SUBAGENT_MODEL,
+        repo: GitHub 仓库定位信息
+
+    Returns:
+        tuple: (summary, tree, content)
+
+    Raises:
+        IngestLimitError: 超过耗时或内存限制
+    """
+    cache_key = await get_gitingest_cache_key(repo)
+    if cache_key:
+        cached = await asyncio.to_thread(gitingest_cache.get, cache_key)
+        if cached:
+            return cached["summary"], cached["tree"], cached["content"]
+
+    summary, tree, content = await ingest_pool.run(
+        ingest_repo,
+        repo.clone_url,
+        f"{repo.owner}/{repo.repo}",
+        repo.ref,
+        repo.subpath,
+        GITHUB_INCLUDE_PATTERNS,
+        GITHUB_EXCLUDE_PATTERNS,
+        int(INGEST_MAX_FILE_MB * 1024 * 1024),
+        str(DATA_DIR / "repo_mirrors") if INGEST_MIRROR_MAX_MB else None,
+        INGEST_MIRROR_MAX_MB * 1024 * 1024,
+        tuple(INGEST_MIRROR_WATCH),
+        INGEST_MIRROR_REPEAT_DAYS * 86400,
+    )
+
+    if cache_key:
+        await asyncio.to_thread(
+            gitingest_cache.set,
+            cache_key,
+            {"summary": summary, "tree": tree, "content": content},
+        )
+    return summary, tree, content
+
+
+def _format_listing_tree(root: str, entries: list[dict]) -> str:
+    """按 gitingest 的目录树格式列出一层条目（目录在前）"""
+    entries = sorted(entries, key=lambda e: (e.get("type") != "dir", e.get("name", "").lower()))
+    lines = ["Directory structure:", f"└── {root}/"]
+    for i, entry in enumerate(entries):
+        branch = "└── " if i == len(entries) - 1 else "├── "
+        suffix = "/" if entry.get("type") == "dir" else ""
+        lines.append(f"    {branch}{entry.get('name', '')}{suffix}")
+    return "\n".join(lines)
+
+
+async def fetch_github_readme_only(
+    repo: GitHubRepo, size_mb: float
+) -> tuple[str, str, list[tuple[str, str]]] | None:
+    """
+    超大仓库不克隆，只通过 API 获取 README 和一层目录列表
+
+    Returns:
+        tuple: (summary, tree, [(path, text)])，README 获取失败时返回 None
+    """
+    readme, listing = await asyncio.gather(
+        fetch_readme(repo, github_api_cache, GITHUB_API_TOKEN),
+        fetch_repo_listing(repo, github_api_cache, GITHUB_API_TOKEN),
     )
+    if readme is None:
+        return None
+    summary = (
+        f"Repository: {repo.owner}/{repo.repo}\n"
+        f"Repository size: {size_mb:.0f} MB (over {INGEST_MAX_REPO_MB} MB limit, README only)\n"
+    )
+    root = f"{repo.owner}-{repo.repo}".lower()
+    if repo.subpath:
+        root += f"/{repo.subpath}"
+    tree = _format_listing_tree(root, listing) if listing else ""
+    return summary, tree, [readme]
+
+
+class GitHubRepoHandler(UrlHandler):
+    """
+    GitHub 仓库（包括 /tree/{ref}/{subpath} 指向的子目录）
+
+    先按 GitHub 元数据检查仓库大小，超过上限时不克隆（只取 README 或直接失败）；
+    gitingest 获取内容后按重要性筛选文件存入本地仓库存储，github_analyser 通过 repo 工具按需读取；
+    star、fork 数和最后提交时间与 gitingest 并发获取，由服务端填入输出。
+    """
+
+    AGENT_NAME = "github_analyser"
+    OUTPUT_SCHEMA = GITHUB_OUTPUT_SCHEMA
+
+    def __init__(self, url: str, task_id: str):
+        super().__init__(url, task_id)
+        self.repo = parse_github_repo_url(url)
+        self._summary = ""
+        self._files: list[str] = []
+        self._tree = ""
+        self._store: RepoStore | None = None
+        self._stats: dict | None = None
+
+    @classmethod
+    def match_url(cls, url: str) -> bool:
+        return parse_github_repo_url(url) is not None
+
+    async def prepare(self, logger) -> bool:
+        # 含斜杠的分支名（/tree/release/1.x/src）按远端分支和标签拆分出 ref 和子目录
+        self.repo = await resolve_repo_ref(self.repo)
+        scope = f"（子目录 {self.repo.subpath}）" if self.repo.subpath else ""
+        logger.info(f"检测到 GitHub 仓库 URL{scope}，使用 gitingest 获取内容...")
+        # 克隆前检查仓库大小；元数据获取失败时不做限制
+        info = await fetch_repo_info(self.repo, github_api_cache, GITHUB_API_TOKEN)
+        size_mb = (info.get("size") or 0) / 1024 if info else 0
+        oversize = bool(INGEST_MAX_REPO_MB) and size_mb > INGEST_MAX_REPO_MB
+        if oversize:
+            if INGEST_OVERSIZE_ACTION == "reject":
+                raise RepoTooLargeError(
+                    f"仓库大小 {size_mb:.0f} MB 超过上限 {INGEST_MAX_REPO_MB} MB"
+                )
+            logger.warning(f"仓库大小 {size_mb:.0f} MB 超过上限 {INGEST_MAX_REPO_MB} MB，只获取 README")
+
+        # 统计信息与 gitingest 并发获取，由 Python 填入输出，不占用模型轮次
+        stats_task = asyncio.create_task(
+            fetch_repo_stats(self.repo, github_api_cache, GITHUB_API_TOKEN, info=info)
+        )
+        try:
+            if oversize:
+                result = await fetch_github_readme_only(self.repo, size_mb)
+                if result is None:
+                    logger.warning("获取 README 失败，回退到 web 分析")
+                    return False
+                summary, tree, files = result
+            else:
+                summary, tree, content = await fetch_github_repo_content(self.repo)
+                files = split_gitingest_content(content)
+            # 按重要性筛选文件并控制在 token 预算内，必要文件都放不下时直接失败
+            selection = await asyncio.to_thread(select_repo_files, files, GITHUB_TOKEN_BUDGET)
+            self._store = await asyncio.to_thread(
+                RepoStore.build, DATA_DIR / "repo_store" / self.task_id, selection.files
+            )
+        except RepoBudgetExceededError:
+            raise
+        except Exception as e:
+            logger.warning(f"gitingest 获取失败，回退到 web 分析: {e}")
+            return False
+        else:
+            self._stats = await stats_task
+        finally:
+            stats_task.cancel()
+
+        self._summary = f"{summary}\n{selection.describe()}"
+        self._files = [path for path, _ in selection.files]
+        # 项目结构直接由目录树生成，不由模型输出
+        self._tree = tree
+        logger.info(
+            f"gitingest 获取成功: {selection.describe()}, {self._store.total_bytes} 字节 "
+            f"(缓存统计: {gitingest_cache.stats()}, 进程池统计: {ingest_pool.stats()})"
+        )
+        logger.info(f"GitHub 统计信息: {self._stats or '获取失败'}")
+        return True
+
+    async def cleanup(self) -> None:
+        """删除本次任务的仓库存储"""
+        if self._store is not None:
+            await asyncio.to_thread(self._store.remove)
+            self._store = None
+
+    def get_agent_definition(self) -> AgentDefinition:
+        """仓库文件通过 repo MCP 工具按需读取（见 tools.create_repo_mcp_server）"""
+        return AgentDefinition(
+            description="分析 GitHub 仓库，提取项目信息、技术栈、部署说明等",
+            prompt=get_github_prompt(self.url, self._summary, self._files, self.repo.subpath),
+            tools=REPO_TOOLS,
+            model=SUBAGENT_MODEL,
+        )
+
+    def get_mcp_servers(self) -> dict:
+        return {REPO_MCP_SERVER: create_repo_mcp_server(self._store)}
+
+    def get_dispatcher_context(self) -> str:
+        return f"GitHub 仓库内容已预获取，并已提供给 {self.AGENT_NAME}。"
+
+    def output_to_blocks(self, data: dict, started_at: datetime) -> dict:
+        return github_output_to_blocks(
+            data, github_server_fields(self.url, started_at, self._stats, self._tree)
+        )
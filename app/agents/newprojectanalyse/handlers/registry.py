@@ -0,0 +1,101 @@
+# app/agents/newprojectanalyse/handlers/registry.py
+from app.agents.newprojectanalyse.handlers.base import UrlHandler
+
+
+class HandlerRegistry:
+    """
+    URL 处理器注册表
+
+    选择顺序：
+    1. URL 匹配的处理器（按注册顺序）
+    2. 默认处理器（普通网页）
+    处理器预处理失败时依次尝试下一个，默认处理器总能处理。
+    预处理时请求得到的 Content-Type 属于其他处理器时（如未以 .pdf 结尾的 PDF 链接）改由其处理，
+    不单独发送 HEAD 请求探测；改选的处理器都失败时仍使用原处理器。
+    """
+
+    def __init__(self):
+        self._handlers: list[type[UrlHandler]] = []
+        self._default: type[UrlHandler] | None = None
+
+    def register(self, handler_cls: type[UrlHandler], default: bool = False) -> type[UrlHandler]:
+        """
+        注册处理器
+
+        Args:
+            handler_cls: 处理器类
+            default: 是否为默认处理器（其他处理器都不能处理时使用）
+        """
+        if default:
+            self._default = handler_cls
+        else:
+            self._handlers.append(handler_cls)
+        return handler_cls
+
+    @property
+    def handlers(self) -> list[type[UrlHandler]]:
+        return list(self._handlers) + ([self._default] if self._default else [])
+
+    def candidates(self, url: str) -> list[type[UrlHandler]]:
+        """按优先级列出可能处理该 URL 的处理器"""
+        matched = [cls for cls in self._handlers if cls.match_url(url)]
+        if self._default and self._default not in matched:
+            matched.append(self._default)
+        return matched
+
+    def _match_content_type(self, content_type: str, exclude: set) -> list[type[UrlHandler]]:
+        """按 Content-Type 匹配的处理器（排除已尝试过的）"""
+        if not content_type:
+            return []
+        return [
+            cls for cls in self._handlers
+            if cls not in exclude and cls.match_content_type(content_type)
+        ]
+
+    async def resolve(self, url: str, task_id: str, logger) -> UrlHandler:
+        """
+        选择处理器并完成预处理
+
+        Args:
+            url: 目标 URL
+            task_id: 任务 ID
+            logger: TaskLogger 实例
+
+        Returns:
+            完成预处理的处理器实例
+
+        Raises:
+            ValueError: 没有处理器能处理该 URL（未注册默认处理器时）
+        """
+        pending = self.candidates(url)
+        tried: set[type[UrlHandler]] = set()
+        # 已完成预处理、但响应类型属于其他处理器的处理器（改选的处理器都失败时使用）
+        fallback: UrlHandler | None = None
+        try:
+            while pending:
+                handler_cls = pending.pop(0)
+                tried.add(handler_cls)
+                handler = handler_cls(url, task_id)
+                try:
+                    prepared = await handler.prepare(logger)
+                except BaseException:
+                    await handler.cleanup()
+                    raise
+                if not prepared:
+                    await handler.cleanup()
+                    continue
+                rerouted = [] if fallback else self._match_content_type(handler.content_type, tried)
+                if rerouted:
+                    logger.info(f"Content-Type 为 {handler.content_type}，改由 {rerouted[0].__name__} 处理")
+                    fallback, pending = handler, rerouted
+                    continue
+                logger.info(f"URL 处理器: {handler_cls.__name__}")
+                return handler
+            if fallback is not None:
+                handler, fallback = fallback, None
+                logger.info(f"URL 处理器: {type(handler).__name__}")
+                return handler
+        finally:
+            if fallback is not None:
+                await fallback.cleanup()
+        raise ValueError(f"没有处理器能处理该 URL: {url}")
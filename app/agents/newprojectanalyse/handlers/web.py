@@ -1,20 +1,102 @@
 # app/agents/newprojectanalyse/handlers/web.py
+from datetime import datetime
+
 from claude_agent_sdk import AgentDefinition
 
-from app.agents.newprojectanalyse.config import SUBAGENT_MODEL
+from app.agents.newprojectanalyse.config import (
+    SUBAGENT_MODEL,
+    SCRAPE_CACHE_ENABLED,
+    SCRAPE_CACHE_MAX_MB,
+    SCRAPE_CACHE_MAX_AGE_HOURS,
+    SCRAPE_CACHE_FRESH_MINUTES,
+    SCRAPE_CACHE_TIMEOUT,
+    WEB_EXTRACT_ENABLED,
+    WEB_EXTRACT_TIMEOUT,
+    WEB_EXTRACT_MAX_BYTES,
+    WEB_EXTRACT_MIN_CHARS,
+    WEB_EXTRACT_MAX_CHARS,
+)
+from app.agents.newprojectanalyse.handlers.base import UrlHandler
 from app.agents.newprojectanalyse.prompts.web import get_web_prompt
+from app.agents.newprojectanalyse.schema import (
+    WEB_OUTPUT_SCHEMA,
+    web_output_to_blocks,
+    web_server_fields,
+)
+from app.config import DATA_DIR
+from app.services.disk_cache import DiskLRUCache
+from app.services.mcp_pool import mcp_pool
+from app.services.scrape_cache import ScrapeResultCache
+from app.services.web_extract import ExtractionError, UnexpectedContentTypeError, fetch_and_extract
+
+# Firecrawl 抓取经 MCP 服务器池转发时先查缓存，源站确认页面未变化则不再抓取
+if SCRAPE_CACHE_ENABLED:
+    mcp_pool.set_tool_cache("firecrawl", "firecrawl_scrape", ScrapeResultCache(
+        DiskLRUCache(DATA_DIR / "scrape_cache", max_bytes=SCRAPE_CACHE_MAX_MB * 1024 * 1024),
+        max_age=SCRAPE_CACHE_MAX_AGE_HOURS * 3600,
+        fresh_seconds=SCRAPE_CACHE_FRESH_MINUTES * 60,
+        timeout=SCRAPE_CACHE_TIMEOUT,
+        max_bytes=WEB_EXTRACT_MAX_BYTES,
+    ))
 
 
-def get_web_agent_definition(url: str) -> AgentDefinition:
+class WebHandler(UrlHandler):
     """
-    返回 Web 分析 subagent 的定义
+    普通网页（默认处理器）
 
-    Args:
-        url: 网页 URL
+    先在本地抓取并提取正文写入 web_analyser 的 prompt；
+    提取失败（请求失败、正文过短、JavaScript 渲染）时由 web_analyser 调用 Firecrawl 抓取。
     """
-    return AgentDefinition(
-        description="分析网页内容，提取核心信息并总结",
-        prompt=get_web_prompt(url),
-        tools=["mcp__firecrawl__firecrawl_scrape"],
-        model=SUBAGENT_MODEL,
-    )
+
+    AGENT_NAME = "web_analyser"
+    OUTPUT_SCHEMA = WEB_OUTPUT_SCHEMA
+
+    def __init__(self, url: str, task_id: str):
+        super().__init__(url, task_id)
+        self._page_content: str | None = None
+
+    async def prepare(self, logger) -> bool:
+        if not WEB_EXTRACT_ENABLED:
+            return True
+        try:
+            page = await fetch_and_extract(
+                self.url,
+                timeout=WEB_EXTRACT_TIMEOUT,
+                max_bytes=WEB_EXTRACT_MAX_BYTES,
+                min_text_chars=WEB_EXTRACT_MIN_CHARS,
+            )
+            self._page_content = page.to_prompt(WEB_EXTRACT_MAX_CHARS)
+            logger.info(
+                f"本地提取网页正文成功: {len(page.text)} 字符 (HTML {page.html_bytes} 字节)，跳过 Firecrawl"
+            )
+        except UnexpectedContentTypeError as e:
+            # HandlerRegistry 按该类型改选处理器（如 PDF），没有匹配的处理器时仍由 Firecrawl 抓取
+            self.content_type = e.content_type
+            logger.info(f"本地提取网页正文失败: {e}")
+        except ExtractionError as e:
+            logger.info(f"本地提取网页正文失败，由 web_analyser 调用 Firecrawl: {e}")
+        return True
+
+    def get_agent_definition(self) -> AgentDefinition:
+        """
+        未提取到正文时定义与具体 URL 无关（URL 在任务描述中传入），由 subagent 调用 Firecrawl 抓取；
+        提取到正文时直接分析，不再抓取。
+        """
+        return AgentDefinition(
+            description="分析网页内容，提取核心信息并总结（任务描述中需给出 URL）",
+            prompt=get_web_prompt(self._page_content),
+            tools=[] if self._page_content else ["mcp__firecrawl__firecrawl_scrape"],
+            model=SUBAGENT_MODEL,
+        )
+
+    def get_dispatcher_context(self) -> str:
+        if self._page_content:
+            return f"网页正文已预获取，并已提供给 {self.AGENT_NAME}。"
+        return ""
+
+    def use_session_pool(self) -> bool:
+        # 需要 Firecrawl 的网页分析配置与 URL 无关，可复用会话；本地提取了正文的 prompt 带有任务专属内容
+        return self._page_content is None
+
+    def output_to_blocks(self, data: dict, started_at: datetime) -> dict:
+        return web_output_to_blocks(data, web_server_fields(self.url, started_at))
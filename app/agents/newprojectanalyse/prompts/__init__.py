@@ -1,6 +1,14 @@
 # app/agents/newprojectanalyse/prompts/__init__.py
 from app.agents.newprojectanalyse.prompts.dispatcher import get_dispatcher_prompt
+from app.agents.newprojectanalyse.prompts.document import get_document_prompt
 from app.agents.newprojectanalyse.prompts.github import get_github_prompt
+from app.agents.newprojectanalyse.prompts.paper import get_paper_prompt
 from app.agents.newprojectanalyse.prompts.web import get_web_prompt
 
-__all__ = ["get_dispatcher_prompt", "get_github_prompt", "get_web_prompt"]
+__all__ = [
+    "get_dispatcher_prompt",
+    "get_document_prompt",
+    "get_github_prompt",
+    "get_paper_prompt",
+    "get_web_prompt",
+]
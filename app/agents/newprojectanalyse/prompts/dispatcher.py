@@ -1,26 +1,18 @@
 # app/agents/newprojectanalyse/prompts/dispatcher.py
 
-def get_dispatcher_prompt(url: str, github_content: tuple[str, str, str] | None) -> str:
+
+def get_dispatcher_prompt(url: str, agent_name: str, context: str = "") -> str:
     """
     入口 agent 的分发 prompt
 
+    分析方式由 URL 处理器在预处理阶段确定，分发器只需调用对应的 analyser；
+    预获取的内容只放在 analyser 的 prompt 中，避免同一份内容在一次任务中发送两次。
+
     Args:
         url: 目标 URL
-        github_content: GitHub 仓库内容 (summary, tree, content)，如果是 GitHub URL 且预获取成功
+        agent_name: 负责该 URL 的 analyser 名称
+        context: 预处理情况说明（如"内容已预获取"）
     """
-    context = ""
-    if github_content:
-        summary, _tree, content = github_content
-        context = f"""
-## 预获取的 GitHub 仓库内容
-
-### 概要
-{summary}
-
-### 文件内容
-{content}
-"""
-
     return f"""
 请分析以下 URL：{url}
 
@@ -28,17 +20,11 @@ def get_dispatcher_prompt(url: str, github_content: tuple[str, str, str] | None)
 
 ## 任务
 
-根据 URL 类型选择合适的分析方式：
-
-1. 如果是 GitHub 仓库（已提供预获取内容），调用 github_analyser
-2. 如果是普通网页，调用 web_analyser
+调用 {agent_name} 完成分析，任务描述中必须写明 URL: {url}
 
-调用对应的 subagent 完成分析，将其返回的结果直接作为最终输出。
+将其返回的结果直接作为最终输出。
 
 ## 输出格式
 
-将 subagent 返回的 JSON 结果原样输出，格式：
-```json
-{{"title": "...", "blocks": [...]}}
-```
+将 subagent 返回的 JSON 结果原样输出（URL、日期等字段由系统补充，无需添加）。
 """
@@ -0,0 +1,51 @@
+# app/agents/newprojectanalyse/prompts/document.py
+
+
+def get_document_prompt(kind: str, content: str) -> str:
+    """
+    获取文档（PDF、源码文件、Gist 等）分析的 Prompt
+
+    文档内容已在本地获取并附在 prompt 末尾，subagent 无需调用任何工具。
+    输出结构与网页分析相同；URL、日期和任务时间由服务端填入输出。
+
+    Args:
+        kind: 文档类型描述（如 "PDF 文档"、"GitHub 上的源码文件"）
+        content: 文档内容（开头为 URL、标题等信息）
+    """
+    return f"""
+请分析本 prompt 末尾给出的{kind}（已预先获取，无需再次抓取），完成以下任务：
+
+1. 识别文档的名称或主题，并生成一个简洁的中文标题（10字以内）
+
+2. 阅读全文，提取核心信息并总结；源码和配置文件需说明其用途、主要结构和关键实现
+
+3. 返回以下 JSON 结构（URL 和日期由系统填入，无需提供）：
+
+{{
+  "title": "文档名称-中文标题",
+  "overview": "内容概述（100-200字），介绍文档的主要内容...",
+  "key_points": [
+    "核心要点1",
+    "核心要点2",
+    "核心要点3",
+    "核心要点4",
+    "核心要点5"
+  ],
+  "detailed_summary": "200-300字的详细总结，包含主要观点、关键信息等...",
+  "content_structure": [
+    {{"section": "主要章节或模块1", "children": ["子内容1.1", "子内容1.2"]}},
+    {{"section": "主要章节或模块2", "children": ["子内容2.1", "子内容2.2"]}}
+  ]
+}}
+
+**重要:**
+- title 格式必须为: "文档名称-中文标题"（不要加日期）
+- key_points 必须包含 3-7 个要点
+- content_structure 描述文档的章节结构，源码文件按类、函数等模块描述
+
+## 文档内容
+
+<document>
+{content}
+</document>
+"""
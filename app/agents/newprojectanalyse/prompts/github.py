@@ -1,41 +1,58 @@
 # app/agents/newprojectanalyse/prompts/github.py
-from datetime import datetime
 
+# prompt 中最多列出的文件路径数（其余通过 list_files 查看）
+MAX_LISTED_FILES = 200
 
-def get_github_prompt(url: str, summary: str, content: str) -> str:
-    """获取 GitHub 仓库分析的 Prompt"""
-    current_date = datetime.now().strftime("%Y%m%d")
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def get_github_prompt(url: str, summary: str, files: list[str], subpath: str = "") -> str:
+    """
+    获取 GitHub 仓库分析的 Prompt
+
+    仓库文件内容不内联到 prompt 中，由 subagent 通过 repo 工具按需检索；
+    prompt 中只列出存储中的文件路径（最多 MAX_LISTED_FILES 个），大小与仓库大小基本无关。
+    URL、日期、任务时间、统计信息和项目结构由服务端填入输出。
+
+    Args:
+        url: 仓库 URL
+        summary: gitingest 获取的仓库概要（含文件筛选说明）
+        files: 仓库存储中的文件路径（按重要性排序）
+        subpath: URL 指向的子目录，为空时分析整个仓库
+    """
+    listed = "\n".join(f"- {path}" for path in files[:MAX_LISTED_FILES])
+    if len(files) > MAX_LISTED_FILES:
+        listed += f"\n- …另有 {len(files) - MAX_LISTED_FILES} 个文件，可用 mcp__repo__list_files 查看"
+    scope = f"""
+分析范围为仓库中的 `{subpath}/` 目录（仓库存储中只包含该目录的文件），请把该目录当作独立项目分析。
+""" if subpath else ""
     return f"""
 请分析以下 GitHub 仓库：{url}
-
+{scope}
 ## 仓库信息（由 gitingest 获取）
 
 ### 概要
 {summary}
 
-### 文件内容
-{content}
+### 文件访问
 
-## 任务
+本地存储只包含 gitingest 按 include 规则获取、并在 token 预算内筛选出的文件（见概要末尾的筛选说明），
+不是完整仓库，存储之外的源码无法读取。文件内容不在本 prompt 中，请按需检索：
+- mcp__repo__list_files: 列出文件（可用 glob 过滤，如 "*.md"、"src/*"）
+- mcp__repo__grep: 搜索文件内容（默认按字面匹配，regex=true 时按正则表达式）
+- mcp__repo__read_file: 读取文件，大文件可用 offset/length 分段读取
+
+可读取的文件（按重要性排序）：
+{listed}
 
-1. 从 URL 中提取 owner 和 repo，使用 GitHub API 获取项目统计信息：
-   - 访问 https://api.github.com/repos/{{owner}}/{{repo}} 获取 star、fork 数量
-   - 访问 https://api.github.com/repos/{{owner}}/{{repo}}/commits?per_page=1 获取最后 commit 时间
+建议先阅读 README 和依赖清单（package.json、pyproject.toml 等），再从上述文件中选择需要的查看。
 
-2. 深入分析仓库内容，提取以下信息
+## 任务
+
+1. 深入分析仓库内容，提取以下信息
 
-3. 返回以下 JSON 结构：
+2. 返回以下 JSON 结构（URL、日期、star/fork 统计和目录结构由系统填入，无需提供）：
 
 {{
-  "title": "项目名称-中文标题-{current_date}",
-  "url": "{url}",
-  "stats": {{
-    "stars": 1234,
-    "forks": 567,
-    "last_commit": "2024-01-01"
-  }},
+  "title": "项目名称-中文标题",
   "overview": "项目概述（100-200字），介绍项目是什么、解决什么问题、核心价值...",
   "core_features": [
     "功能1: 详细描述",
@@ -49,10 +66,6 @@ def get_github_prompt(url: str, summary: str, content: str) -> str:
     "infrastructure": ["PostgreSQL", "Redis", "Docker"],
     "tools": ["esbuild", "Vite", "pnpm"]
   }},
-  "architecture": [
-    {{"module": "src/", "children": ["cli.ts - 命令行入口", "index.ts - 主模块", "utils/ - 工具函数"]}},
-    {{"module": "ui/", "children": ["components/ - UI组件", "hooks/ - React Hooks"]}}
-  ],
   "key_config": [
     {{"name": "配置项1", "description": "配置说明和用途"}},
     {{"name": "配置项2", "description": "配置说明和用途"}}
@@ -71,8 +84,7 @@ def get_github_prompt(url: str, summary: str, content: str) -> str:
     "requirements": "环境要求，如 Node.js >= 18、Python 3.10+ 等",
     "install_steps": "安装步骤，如 npm install 或 pip install -r requirements.txt",
     "start_command": "启动命令，如 npm start 或 python main.py"
-  }},
-  "task_time": "{current_time}"
+  }}
 }}
 
 ## 字段说明
@@ -83,19 +95,16 @@ def get_github_prompt(url: str, summary: str, content: str) -> str:
   - frameworks: 框架和主要依赖库
   - infrastructure: 数据库、缓存、消息队列等基础设施（如果有）
   - tools: 构建工具、开发工具
-- **architecture**: 项目的目录结构和模块划分，帮助理解代码组织
 - **key_config**: 项目的关键配置项，如环境变量、配置文件中的重要设置
 - **highlights**: 项目的设计亮点、创新点或独特之处（3-7个）
 - **key_commands**: 常用的命令，从 package.json scripts、Makefile、README 中提取
 
 ## 重要提示
 
-- 使用 mcp__fetch__fetch 工具访问 GitHub API 获取统计信息
-- title 格式必须为: "项目名称-中文标题-{current_date}"（中文标题10字以内）
-- stats 中的数据必须从 GitHub API 实际获取
+- 仓库内容只能通过 mcp__repo__* 工具读取，且只能读取存储中的文件（见上面的列表或 list_files）
+- title 格式必须为: "项目名称-中文标题"（中文标题10字以内，不要加日期）
 - core_features 要尽可能完整，不要遗漏重要功能
 - tech_stack 中 infrastructure 和 tools 如果项目中没有可以为空数组
 - key_config 从配置文件、README、环境变量说明中提取
 - key_commands 从 package.json scripts、Makefile、README 命令说明中提取
-- task_time 已预设为 {current_time}
 """
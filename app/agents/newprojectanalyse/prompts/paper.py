@@ -0,0 +1,51 @@
+# app/agents/newprojectanalyse/prompts/paper.py
+
+
+def get_paper_prompt(content: str) -> str:
+    """
+    获取论文分析的 Prompt
+
+    论文元数据和正文已在本地获取并附在 prompt 末尾，subagent 无需调用任何工具。
+    作者、分类、发布日期、URL 和任务时间由服务端填入输出。
+
+    Args:
+        content: 论文元数据（标题、作者、摘要）和提取的正文
+    """
+    return f"""
+请分析本 prompt 末尾给出的学术论文（元数据和正文已预先获取，无需再次抓取），完成以下任务：
+
+1. 生成一个简洁的中文标题（10字以内），论文简称优先使用论文中提出的方法或模型名称
+
+2. 阅读摘要和正文，提炼研究问题、方法、实验结果和局限性
+
+3. 返回以下 JSON 结构（作者、分类、日期等元数据由系统填入，无需提供）：
+
+{{
+  "title": "论文简称-中文标题",
+  "overview": "论文概述（100-200字）：研究什么问题、用什么方法、得到什么结论...",
+  "contributions": [
+    "贡献1",
+    "贡献2",
+    "贡献3"
+  ],
+  "method": "方法概述（150-300字），说明核心思路、模型结构或算法流程...",
+  "results": [
+    "关键结果1（尽量包含数据集、指标和具体数值）",
+    "关键结果2"
+  ],
+  "limitations": [
+    "局限性或未来工作1"
+  ]
+}}
+
+**重要:**
+- title 格式必须为: "论文简称-中文标题"（不要加日期）
+- contributions 列出 2-7 项，results 列出 1-7 项
+- 只提取正文中有依据的内容；正文未提取到的部分（如只有摘要）可据摘要概括，limitations 可为空数组
+
+## 论文内容
+
+<paper>
+{content}
+</paper>
+"""
@@ -1,26 +1,34 @@
 # app/agents/newprojectanalyse/prompts/web.py
-from datetime import datetime
 
 
-def get_web_prompt(url: str) -> str:
-    """获取网页分析的 Prompt"""
-    current_date = datetime.now().strftime("%Y%m%d")
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+SCRAPE_STEP = "1. 使用 mcp__firecrawl__firecrawl_scrape 工具抓取该 URL 的内容"
+PAGE_CONTENT_STEP = "1. 阅读本 prompt 末尾「网页内容」部分（已预先抓取并提取正文，无需再次抓取）"
 
-    return f"""
-请完成以下任务：
 
-1. 使用 mcp__firecrawl__firecrawl_scrape 工具抓取这个 URL 的内容：{url}
+def get_web_prompt(page_content: str | None = None) -> str:
+    """
+    获取网页分析的 Prompt
+
+    未预先提取网页内容时与具体任务无关：URL 写在任务描述中（由分发器或直接执行模式给出），
+    因此所有网页分析任务的 Agent 配置相同，可以复用会话池中的会话。
+    URL、日期和任务时间由服务端填入输出。
+
+    Args:
+        page_content: 本地提取的网页正文，为空时由 subagent 调用 Firecrawl 抓取
+    """
+    prompt = """
+任务描述中会给出 URL，请完成以下任务：
+
+""" + (PAGE_CONTENT_STEP if page_content else SCRAPE_STEP) + """
 
 2. 识别网站/文章的名称，并生成一个简洁的中文标题（10字以内）
 
 3. 分析网页内容，提取核心信息并总结
 
-4. 返回以下 JSON 结构：
+4. 返回以下 JSON 结构（URL 和日期由系统填入，无需提供）：
 
-{{
-  "title": "网站名称-中文标题-{current_date}",
-  "url": "{url}",
+{
+  "title": "网站名称-中文标题",
   "overview": "内容概述（100-200字），介绍网页的主要内容...",
   "key_points": [
     "核心要点1",
@@ -31,15 +39,22 @@ def get_web_prompt(url: str) -> str:
   ],
   "detailed_summary": "200-300字的详细总结，包含主要观点、关键信息等...",
   "content_structure": [
-    {{"section": "主要章节1", "children": ["子内容1.1", "子内容1.2"]}},
-    {{"section": "主要章节2", "children": ["子内容2.1", "子内容2.2"]}}
-  ],
-  "task_time": "{current_time}"
-}}
+    {"section": "主要章节1", "children": ["子内容1.1", "子内容1.2"]},
+    {"section": "主要章节2", "children": ["子内容2.1", "子内容2.2"]}
+  ]
+}
 
 **重要:**
-- title 格式必须为: "网站名称-中文标题-{current_date}"
+- title 格式必须为: "网站名称-中文标题"（不要加日期）
 - key_points 必须包含 3-7 个要点
 - content_structure 描述网页的内容结构层次
-- task_time 已预设为 {current_time}
 """
+    if page_content:
+        prompt += f"""
+## 网页内容（本地提取的正文，导航、页脚等已去除）
+
+<page_content>
+{page_content}
+</page_content>
+"""
+    return prompt
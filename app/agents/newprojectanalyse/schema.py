@@ -1,5 +1,13 @@
 # app/agents/newprojectanalyse/schema.py
 """NewProjectAnalyse Agent 输出 JSON Schema 定义"""
+import re
+from datetime import datetime
+
+# 分析结果分为两部分：
+# - 模型生成部分（*_OUTPUT_SCHEMA）：只包含需要理解内容才能给出的字段
+# - 服务端生成部分（*_server_fields）：URL、日期、任务时间，以及 GitHub 的统计信息和项目结构、
+#   论文的作者和分类等元数据
+# *_output_to_blocks 合并两部分后生成 Notion blocks
 
 # GitHub 项目分析专用 Schema
 # 使用具体字段而非自由 blocks 数组，确保输出内容符合预期
@@ -10,21 +18,7 @@ GITHUB_OUTPUT_SCHEMA = {
         "properties": {
             "title": {
                 "type": "string",
-                "description": "页面标题，格式: 项目名称-中文标题-日期"
-            },
-            "url": {
-                "type": "string",
-                "description": "GitHub 仓库 URL"
-            },
-            "stats": {
-                "type": "object",
-                "description": "GitHub 统计信息",
-                "properties": {
-                    "stars": {"type": "integer", "description": "Star 数量"},
-                    "forks": {"type": "integer", "description": "Fork 数量"},
-                    "last_commit": {"type": "string", "description": "最后提交时间"}
-                },
-                "required": ["stars", "forks", "last_commit"]
+                "description": "页面标题，格式: 项目名称-中文标题（日期由系统追加）"
             },
             "overview": {
                 "type": "string",
@@ -64,22 +58,6 @@ GITHUB_OUTPUT_SCHEMA = {
                 },
                 "required": ["languages", "frameworks"]
             },
-            "architecture": {
-                "type": "array",
-                "description": "项目架构/模块结构",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "module": {"type": "string", "description": "主模块名"},
-                        "children": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "子模块列表"
-                        }
-                    },
-                    "required": ["module", "children"]
-                }
-            },
             "key_config": {
                 "type": "array",
                 "description": "关键配置要素",
@@ -120,16 +98,12 @@ GITHUB_OUTPUT_SCHEMA = {
                     "start_command": {"type": "string", "description": "启动命令"}
                 },
                 "required": ["requirements", "install_steps", "start_command"]
-            },
-            "task_time": {
-                "type": "string",
-                "description": "任务完成时间"
             }
         },
         "required": [
-            "title", "url", "stats", "overview", "core_features",
-            "tech_stack", "architecture", "key_config", "highlights",
-            "key_commands", "deployment", "task_time"
+            "title", "overview", "core_features",
+            "tech_stack", "key_config", "highlights",
+            "key_commands", "deployment"
         ],
         "additionalProperties": False
     }
@@ -143,11 +117,7 @@ WEB_OUTPUT_SCHEMA = {
         "properties": {
             "title": {
                 "type": "string",
-                "description": "页面标题，格式: 网站名称-中文标题-日期"
-            },
-            "url": {
-                "type": "string",
-                "description": "网页 URL"
+                "description": "页面标题，格式: 网站名称-中文标题（日期由系统追加）"
             },
             "overview": {
                 "type": "string",
@@ -179,24 +149,160 @@ WEB_OUTPUT_SCHEMA = {
                     },
                     "required": ["section", "children"]
                 }
+            }
+        },
+        "required": [
+            "title", "overview", "key_points",
+            "detailed_summary", "content_structure"
+        ],
+        "additionalProperties": False
+    }
+}
+
+# 论文分析专用 Schema（作者、分类、发布日期等元数据由服务端填入）
+PAPER_OUTPUT_SCHEMA = {
+    "type": "json_schema",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "页面标题，格式: 论文简称-中文标题（日期由系统追加）"
+            },
+            "overview": {
+                "type": "string",
+                "description": "论文概述（100-200字）：研究的问题、方法和结论"
+            },
+            "contributions": {
+                "type": "array",
+                "description": "主要贡献",
+                "items": {"type": "string"},
+                "minItems": 2,
+                "maxItems": 7
             },
-            "task_time": {
+            "method": {
                 "type": "string",
-                "description": "任务完成时间"
+                "description": "方法概述（150-300字）"
+            },
+            "results": {
+                "type": "array",
+                "description": "关键实验结果和结论",
+                "items": {"type": "string"},
+                "minItems": 1,
+                "maxItems": 7
+            },
+            "limitations": {
+                "type": "array",
+                "description": "局限性和未来工作",
+                "items": {"type": "string"},
+                "maxItems": 5
             }
         },
         "required": [
-            "title", "url", "overview", "key_points",
-            "detailed_summary", "content_structure", "task_time"
+            "title", "overview", "contributions",
+            "method", "results", "limitations"
         ],
         "additionalProperties": False
     }
 }
 
 
-def github_output_to_blocks(data: dict) -> dict:
-    """将 GitHub schema 输出转换为 Notion blocks 格式"""
-    stats = data.get("stats", {})
+MAX_STRUCTURE_CHILDREN = 15  # 项目结构中每个顶层目录最多列出的子项数
+
+# gitingest 目录树的一行：每层缩进 4 个字符，之后是 "├── " 或 "└── " 和名称（目录以 / 结尾）
+_TREE_LINE_PATTERN = re.compile(r"^((?:│   |    )*)(?:├── |└── )(.+)$")
+_TITLE_DATE_PATTERN = re.compile(r"[-\s]*\d{8}$")
+
+
+def tree_to_architecture(tree: str) -> list[dict]:
+    """
+    由 gitingest 目录树生成项目结构
+
+    每个顶层目录一项，children 为其直接子项；顶层文件归入"根目录"。
+
+    Returns:
+        [{"module": "src/", "children": ["cli.ts", "utils/"]}]
+    """
+    root_files: list[str] = []
+    modules: list[dict] = []
+    current = None
+    for line in tree.splitlines():
+        match = _TREE_LINE_PATTERN.match(line)
+        if not match:
+            continue
+        depth = len(match.group(1)) // 4
+        name = match.group(2)
+        if depth == 1:
+            if name.endswith("/"):
+                current = {"module": name, "children": []}
+                modules.append(current)
+            else:
+                current = None
+                root_files.append(name)
+        elif depth == 2 and current is not None:
+            current["children"].append(name)
+
+    if root_files:
+        modules.insert(0, {"module": "根目录", "children": root_files})
+    for module in modules:
+        children = module["children"]
+        if len(children) > MAX_STRUCTURE_CHILDREN:
+            module["children"] = children[:MAX_STRUCTURE_CHILDREN] + [f"… 等 {len(children)} 项"]
+    return modules
+
+
+def web_server_fields(url: str, started_at: datetime) -> dict:
+    """网页分析中由服务端生成的字段"""
+    return {
+        "url": url,
+        "date": started_at.strftime("%Y%m%d"),
+        "task_time": started_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def github_server_fields(url: str, started_at: datetime, stats: dict | None, tree: str) -> dict:
+    """
+    GitHub 分析中由服务端生成的字段
+
+    Args:
+        url: 仓库 URL
+        started_at: 任务开始时间（标题日期和任务时间）
+        stats: GitHub API 获取的统计信息，获取失败时为 None
+        tree: gitingest 目录树
+    """
+    return {
+        **web_server_fields(url, started_at),
+        "stats": stats or {"stars": "N/A", "forks": "N/A", "last_commit": "N/A"},
+        "architecture": tree_to_architecture(tree),
+    }
+
+
+def paper_server_fields(url: str, started_at: datetime, metadata: dict | None) -> dict:
+    """
+    论文分析中由服务端生成的字段
+
+    Args:
+        url: 论文 URL
+        started_at: 任务开始时间
+        metadata: 论文元数据（title、authors、published、categories 等），获取失败时为 None
+    """
+    return {**web_server_fields(url, started_at), "metadata": metadata or {}}
+
+
+def _dated_title(title: str, date: str) -> str:
+    """标题追加日期（模型自行加了日期时先去掉）"""
+    return f"{_TITLE_DATE_PATTERN.sub('', title.strip())}-{date}"
+
+
+def github_output_to_blocks(data: dict, server_fields: dict) -> dict:
+    """
+    合并模型输出和服务端字段，转换为 Notion blocks 格式
+
+    Args:
+        data: 模型按 GITHUB_OUTPUT_SCHEMA 生成的输出
+        server_fields: github_server_fields() 的结果
+    """
+    stats = server_fields["stats"]
     stats_text = f"⭐ Stars: {stats.get('stars', 'N/A')} | 🍴 Forks: {stats.get('forks', 'N/A')} | 📅 最后提交: {stats.get('last_commit', 'N/A')}"
 
     # 技术架构文本
@@ -224,7 +330,7 @@ def github_output_to_blocks(data: dict) -> dict:
     ]
 
     blocks = [
-        {"type": "bookmark", "url": data["url"]},
+        {"type": "bookmark", "url": server_fields["url"]},
         {"type": "callout", "content": stats_text, "emoji": "📊"},
         {"type": "divider"},
         # 项目概述
@@ -240,7 +346,7 @@ def github_output_to_blocks(data: dict) -> dict:
         {"type": "heading_1", "content": "项目结构"},
         {"type": "bulleted_list", "items": [
             {"text": item["module"], "children": item["children"]}
-            for item in data.get("architecture", [])
+            for item in server_fields["architecture"]
         ]},
         # 关键配置要素
         {"type": "heading_1", "content": "关键配置要素"},
@@ -259,16 +365,22 @@ def github_output_to_blocks(data: dict) -> dict:
             f"启动命令: {data['deployment']['start_command']}"
         ]},
         {"type": "divider"},
-        {"type": "paragraph", "content": f"任务时间: {data['task_time']}"}
+        {"type": "paragraph", "content": f"任务时间: {server_fields['task_time']}"}
     ]
 
-    return {"title": data["title"], "blocks": blocks}
+    return {"title": _dated_title(data["title"], server_fields["date"]), "blocks": blocks}
+
 
+def web_output_to_blocks(data: dict, server_fields: dict) -> dict:
+    """
+    合并模型输出和服务端字段，转换为 Notion blocks 格式
 
-def web_output_to_blocks(data: dict) -> dict:
-    """将 Web schema 输出转换为 Notion blocks 格式"""
+    Args:
+        data: 模型按 WEB_OUTPUT_SCHEMA 生成的输出
+        server_fields: web_server_fields() 的结果
+    """
     blocks = [
-        {"type": "bookmark", "url": data["url"]},
+        {"type": "bookmark", "url": server_fields["url"]},
         {"type": "divider"},
         {"type": "heading_1", "content": "内容概述"},
         {"type": "paragraph", "content": data["overview"]},
@@ -282,10 +394,63 @@ def web_output_to_blocks(data: dict) -> dict:
             for item in data.get("content_structure", [])
         ]},
         {"type": "divider"},
-        {"type": "paragraph", "content": f"任务时间: {data['task_time']}"}
+        {"type": "paragraph", "content": f"任务时间: {server_fields['task_time']}"}
+    ]
+
+    return {"title": _dated_title(data["title"], server_fields["date"]), "blocks": blocks}
+
+
+MAX_PAPER_AUTHORS = 8  # 元数据中最多列出的作者数
+
+
+def paper_output_to_blocks(data: dict, server_fields: dict) -> dict:
+    """
+    合并模型输出和服务端字段，转换为 Notion blocks 格式
+
+    Args:
+        data: 模型按 PAPER_OUTPUT_SCHEMA 生成的输出
+        server_fields: paper_server_fields() 的结果
+    """
+    metadata = server_fields["metadata"]
+    meta_items = []
+    if metadata.get("title"):
+        meta_items.append(f"原标题: {metadata['title']}")
+    authors = metadata.get("authors") or []
+    if authors:
+        shown = ", ".join(authors[:MAX_PAPER_AUTHORS])
+        if len(authors) > MAX_PAPER_AUTHORS:
+            shown += f" 等 {len(authors)} 人"
+        meta_items.append(f"作者: {shown}")
+    if metadata.get("published"):
+        meta_items.append(f"发布: {metadata['published']}")
+    if metadata.get("categories"):
+        meta_items.append(f"分类: {', '.join(metadata['categories'])}")
+
+    blocks = [{"type": "bookmark", "url": server_fields["url"]}]
+    if meta_items:
+        blocks.append({"type": "callout", "content": "\n".join(meta_items), "emoji": "📄"})
+    blocks += [
+        {"type": "divider"},
+        {"type": "heading_1", "content": "论文概述"},
+        {"type": "paragraph", "content": data["overview"]},
+        {"type": "heading_1", "content": "主要贡献"},
+        {"type": "bulleted_list", "items": data.get("contributions", [])},
+        {"type": "heading_1", "content": "方法"},
+        {"type": "paragraph", "content": data["method"]},
+        {"type": "heading_1", "content": "实验与结论"},
+        {"type": "bulleted_list", "items": data.get("results", [])},
+    ]
+    if data.get("limitations"):
+        blocks += [
+            {"type": "heading_1", "content": "局限性"},
+            {"type": "bulleted_list", "items": data["limitations"]},
+        ]
+    blocks += [
+        {"type": "divider"},
+        {"type": "paragraph", "content": f"任务时间: {server_fields['task_time']}"}
     ]
 
-    return {"title": data["title"], "blocks": blocks}
+    return {"title": _dated_title(data["title"], server_fields["date"]), "blocks": blocks}
 
 
 # 保留旧的通用 schema 用于向后兼容
@@ -0,0 +1,261 @@
+# app/agents/newprojectanalyse/selection.py
+import hashlib
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+# 根目录 README
+_README_PATTERN = re.compile(r"^readme(\.[\w-]+)?$", re.IGNORECASE)
+# 依赖/构建清单
+MANIFEST_FILES = {
+    "package.json", "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt",
+    "cargo.toml", "go.mod", "pom.xml", "build.gradle", "build.gradle.kts",
+    "gemfile", "composer.json", "mix.exs", "pubspec.yaml",
+}
+# 部署/构建入口
+BUILD_FILES = {"dockerfile", "makefile", "justfile", "procfile"}
+_BUILD_PATTERN = re.compile(r"^(docker-compose.*\.ya?ml|compose\.ya?ml|dockerfile\..+)$", re.IGNORECASE)
+# 项目说明类文档
+DOC_STEMS = {"changelog", "contributing", "license", "architecture", "security"}
+# 价值较低的目录：测试数据、快照、翻译等
+LOW_VALUE_DIRS = {
+    "test", "tests", "__tests__", "spec", "fixtures", "__fixtures__", "testdata",
+    "__snapshots__", "snapshots", "mocks", "__mocks__", "examples", "example",
+    "locales", "locale", "i18n", "translations", "l10n", "vendor", "third_party",
+}
+# 翻译文档的语言代码（目录 docs/zh-CN/ 或后缀 README.zh-CN.md，不含英文）
+TRANSLATION_LANGS = {
+    "zh", "ja", "ko", "fr", "de", "es", "ru", "pt", "it", "vi", "tr", "ar",
+    "pl", "nl", "th", "uk", "fa", "he", "cs", "sv", "hi", "bn",
+}
+_LANG_CODE_PATTERN = re.compile(r"^([a-z]{2})(?:[-_][a-z]{2,4})?$")
+
+MIN_DUPLICATE_TOKENS = 50  # 过短的文件不做近似重复判断（指纹不可靠）
+MAX_FINGERPRINT_CHARS = 20000  # 只对文件开头部分计算指纹
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4  # 分段数，汉明距离 < 分段数的指纹至少有一段完全相同
+NEAR_DUPLICATE_DISTANCE = 3  # 汉明距离不超过该值视为近似重复
+
+
+class RepoBudgetExceededError(Exception):
+    """必要文件（README、依赖清单）超过 token 预算"""
+    pass
+
+
+@dataclass(slots=True)
+class RepoFile:
+    """待筛选的仓库文件"""
+    path: str
+    text: str
+    tokens: int = 0
+    tier: int = 0  # 重要性分级，越小越重要
+    fingerprint: int = 0
+
+
+@dataclass
+class SelectionResult:
+    """筛选结果"""
+    files: list[tuple[str, str]]  # [(path, text)]，按重要性排序
+    total_files: int
+    total_tokens: int
+    selected_tokens: int
+    duplicates: list[str] = field(default_factory=list)  # 被合并的近似重复文件
+    dropped: list[str] = field(default_factory=list)  # 超出预算被丢弃的文件
+
+    def describe(self) -> str:
+        """生成写入 prompt 的筛选说明"""
+        return (
+            f"Selected files: {len(self.files)}/{self.total_files} "
+            f"(~{self.selected_tokens} of ~{self.total_tokens} tokens; "
+            f"{len(self.duplicates)} near-duplicates merged, "
+            f"{len(self.dropped)} low-priority files dropped)"
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算 token 数（不依赖 tokenizer）
+
+    ASCII 字符约 4 个一个 token，非 ASCII 字符（中日韩文字等）约 1 个一个 token。
+    """
+    non_ascii = len(text) - len(text.encode("ascii", "ignore"))
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def file_tier(path: str) -> int:
+    """
+    文件重要性分级
+
+    0: 根目录 README
+    1: 根目录依赖清单
+    2: 根目录构建/部署文件
+    3: 根目录其他文档
+    4: docs/ 下的文档
+    5: 其他浅层文件（深度 ≤ 2）
+    6: 更深层的文件
+    7: 测试数据、快照、翻译、vendor 等低价值目录中的文件
+    """
+    parts = PurePosixPath(path).parts
+    name = parts[-1]
+    lower = name.lower()
+    depth = len(parts) - 1
+    dirs = {p.lower() for p in parts[:-1]}
+
+    if dirs & LOW_VALUE_DIRS or _is_translation(parts):
+        return 7
+    if depth == 0:
+        if _README_PATTERN.match(name):
+            return 0
+        if lower in MANIFEST_FILES:
+            return 1
+        if lower in BUILD_FILES or _BUILD_PATTERN.match(name):
+            return 2
+        if lower.split(".")[0] in DOC_STEMS or lower.endswith(".md"):
+            return 3
+    if parts[0].lower() == "docs" and lower.endswith(".md"):
+        return 4
+    return 5 if depth <= 2 else 6
+
+
+def _is_lang_code(value: str) -> bool:
+    match = _LANG_CODE_PATTERN.match(value.lower())
+    return bool(match) and match.group(1) in TRANSLATION_LANGS
+
+
+def _is_translation(parts: tuple[str, ...]) -> bool:
+    """判断是否为翻译文档（语言目录或语言后缀）"""
+    stem = PurePosixPath(parts[-1]).stem
+    if "." in stem and _is_lang_code(stem.rsplit(".", 1)[1]):
+        return True
+    return any(_is_lang_code(p) for p in parts[:-1])
+
+
+def simhash(text: str) -> int:
+    """
+    基于单词 3-gram 的 64 位 SimHash 指纹
+
+    按字节位置统计各字节值出现次数（Counter 在 C 层计数），避免对每个 3-gram 逐位循环。
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < 3:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + 3]) for i in range(len(words) - 2)]
+
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles
+    )
+    ones = [0] * SIMHASH_BITS
+    for pos in range(8):
+        # 大端序：第 pos 个字节对应第 (7 - pos) * 8 起的 8 位
+        base = (7 - pos) * 8
+        for value, count in Counter(digests[pos::8]).items():
+            for bit in range(8):
+                if value >> bit & 1:
+                    ones[base + bit] += count
+    # 某位为 1 的 3-gram 超过半数时该位取 1
+    return sum(1 << bit for bit, n in enumerate(ones) if 2 * n > len(shingles))
+
+
+def _exact_key(text: str) -> bytes:
+    """忽略空白差异的内容摘要（精确重复的快速判断）"""
+    return hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=16).digest()
+
+
+class _NearDuplicateIndex:
+    """
+    近似重复判断
+
+    按指纹分段建立桶，只比较至少一段相同的文件，避免两两比较。
+    """
+
+    def __init__(self):
+        self._band_bits = SIMHASH_BITS // SIMHASH_BANDS
+        self._mask = (1 << self._band_bits) - 1
+        self._buckets: dict[tuple[int, int], list[int]] = {}
+
+    def _keys(self, fingerprint: int) -> list[tuple[int, int]]:
+        return [
+            (band, fingerprint >> (band * self._band_bits) & self._mask)
+            for band in range(SIMHASH_BANDS)
+        ]
+
+    def check_and_add(self, fingerprint: int) -> bool:
+        """与已加入的指纹近似重复时返回 True，否则加入索引并返回 False"""
+        keys = self._keys(fingerprint)
+        if any(
+            bin(other ^ fingerprint).count("1") <= NEAR_DUPLICATE_DISTANCE
+            for key in keys
+            for other in self._buckets.get(key, ())
+        ):
+            return True
+        for key in keys:
+            self._buckets.setdefault(key, []).append(fingerprint)
+        return False
+
+
+def select_repo_files(files: list[tuple[str, str]], token_budget: int) -> SelectionResult:
+    """
+    按重要性筛选仓库文件，控制在 token 预算内
+
+    1. 估算每个文件的 token 数并分级排序（同级按深度、大小）
+    2. 按顺序装入预算，装不下的文件丢弃（小文件仍可继续装入）
+    3. 装得下的文件与已选文件重复（翻译文档、模板化的 fixture 等）时合并，保留排序靠前的一份
+
+    Args:
+        files: [(path, text)]，gitingest 拆分后的文件
+        token_budget: token 预算，0 表示不限制
+
+    Returns:
+        SelectionResult
+
+    Raises:
+        RepoBudgetExceededError: 根目录 README 和依赖清单本身就超过预算
+    """
+    candidates = [
+        RepoFile(path=path, text=text, tokens=estimate_tokens(text), tier=file_tier(path))
+        for path, text in files
+    ]
+    total_tokens = sum(f.tokens for f in candidates)
+    candidates.sort(key=lambda f: (f.tier, f.path.count("/"), f.tokens, f.path))
+
+    essential_tokens = sum(f.tokens for f in candidates if f.tier <= 1)
+    if token_budget and essential_tokens > token_budget:
+        raise RepoBudgetExceededError(
+            f"README 和依赖清单约 {essential_tokens} tokens，超过预算 {token_budget} tokens"
+        )
+
+    # 按顺序装入预算；只对装得下的文件判断重复（先精确摘要，再计算 SimHash），
+    # 超出预算的大量低价值文件（fixture、快照）不计算指纹
+    selected: list[RepoFile] = []
+    dropped: list[str] = []
+    duplicates: list[str] = []
+    exact_seen: set[bytes] = set()
+    near_index = _NearDuplicateIndex()
+    used = 0
+    for f in candidates:
+        if token_budget and used + f.tokens > token_budget:
+            dropped.append(f.path)
+            continue
+        if f.tokens >= MIN_DUPLICATE_TOKENS:
+            exact = _exact_key(f.text)
+            if exact in exact_seen:
+                duplicates.append(f.path)
+                continue
+            exact_seen.add(exact)
+            f.fingerprint = simhash(f.text[:MAX_FINGERPRINT_CHARS])
+            if near_index.check_and_add(f.fingerprint):
+                duplicates.append(f.path)
+                continue
+        selected.append(f)
+        used += f.tokens
+
+    return SelectionResult(
+        files=[(f.path, f.text) for f in selected],
+        total_files=len(candidates),
+        total_tokens=total_tokens,
+        selected_tokens=used,
+        duplicates=duplicates,
+        dropped=dropped,
+    )
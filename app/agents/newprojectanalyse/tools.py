@@ -0,0 +1,131 @@
+# app/agents/newprojectanalyse/tools.py
+import asyncio
+import re
+
+from claude_agent_sdk import create_sdk_mcp_server, tool
+
+from app.services.repo_store import RepoStore, UnsafePatternError
+
+# 进程内 MCP 服务器名称及其工具（供 github_analyser 按需检索仓库内容）
+REPO_MCP_SERVER = "repo"
+REPO_TOOLS = [
+    f"mcp__{REPO_MCP_SERVER}__list_files",
+    f"mcp__{REPO_MCP_SERVER}__grep",
+    f"mcp__{REPO_MCP_SERVER}__read_file",
+]
+
+MAX_LIST_FILES = 500  # list_files 单次最多返回的文件数
+MAX_GREP_MATCHES = 100  # grep 单次最多返回的匹配行数
+MAX_GREP_LINE_CHARS = 300  # grep 结果中单行最大字符数
+GREP_TIMEOUT = 5  # grep 单次搜索时间上限（秒，在文件之间检查）
+DEFAULT_READ_BYTES = 20000  # read_file 默认读取字节数
+MAX_READ_BYTES = 50000  # read_file 单次最多读取字节数
+
+
+def _text(text: str, is_error: bool = False) -> dict:
+    result = {"content": [{"type": "text", "text": text}]}
+    if is_error:
+        result["is_error"] = True
+    return result
+
+
+def create_repo_mcp_server(store: RepoStore):
+    """
+    创建访问仓库存储的进程内 MCP 服务器
+
+    Args:
+        store: 当前任务的仓库存储
+
+    Returns:
+        可放入 ClaudeAgentOptions.mcp_servers 的服务器配置
+    """
+
+    @tool(
+        "list_files",
+        "列出仓库中的文件及其字节数，可用 glob 模式过滤（如 'src/*.py'、'*.md'）",
+        {
+            "type": "object",
+            "properties": {
+                "pattern": {"type": "string", "description": "glob 模式，为空时列出全部文件"},
+            },
+        },
+    )
+    async def list_files(args: dict) -> dict:
+        files = store.list_files(args.get("pattern") or None)
+        lines = [f"{path} ({size} bytes)" for path, size in files[:MAX_LIST_FILES]]
+        if len(files) > MAX_LIST_FILES:
+            lines.append(f"... 共 {len(files)} 个文件，仅显示前 {MAX_LIST_FILES} 个，请用 pattern 缩小范围")
+        return _text("\n".join(lines) if lines else "没有匹配的文件")
+
+    @tool(
+        "grep",
+        "在仓库文件内容中搜索（默认按字面匹配，regex=true 时按正则表达式），返回 path:行号: 行内容",
+        {
+            "type": "object",
+            "properties": {
+                "pattern": {"type": "string", "description": "搜索内容"},
+                "regex": {
+                    "type": "boolean",
+                    "description": "按正则表达式搜索（不支持嵌套量词和对分支使用量词）",
+                },
+                "path_pattern": {"type": "string", "description": "限定搜索文件的 glob 模式"},
+                "ignore_case": {"type": "boolean", "description": "是否忽略大小写"},
+            },
+            "required": ["pattern"],
+        },
+    )
+    async def grep(args: dict) -> dict:
+        # 在线程中搜索，大仓库的扫描不阻塞 MCP 服务器的事件循环
+        try:
+            matches, timed_out = await asyncio.to_thread(
+                store.grep,
+                args["pattern"],
+                path_pattern=args.get("path_pattern") or None,
+                max_matches=MAX_GREP_MATCHES,
+                ignore_case=bool(args.get("ignore_case")),
+                regex=bool(args.get("regex")),
+                timeout=GREP_TIMEOUT,
+            )
+        except UnsafePatternError as e:
+            return _text(str(e), is_error=True)
+        except re.error as e:
+            return _text(f"无效的正则表达式: {e}", is_error=True)
+        lines = [f"{path}:{line_no}: {line[:MAX_GREP_LINE_CHARS]}" for path, line_no, line in matches]
+        if timed_out:
+            lines.append(f"... 搜索超过 {GREP_TIMEOUT} 秒已停止，请用 path_pattern 缩小范围")
+        elif len(matches) >= MAX_GREP_MATCHES:
+            lines.append(f"... 已达到 {MAX_GREP_MATCHES} 条上限，请缩小搜索范围")
+        return _text("\n".join(lines) if lines else "没有匹配结果")
+
+    @tool(
+        "read_file",
+        f"读取仓库文件内容，可指定字节偏移和长度（默认 {DEFAULT_READ_BYTES} 字节，最多 {MAX_READ_BYTES} 字节）",
+        {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "文件路径（与 list_files 返回的路径一致）"},
+                "offset": {"type": "integer", "description": "起始字节偏移，默认 0"},
+                "length": {"type": "integer", "description": "读取字节数"},
+            },
+            "required": ["path"],
+        },
+    )
+    async def read_file(args: dict) -> dict:
+        path = args["path"]
+        size = store.file_size(path)
+        if size is None:
+            return _text(f"文件不存在: {path}", is_error=True)
+        offset = min(max(0, int(args.get("offset") or 0)), size)
+        length = min(int(args.get("length") or DEFAULT_READ_BYTES), MAX_READ_BYTES)
+        data = store.read(path, offset, length)
+        end = offset + len(data)
+        text = data.decode("utf-8", errors="replace")
+        header = f"[{path} 字节 {offset}-{end} / 共 {size}]"
+        if end < size:
+            header += f"（未读完，继续读取请使用 offset={end}）"
+        return _text(f"{header}\n{text}")
+
+    return create_sdk_mcp_server(
+        name=REPO_MCP_SERVER,
+        tools=[list_files, grep, read_file],
+    )
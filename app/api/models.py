@@ -1,18 +1,19 @@
-import re
 from pydantic import BaseModel, field_validator
 
+from app.core.canonical import clean_url
+
 
 class NewProjectAnalyseRequest(BaseModel):
     """新项目分析请求模型"""
     url: str
+    priority: int = 0  # 队列优先级，数值越大越先执行
+    force_refresh: bool = False  # 忽略结果缓存，重新执行
 
     @field_validator("url")
     @classmethod
     def validate_url(cls, v: str) -> str:
-        pattern = r'^https?://[^\s/$.?#].[^\s]*$'
-        if not re.match(pattern, v):
-            raise ValueError("无效的 URL 格式")
-        return v
+        # 校验并去掉跟踪参数，统一协议和域名大小写（无效时抛出 InvalidUrlError）
+        return clean_url(v)
 
 
 class TaskResponse(BaseModel):
@@ -23,6 +24,25 @@ class TaskResponse(BaseModel):
     input: dict | None = None  # 用户提交的内容
 
 
+class TaskStatusResponse(BaseModel):
+    """任务状态查询响应模型"""
+    success: bool
+    task_id: str
+    message: str | None = None
+    module: str | None = None
+    status: str | None = None  # queued | running | success | failed
+    input: dict | None = None
+    created_at: str | None = None
+    started_at: str | None = None
+    finished_at: str | None = None
+    duration_seconds: float | None = None
+    num_turns: int | None = None
+    cost_usd: float | None = None
+    prompt_bytes: int | None = None
+    notion_url: str | None = None
+    error: str | None = None
+
+
 class HealthCheckResponse(BaseModel):
     """Agent 健康检查响应模型"""
     healthy: bool
@@ -30,9 +50,25 @@ class HealthCheckResponse(BaseModel):
     error: str | None = None
 
 
+class McpServersResponse(BaseModel):
+    """常驻 MCP 服务器状态响应模型"""
+    success: bool
+    message: str | None = None
+    servers: dict | None = None  # {名称:配置摘要: {ready, startup_ms, calls, avg_latency_ms, ...}}
+
+
+class SessionPoolResponse(BaseModel):
+    """会话池状态响应模型"""
+    success: bool
+    message: str | None = None
+    profiles: list[dict] | None = None  # 每种 Agent 配置的空闲数、启动数、复用数、平均启动耗时等
+
+
 class DeepResearchRequest(BaseModel):
     """深度研究请求模型"""
     topic: str
+    priority: int = 0  # 队列优先级，数值越大越先执行
+    force_refresh: bool = False  # 忽略结果缓存，重新执行
 
     @field_validator("topic")
     @classmethod
@@ -58,3 +94,11 @@ class QuickNoteRequest(BaseModel):
         if len(v) > 2000:
             raise ValueError("笔记内容不能超过 2000 个字符")
         return v
+
+
+class QuickNoteStatusResponse(BaseModel):
+    """快速笔记写入状态响应模型"""
+    success: bool
+    task_id: str
+    status: str | None = None  # pending | written | failed
+    error: str | None = None
@@ -1,17 +1,36 @@
-from fastapi import APIRouter, BackgroundTasks, Query, Request
-from claude_agent_sdk import query, ClaudeAgentOptions, AssistantMessage, TextBlock
-
-from app.api.models import NewProjectAnalyseRequest, TaskResponse, HealthCheckResponse, DeepResearchRequest, QuickNoteRequest
-from app.agents.newprojectanalyse.agent import run_newprojectanalyse_agent
-from app.agents.deepresearch.agent import run_deepresearch_agent
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Query, Request
+from claude_agent_sdk import ClaudeAgentOptions, AssistantMessage, TextBlock
+
+from app.api.models import (
+    NewProjectAnalyseRequest,
+    TaskResponse,
+    HealthCheckResponse,
+    McpServersResponse,
+    SessionPoolResponse,
+    DeepResearchRequest,
+    QuickNoteRequest,
+    QuickNoteStatusResponse,
+    TaskStatusResponse,
+)
 from app.agents.newprojectanalyse.config import MODEL
 from app.config import API_KEY, get_agent_config
 from app.core.logging import request_logger
+from app.core.canonical import canonical_topic, url_resolver
+from app.core.task_queue import task_queue
 from app.core.task_registry import task_registry
-from app.services.notion import NotionService, BlockBuilder
+from app.services.mcp_pool import mcp_pool
+from app.services.notion import BlockBuilder
+from app.services.notion_buffer import quicknote_buffer
+from app.services.session_pool import session_pool
 
 router = APIRouter()
 
+MERGED_MESSAGE = "相同任务正在执行，已合并到已有任务"
+
 
 def get_client_ip(request: Request) -> str:
     """获取客户端 IP"""
@@ -21,19 +40,46 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+def submit_task(
+    module: str,
+    payload: dict,
+    dedup_key: str,
+    priority: int = 0,
+) -> tuple[str, bool]:
+    """
+    登记并提交任务到队列（读写 SQLite，路由中通过 asyncio.to_thread 调用）
+
+    相同去重 key 的任务正在排队或执行时，不创建新任务，直接返回已有任务 ID。
+
+    Returns:
+        tuple: (task_id, 是否合并到已有任务)
+    """
+    existing = task_queue.find_inflight(module, dedup_key)
+    if existing:
+        return existing, True
+
+    task_id = task_registry.create(module, payload)
+    actual_id = task_queue.enqueue(module, payload, task_id, priority=priority, dedup_key=dedup_key)
+    if actual_id != task_id:
+        # 并发提交时另一个请求先入队，放弃本次登记
+        task_registry.delete(task_id)
+        return actual_id, True
+    return task_id, False
+
+
 @router.post("/newprojectanalyse", response_model=TaskResponse)
 async def newprojectanalyse(
     request: Request,
     body: NewProjectAnalyseRequest,
-    background_tasks: BackgroundTasks,
     api_key: str = Query(..., description="API Key"),
 ):
     """
     提交新项目分析任务
 
     - 验证 API Key
-    - 验证 URL 格式
-    - 提交后台任务
+    - 验证 URL 格式，去掉跟踪参数并解析重定向
+    - 提交到持久化任务队列（相同 URL 的任务执行中时合并到已有任务）
+    - 有效期内已完成过的 URL 直接复用上次结果（force_refresh 为 true 时重新执行）
     - 返回任务 ID
     """
     client_ip = get_client_ip(request)
@@ -47,19 +93,70 @@ async def newprojectanalyse(
         )
         return TaskResponse(success=False, message="Invalid API Key")
 
-    # 生成任务 ID
-    task_id = task_registry.generate_id("newprojectanalyse")
+    # 解析重定向得到最终 URL，同一内容的不同入口使用相同的去重 key 和结果缓存 key
+    resolved = await url_resolver.resolve(body.url)
+
+    # 登记并提交到任务队列（相同 URL 的任务执行中时合并）
+    task_id, merged = await asyncio.to_thread(
+        submit_task, "newprojectanalyse", {"url": resolved.url, "force_refresh": body.force_refresh},
+        dedup_key=resolved.key, priority=body.priority,
+    )
 
     # 记录请求日志
     request_logger.log(
         "INFO", "POST", path, client_ip,
-        task_id=task_id, status="accepted"
+        task_id=task_id, status="merged" if merged else "accepted"
+    )
+
+    return TaskResponse(
+        success=True,
+        task_id=task_id,
+        message=MERGED_MESSAGE if merged else None,
+        input={"url": body.url},
     )
 
-    # 添加后台任务
-    background_tasks.add_task(run_newprojectanalyse_agent, body.url)
 
-    return TaskResponse(success=True, task_id=task_id, input={"url": body.url})
+@router.get("/tasks/{task_id}", response_model=TaskStatusResponse)
+async def task_status(
+    task_id: str,
+    api_key: str = Query(..., description="API Key"),
+):
+    """
+    查询任务状态
+
+    - 验证 API Key
+    - 返回任务状态（queued / running / success / failed）、耗时、轮次、费用、prompt 大小和 Notion 页面地址
+    """
+    if api_key != API_KEY:
+        return TaskStatusResponse(success=False, task_id=task_id, message="Invalid API Key")
+
+    record = await asyncio.to_thread(task_registry.get, task_id)
+    if record is None:
+        return TaskStatusResponse(success=False, task_id=task_id, message="任务不存在")
+
+    def _iso(ts: float | None) -> str | None:
+        return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+    duration = None
+    if record.started_at:
+        duration = round((record.finished_at or time.time()) - record.started_at, 1)
+
+    return TaskStatusResponse(
+        success=True,
+        task_id=task_id,
+        module=record.module,
+        status=record.status,
+        input=record.input,
+        created_at=_iso(record.created_at),
+        started_at=_iso(record.started_at),
+        finished_at=_iso(record.finished_at),
+        duration_seconds=duration,
+        num_turns=record.num_turns,
+        cost_usd=record.cost_usd,
+        prompt_bytes=record.prompt_bytes,
+        notion_url=record.notion_url,
+        error=record.error,
+    )
 
 
 @router.get("/check-agent-health", response_model=HealthCheckResponse)
@@ -71,7 +168,7 @@ async def check_agent_health(
     Agent 健康检查
 
     - 验证 API Key
-    - 实时调用 Agent SDK 测试连通性
+    - 实时调用 Agent SDK 测试连通性（使用会话池中的预启动会话）
     - 返回 Agent 响应或错误信息
     """
     client_ip = get_client_ip(request)
@@ -96,7 +193,7 @@ async def check_agent_health(
         )
 
         response_text = ""
-        async for message in query(prompt="what llm are you", options=options):
+        async for message in session_pool.query("what llm are you", options):
             if isinstance(message, AssistantMessage):
                 blocks = getattr(message, "content", [])
                 for block in blocks:
@@ -120,11 +217,40 @@ async def check_agent_health(
         return HealthCheckResponse(healthy=False, error=error_msg)
 
 
+@router.get("/mcp-servers", response_model=McpServersResponse)
+async def mcp_servers_status(
+    api_key: str = Query(..., description="API Key"),
+):
+    """
+    查询常驻 MCP 服务器状态
+
+    - 验证 API Key
+    - 返回各服务器是否就绪、启动耗时、重启次数、调用次数和平均/最大延迟
+    """
+    if api_key != API_KEY:
+        return McpServersResponse(success=False, message="Invalid API Key")
+    return McpServersResponse(success=True, servers=mcp_pool.stats())
+
+
+@router.get("/session-pool", response_model=SessionPoolResponse)
+async def session_pool_status(
+    api_key: str = Query(..., description="API Key"),
+):
+    """
+    查询会话池状态
+
+    - 验证 API Key
+    - 返回每种 Agent 配置的空闲会话数、启动次数、复用次数、回收次数和平均启动耗时
+    """
+    if api_key != API_KEY:
+        return SessionPoolResponse(success=False, message="Invalid API Key")
+    return SessionPoolResponse(success=True, profiles=session_pool.stats())
+
+
 @router.post("/deepresearch", response_model=TaskResponse)
 async def deepresearch(
     request: Request,
     body: DeepResearchRequest,
-    background_tasks: BackgroundTasks,
     api_key: str = Query(..., description="API Key"),
 ):
     """
@@ -132,7 +258,7 @@ async def deepresearch(
 
     - 验证 API Key
     - 验证主题格式
-    - 提交后台任务
+    - 提交到持久化任务队列（相同主题的任务执行中时合并到已有任务）
     - 返回任务 ID
     """
     client_ip = get_client_ip(request)
@@ -146,19 +272,25 @@ async def deepresearch(
         )
         return TaskResponse(success=False, message="Invalid API Key")
 
-    # 生成任务 ID
-    task_id = task_registry.generate_id("deepresearch")
+    # 登记并提交到任务队列（相同主题的任务执行中时合并）
+    task_id, merged = await asyncio.to_thread(
+        submit_task, "deepresearch", {"topic": body.topic, "force_refresh": body.force_refresh},
+        dedup_key=canonical_topic(body.topic), priority=body.priority,
+    )
 
     # 记录请求日志
     request_logger.log(
         "INFO", "POST", path, client_ip,
-        task_id=task_id, status="accepted", extra={"topic": body.topic}
+        task_id=task_id, status="merged" if merged else "accepted",
+        extra={"topic": body.topic}
     )
 
-    # 添加后台任务
-    background_tasks.add_task(run_deepresearch_agent, body.topic)
-
-    return TaskResponse(success=True, task_id=task_id, input={"topic": body.topic})
+    return TaskResponse(
+        success=True,
+        task_id=task_id,
+        message=MERGED_MESSAGE if merged else None,
+        input={"topic": body.topic},
+    )
 
 
 @router.post("/quicknote", response_model=TaskResponse)
@@ -171,8 +303,8 @@ async def quicknote(
     快速笔记 - 追加 bulleted_list 到指定 Notion 页面
 
     - 验证 API Key
-    - 直接将内容追加到指定页面的 bulleted_list
-    - 同步执行，立即返回结果
+    - 笔记进入写入缓冲，短时间窗口内的多条笔记合并为一次 Notion 写入
+    - 立即返回写入 ID，可通过 GET /quicknote/{task_id} 查询写入结果
     """
     client_ip = get_client_ip(request)
     path = "/quicknote"
@@ -198,26 +330,45 @@ async def quicknote(
         )
         return TaskResponse(success=False, message="Notion 配置缺失")
 
-    try:
-        # 创建 Notion 服务并追加内容
-        notion = NotionService(token)
-        blocks = [BlockBuilder.bulleted_list_item(body.content)]
-        notion.append_blocks(page_id, blocks)
+    # 加入写入缓冲，由后台合并写入
+    block = BlockBuilder.bulleted_list_item(body.content)
+    task_id = quicknote_buffer.submit(token, page_id, block)
 
-        request_logger.log(
-            "INFO", "POST", path, client_ip,
-            status="success", extra={"content_length": len(body.content)}
-        )
+    request_logger.log(
+        "INFO", "POST", path, client_ip,
+        task_id=task_id, status="queued", extra={"content_length": len(body.content)}
+    )
 
-        return TaskResponse(
-            success=True,
-            message="笔记已追加",
-            input={"content": body.content}
-        )
+    return TaskResponse(
+        success=True,
+        task_id=task_id,
+        message="笔记已加入写入队列",
+        input={"content": body.content}
+    )
 
-    except Exception as e:
-        request_logger.log(
-            "ERROR", "POST", path, client_ip,
-            status="failed", extra={"error": str(e)}
-        )
-        return TaskResponse(success=False, message=f"写入失败: {str(e)}")
+
+@router.get("/quicknote/{task_id}", response_model=QuickNoteStatusResponse)
+async def quicknote_status(
+    task_id: str,
+    api_key: str = Query(..., description="API Key"),
+):
+    """
+    查询快速笔记写入状态
+
+    - pending: 等待合并写入
+    - written: 已写入 Notion
+    - failed: 写入失败（error 字段给出原因）
+    """
+    if api_key != API_KEY:
+        return QuickNoteStatusResponse(success=False, task_id=task_id, error="Invalid API Key")
+
+    status = quicknote_buffer.get_status(task_id)
+    if status is None:
+        return QuickNoteStatusResponse(success=False, task_id=task_id, error="未找到该笔记写入记录")
+
+    return QuickNoteStatusResponse(
+        success=True,
+        task_id=task_id,
+        status=status["status"],
+        error=status["error"],
+    )
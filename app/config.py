@@ -18,6 +18,25 @@ _config = load_config()
 API_KEY: str = _config.get("api_key", "")
 LOG_DIR: Path = BASE_DIR / _config.get("log_dir", "logs")
 LOG_LEVEL: str = _config.get("log_level", "INFO")
+DATA_DIR: Path = BASE_DIR / _config.get("data_dir", "data")
+
+# 任务队列配置
+TASK_QUEUE_CONFIG: dict = _config.get("task_queue", {})
+
+# Notion API 全局配置（限流按 Integration Token 在进程内共享）
+_notion_api_config: dict = _config.get("notion_api", {})
+NOTION_RATE_LIMIT: float = _notion_api_config.get("rate_limit", 3)
+NOTION_BURST: int = _notion_api_config.get("burst", 3)
+NOTION_MAX_RETRIES: int = _notion_api_config.get("max_retries", 5)
+
+# 常驻 MCP 服务器池配置
+MCP_POOL_CONFIG: dict = _config.get("mcp_pool", {})
+
+# URL 规范化配置（提交任务时解析重定向，用于去重和缓存 key）
+URL_CANONICAL_CONFIG: dict = _config.get("url_canonical", {})
+
+# Claude Code 会话池配置
+SESSION_POOL_CONFIG: dict = _config.get("session_pool", {})
 
 
 def get_agent_config(agent_name: str) -> dict:
@@ -0,0 +1,250 @@
+"""请求内容规范化（用于任务去重和缓存 key）"""
+import asyncio
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import NamedTuple
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+import httpx
+
+from app.config import URL_CANONICAL_CONFIG
+from app.services.github import parse_github_repo_url, resolve_default_branch
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# 跟踪参数（任何站点都去掉）
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "ref_url", "spm", "scm",
+}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+# 特定站点的分享、会话参数（不影响页面内容）
+SITE_TRACKING_PARAMS = {
+    "mp.weixin.qq.com": {
+        "chksm", "scene", "srcid", "sharer_sharetime", "sharer_shareid", "exportkey",
+        "pass_ticket", "clicktime", "enterid", "ascene", "devicetype", "version", "nettype", "lang",
+    },
+    "www.bilibili.com": {
+        "spm_id_from", "vd_source", "share_source", "share_medium", "share_plat",
+        "share_session_id", "share_from", "bbid", "ts", "unique_k",
+    },
+    "twitter.com": {"s", "t"},
+    "x.com": {"s", "t"},
+    "www.youtube.com": {"si", "feature"},
+    "youtu.be": {"si", "feature"},
+}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(segment: str, site_params: set[str]) -> bool:
+    key = unquote_plus(segment.split("=", 1)[0])
+    return (
+        key in TRACKING_PARAMS
+        or key in site_params
+        or key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+
+
+class InvalidUrlError(ValueError):
+    """不是有效的 http(s) URL"""
+    pass
+
+
+def clean_url(url: str) -> str:
+    """
+    清理 URL（结果仍用于实际请求）
+
+    - 去掉首尾空白，协议和域名小写，去掉默认端口和域名末尾的点
+    - 去掉跟踪参数（utm_*、fbclid 等）和空的 fragment
+
+    Raises:
+        InvalidUrlError: 不是 http(s) URL 或缺少域名
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError as e:
+        raise InvalidUrlError(f"无效的 URL: {e}") from e
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if scheme not in _DEFAULT_PORTS or not host or any(c.isspace() for c in url.strip()):
+        raise InvalidUrlError("无效的 URL 格式")
+
+    netloc = f"[{host}]" if ":" in host else host
+    if parts.username or parts.password:
+        netloc = parts.netloc.rsplit("@", 1)[0] + "@" + netloc
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+
+    # 按原样保留其余参数（不重新编码，避免改变站点依赖的参数格式）
+    site_params = SITE_TRACKING_PARAMS.get(host, set())
+    query = "&".join(
+        segment for segment in parts.query.split("&")
+        if segment and not _is_tracking_param(segment, site_params)
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", query, parts.fragment))
+
+
+def canonical_url(url: str) -> str:
+    """
+    规范化 URL（只用作去重和缓存 key，不用于请求）
+
+    - GitHub 仓库 URL 归一为 https://github.com/{owner}/{repo}（大小写不敏感），保留分支和子目录
+    - 其他 URL：在 clean_url 的基础上统一为 https、去掉 www.、fragment 和末尾斜杠，查询参数排序
+    无效 URL 原样返回（去掉首尾空白）。
+    """
+    repo = parse_github_repo_url(url)
+    if repo is not None:
+        key = f"https://github.com/{repo.owner}/{repo.repo}".lower()
+        if repo.ref:
+            key += f"/tree/{repo.ref}"
+            if repo.subpath:
+                key += f"/{repo.subpath}"
+        return key
+
+    try:
+        parts = urlsplit(clean_url(url))
+    except InvalidUrlError:
+        return url.strip()
+    netloc = parts.netloc.removeprefix("www.")
+    query = "&".join(sorted(parts.query.split("&"))) if parts.query else ""
+    return urlunsplit(("https", netloc, parts.path.rstrip("/"), query, ""))
+
+
+class ResolvedUrl(NamedTuple):
+    """重定向解析结果"""
+    url: str  # 用于请求的最终 URL（已清理）
+    key: str  # 规范化 key，等于 canonical_url(url)
+
+
+class UrlResolver:
+    """
+    URL 重定向解析（带进程内 LRU 缓存）
+
+    提交任务时把短链接、http→https、已改名的 GitHub 仓库等重定向解析为最终 URL，
+    使同一内容的不同入口得到相同的去重 key 和缓存 key。
+    请求失败或超时时使用清理后的原 URL，不影响任务提交。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        timeout: float = 3,
+        cache_ttl: float = 3600,
+        cache_size: int = 1000,
+    ):
+        """
+        Args:
+            enabled: 是否跟随重定向（关闭时只做本地规范化）
+            timeout: 单次解析的总超时（秒，含重定向和 GitHub 默认分支查询）
+            cache_ttl: 解析结果缓存时间（秒）
+            cache_size: 最多缓存的 URL 数
+        """
+        self.enabled = enabled
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[float, ResolvedUrl]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def _follow_redirects(self, url: str) -> str:
+        """返回跟随重定向后的 URL，失败或最终响应为错误时返回原 URL"""
+        client = get_http_client()
+        try:
+            response = await client.head(url, timeout=self.timeout)
+            # 不支持 HEAD 的站点改用 GET，只读取响应头
+            if response.status_code in (405, 501):
+                async with client.stream("GET", url, timeout=self.timeout) as response:
+                    pass
+        except httpx.HTTPError as e:
+            logger.debug(f"解析重定向失败 {url}: {e}")
+            return url
+        if response.status_code >= 400:
+            return url
+        return str(response.url)
+
+    async def _resolve_github(self, url: str) -> str:
+        """/tree/{默认分支}（不含子目录）归一为仓库根 URL"""
+        repo = parse_github_repo_url(url)
+        if repo is None or not repo.ref or repo.subpath:
+            return url
+        if await resolve_default_branch(repo) == repo.ref:
+            return repo._replace(ref=None).web_url
+        return url
+
+    async def _resolve_remote(self, url: str) -> str:
+        """跟随重定向（已改名或转移的 GitHub 仓库同样由 github.com 重定向到新地址）并归一 GitHub 默认分支"""
+        final = clean_url(await self._follow_redirects(url))
+        return await self._resolve_github(final)
+
+    async def resolve(self, url: str) -> ResolvedUrl:
+        """
+        解析 URL
+
+        Raises:
+            InvalidUrlError: 不是有效的 http(s) URL
+        """
+        cleaned = clean_url(url)
+        key = canonical_url(cleaned)
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached and cached[0] > now:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+
+        if not self.enabled:
+            final = cleaned
+        else:
+            try:
+                # 整个解析（含 GitHub 默认分支的 git ls-remote）受 timeout 限制，不拖慢任务提交
+                final = await asyncio.wait_for(self._resolve_remote(cleaned), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                # 超时的结果不缓存，下次提交时重新解析
+                logger.debug(f"解析 URL 超时 {url}，使用清理后的原 URL")
+                return ResolvedUrl(cleaned, key)
+        resolved = ResolvedUrl(final, canonical_url(final))
+
+        self._cache[key] = (now + self.cache_ttl, resolved)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        if resolved.key != key:
+            logger.info(f"URL 规范化: {url} -> {resolved.url}")
+        return resolved
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": len(self._cache),
+        }
+
+
+def canonical_topic(topic: str) -> str:
+    """规范化研究主题：合并空白并忽略大小写"""
+    return " ".join(topic.split()).casefold()
+
+
+def canonical_search_query(query: str) -> str:
+    """
+    规范化搜索查询：Unicode 归一（NFKC）、忽略大小写、合并空白
+
+    词序、标点和搜索运算符（引号、-、C++/C#、.NET）都影响结果，保持不变。
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+url_resolver = UrlResolver(
+    enabled=URL_CANONICAL_CONFIG.get("resolve_redirects", True),
+    timeout=URL_CANONICAL_CONFIG.get("timeout", 3),
+    cache_ttl=URL_CANONICAL_CONFIG.get("cache_ttl_minutes", 60) * 60,
+    cache_size=URL_CANONICAL_CONFIG.get("cache_size", 1000),
+)
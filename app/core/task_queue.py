@@ -0,0 +1,353 @@
+"""SQLite 持久化任务队列"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from app.config import DATA_DIR, TASK_QUEUE_CONFIG
+from app.core.task_registry import task_registry
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[..., Awaitable[None]]
+
+
+class TaskFailedError(Exception):
+    """任务执行失败，且处理函数已在 task_registry 中记录失败状态（队列只需标记失败）"""
+    pass
+
+
+class TaskQueue:
+    """
+    SQLite 持久化任务队列 + 按 Agent 划分的有界 Worker 池
+
+    - 每个 Agent 注册一个处理函数和并发数，启动对应数量的 worker
+    - 按 priority 降序、提交顺序升序领取任务（同优先级 FIFO）
+    - worker 领取任务时获得租约并定期续租；进程崩溃后租约过期，
+      任务会被重新领取，因此重启后排队中和执行中的任务都会继续执行
+    - 提交时可指定去重 key，相同 key 的任务在排队或执行中时，
+      新提交直接合并到已有任务（single-flight）
+    """
+
+    EXHAUSTED_ERROR = "超过最大尝试次数"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS task_queue (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL,
+        agent TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_until REAL,
+        error TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        dedup_key TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_task_queue_claim
+        ON task_queue (agent, status, priority DESC, seq);
+    """
+
+    # 在旧表补齐 dedup_key 列之后再创建
+    DEDUP_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_task_queue_dedup
+        ON task_queue (agent, dedup_key, status);
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        lease_seconds: float = 60,
+        max_attempts: int = 3,
+        poll_interval: float = 5,
+    ):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径
+            lease_seconds: 租约时长（秒），worker 每 1/3 租约时长续租一次
+            max_attempts: 单个任务最大领取次数，超过后标记为失败（防止反复崩溃的任务无限重试）
+            poll_interval: 空闲 worker 轮询间隔（秒），用于发现租约过期的任务
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, TaskHandler] = {}
+        self._concurrency: Dict[str, int] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._workers: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接（每次操作独立连接，用完即关闭）"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建数据库文件和表结构"""
+        if self._initialized:
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(task_queue)")}
+            if "dedup_key" not in columns:
+                conn.execute("ALTER TABLE task_queue ADD COLUMN dedup_key TEXT")
+            conn.executescript(self.DEDUP_INDEX)
+        self._initialized = True
+
+    def register(self, agent: str, handler: TaskHandler, concurrency: int = 1) -> None:
+        """
+        注册 Agent 处理函数
+
+        Args:
+            agent: Agent 名称（即任务的 agent 字段）
+            handler: 异步处理函数，以 task_id 和任务 payload 作为关键字参数调用；
+                失败时应抛出异常（已自行记录失败状态时抛出 TaskFailedError）
+            concurrency: 该 Agent 同时执行的最大任务数
+        """
+        self._handlers[agent] = handler
+        self._concurrency[agent] = max(1, concurrency)
+
+    def enqueue(
+        self,
+        agent: str,
+        payload: Dict[str, Any],
+        task_id: str,
+        priority: int = 0,
+        dedup_key: Optional[str] = None,
+    ) -> str:
+        """
+        提交任务到队列
+
+        Args:
+            agent: Agent 名称
+            payload: 传给处理函数的关键字参数（需可 JSON 序列化）
+            task_id: 任务 ID
+            priority: 优先级，数值越大越先执行
+            dedup_key: 去重 key，相同 key 的任务排队或执行中时合并到已有任务
+
+        Returns:
+            实际使用的任务 ID（合并时为已有任务的 ID）
+        """
+        if agent not in self._handlers:
+            raise ValueError(f"未注册的 Agent: {agent}")
+        self._init_db()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._find_inflight(conn, agent, dedup_key) if dedup_key else None
+                if existing is not None:
+                    # 合并到已有任务，保留较高的优先级
+                    conn.execute(
+                        "UPDATE task_queue SET priority = MAX(priority, ?) WHERE seq = ?",
+                        (priority, existing["seq"]),
+                    )
+                else:
+                    conn.execute(
+                        "INSERT INTO task_queue "
+                        "(task_id, agent, payload, priority, created_at, dedup_key) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (task_id, agent, json.dumps(payload, ensure_ascii=False),
+                         priority, time.time(), dedup_key),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if existing is not None:
+            return existing["task_id"]
+
+        # 可能在线程中调用（路由通过 asyncio.to_thread 提交），唤醒 worker 需回到事件循环
+        event = self._events.get(agent)
+        if event and self._loop is not None:
+            self._loop.call_soon_threadsafe(event.set)
+        return task_id
+
+    @staticmethod
+    def _find_inflight(
+        conn: sqlite3.Connection, agent: str, dedup_key: str
+    ) -> Optional[sqlite3.Row]:
+        """查找相同去重 key 的排队中或执行中任务"""
+        return conn.execute(
+            "SELECT seq, task_id FROM task_queue "
+            "WHERE agent = ? AND dedup_key = ? AND status IN ('queued', 'running') "
+            "ORDER BY seq LIMIT 1",
+            (agent, dedup_key),
+        ).fetchone()
+
+    def find_inflight(self, agent: str, dedup_key: str) -> Optional[str]:
+        """
+        查找相同去重 key 的排队中或执行中任务
+
+        Returns:
+            已有任务的 ID，不存在时返回 None
+        """
+        self._init_db()
+        with self._connect() as conn:
+            row = self._find_inflight(conn, agent, dedup_key)
+        return row["task_id"] if row else None
+
+    def _claim(self, agent: str) -> Optional[sqlite3.Row]:
+        """
+        领取一个任务：排队中的任务，或租约已过期的执行中任务
+
+        在 IMMEDIATE 事务中完成查询和更新，多个 worker/进程不会领取到同一任务。
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 超过最大尝试次数的过期任务直接标记失败
+                exhausted = conn.execute(
+                    "SELECT seq, task_id FROM task_queue "
+                    "WHERE agent = ? AND status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (agent, now, self.max_attempts),
+                ).fetchall()
+                for item in exhausted:
+                    conn.execute(
+                        "UPDATE task_queue SET status = 'failed', finished_at = ?, error = ? "
+                        "WHERE seq = ?",
+                        (now, self.EXHAUSTED_ERROR, item["seq"]),
+                    )
+                row = conn.execute(
+                    "SELECT * FROM task_queue WHERE agent = ? AND "
+                    "(status = 'queued' OR (status = 'running' AND lease_until < ?)) "
+                    "ORDER BY priority DESC, seq ASC LIMIT 1",
+                    (agent, now),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE task_queue SET status = 'running', attempts = attempts + 1, "
+                        "lease_until = ?, started_at = ? WHERE seq = ?",
+                        (now + self.lease_seconds, now, row["seq"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        for item in exhausted:
+            task_registry.finish(item["task_id"], success=False, error=self.EXHAUSTED_ERROR)
+        return row
+
+    def _renew_lease(self, seq: int) -> None:
+        """续租"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE task_queue SET lease_until = ? WHERE seq = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, seq),
+            )
+
+    def _finish(self, seq: int, status: str, error: Optional[str] = None) -> None:
+        """标记任务完成或失败"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE task_queue SET status = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE seq = ?",
+                (status, error, time.time(), seq),
+            )
+
+    def _requeue(self, seq: int, task_id: str) -> None:
+        """将被中断的任务放回队列（正常关闭时调用，不计入尝试次数），任务记录同步恢复为排队状态"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE task_queue SET status = 'queued', lease_until = NULL, "
+                "attempts = MAX(attempts - 1, 0) WHERE seq = ?",
+                (seq,),
+            )
+        task_registry.update(task_id, status="queued", started_at=None)
+
+    async def _heartbeat(self, seq: int) -> None:
+        """执行期间定期续租"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(self._renew_lease, seq)
+
+    async def _run_task(self, row: sqlite3.Row) -> None:
+        """执行单个任务（SQLite 读写在线程中执行，不阻塞事件循环）"""
+        seq = row["seq"]
+        handler = self._handlers[row["agent"]]
+        payload = json.loads(row["payload"])
+        logger.info(f"开始执行任务 {row['task_id']} (第 {row['attempts'] + 1} 次)")
+
+        heartbeat = asyncio.create_task(self._heartbeat(seq))
+        try:
+            await handler(task_id=row["task_id"], **payload)
+        except asyncio.CancelledError:
+            # 关闭时调用；shield 保证再次取消时写入仍在线程中完成
+            await asyncio.shield(asyncio.to_thread(self._requeue, seq, row["task_id"]))
+            raise
+        except TaskFailedError as e:
+            logger.warning(f"任务 {row['task_id']} 执行失败: {e}")
+            await asyncio.to_thread(self._finish, seq, "failed", str(e))
+        except Exception as e:
+            logger.exception(f"任务 {row['task_id']} 执行失败")
+            await asyncio.to_thread(self._finish, seq, "failed", str(e))
+            await asyncio.to_thread(
+                task_registry.finish, row["task_id"], success=False, error=str(e)
+            )
+        else:
+            await asyncio.to_thread(self._finish, seq, "done")
+        finally:
+            heartbeat.cancel()
+
+    async def _worker(self, agent: str) -> None:
+        """worker 循环：领取并执行任务，空闲时等待新任务或轮询超时"""
+        event = self._events[agent]
+        while True:
+            try:
+                row = await asyncio.to_thread(self._claim, agent)
+            except sqlite3.Error as e:
+                logger.error(f"任务队列 {agent} 领取任务失败: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if row is None:
+                event.clear()
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_task(row)
+
+    async def start(self) -> None:
+        """启动所有已注册 Agent 的 worker"""
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self._init_db)
+        for agent, concurrency in self._concurrency.items():
+            self._events[agent] = asyncio.Event()
+            for _ in range(concurrency):
+                self._workers.append(asyncio.create_task(self._worker(agent)))
+            logger.info(f"任务队列 {agent} 启动 {concurrency} 个 worker")
+
+    async def stop(self) -> None:
+        """停止所有 worker，执行中的任务放回队列"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._events.clear()
+
+
+# 全局任务队列
+task_queue = TaskQueue(
+    db_path=DATA_DIR / TASK_QUEUE_CONFIG.get("db_file", "tasks.db"),
+    lease_seconds=TASK_QUEUE_CONFIG.get("lease_seconds", 60),
+    max_attempts=TASK_QUEUE_CONFIG.get("max_attempts", 3),
+    poll_interval=TASK_QUEUE_CONFIG.get("poll_interval", 5),
+)
@@ -1,26 +1,245 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import DATA_DIR, TASK_QUEUE_CONFIG
 
 
 def generate_task_id(module: str) -> str:
     """
     生成任务 ID
 
+    时间戳后附加随机后缀，同一秒内的多次提交也不会冲突。
+
     Args:
         module: 模块名称（如 "newprojectanalyse"）
 
     Returns:
-        任务 ID（如 "newprojectanalyse_251224_23_33_12"）
+        任务 ID（如 "newprojectanalyse_251224_23_33_12_3f9a1c"）
     """
     time_str = datetime.now().strftime("%y%m%d_%H_%M_%S")
-    return f"{module}_{time_str}"
+    return f"{module}_{time_str}_{uuid.uuid4().hex[:6]}"
+
+
+@dataclass(slots=True)
+class TaskRecord:
+    """任务状态记录"""
+    task_id: str
+    module: str
+    status: str  # queued | running | success | failed
+    created_at: float
+    input: Optional[Dict[str, Any]] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    num_turns: int = 0
+    cost_usd: float = 0.0
+    notion_url: Optional[str] = None
+    error: Optional[str] = None
+    prompt_bytes: int = 0  # 发送给模型的 prompt 总字节数（主 prompt + subagent prompt）
 
 
 class TaskRegistry:
-    """任务 ID 注册器 - 兼容旧接口"""
+    """
+    任务注册表
+
+    - 生成全局唯一的任务 ID，路由生成的 ID 贯穿队列、Agent 和任务日志
+    - 记录任务状态、耗时、轮次、费用、prompt 大小和 Notion 页面地址
+    - 内存中保留最近访问的记录（LRU 淘汰），完整记录持久化在 SQLite，
+      按任务 ID 查询为主键查找
+    """
+
+    MAX_CACHED = 1000  # 内存中最多保留的记录数
+    RETENTION_DAYS = 30  # SQLite 中记录的保留天数
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        task_id TEXT PRIMARY KEY,
+        module TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        input TEXT,
+        started_at REAL,
+        finished_at REAL,
+        num_turns INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        notion_url TEXT,
+        error TEXT,
+        prompt_bytes INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at);
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._cache: OrderedDict[str, TaskRecord] = OrderedDict()
+        # 异步代码通过 asyncio.to_thread 调用，内存索引可能被多个线程同时访问
+        self._cache_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _open(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接（每次操作独立连接，用完即关闭）"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """初始化数据库（首次调用时）并创建连接"""
+        self._init_db()
+        with self._open() as conn:
+            yield conn
+
+    def _init_db(self) -> None:
+        """创建表结构并清理过期记录（失败时下次调用重试）"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._open() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(self.SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}
+                if "prompt_bytes" not in columns:
+                    conn.execute("ALTER TABLE tasks ADD COLUMN prompt_bytes INTEGER NOT NULL DEFAULT 0")
+                conn.execute(
+                    "DELETE FROM tasks WHERE created_at < ?",
+                    (time.time() - self.RETENTION_DAYS * 86400,),
+                )
+            self._initialized = True
+
+    def _cache_put(self, record: TaskRecord) -> None:
+        """写入内存索引，超出上限时淘汰最久未访问的记录"""
+        with self._cache_lock:
+            self._cache[record.task_id] = record
+            self._cache.move_to_end(record.task_id)
+            while len(self._cache) > self.MAX_CACHED:
+                self._cache.popitem(last=False)
+
+    def _save(self, record: TaskRecord) -> None:
+        """持久化记录并更新内存索引"""
+        data = asdict(record)
+        data["input"] = json.dumps(record.input, ensure_ascii=False) if record.input is not None else None
+        columns = ", ".join(data)
+        placeholders = ", ".join("?" for _ in data)
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO tasks ({columns}) VALUES ({placeholders})",
+                tuple(data.values()),
+            )
+        self._cache_put(record)
 
     def generate_id(self, module: str) -> str:
         return generate_task_id(module)
 
+    def create(self, module: str, input_data: Optional[Dict[str, Any]] = None) -> str:
+        """
+        生成任务 ID 并登记为排队状态
+
+        Args:
+            module: 模块名称
+            input_data: 用户提交的内容
+
+        Returns:
+            任务 ID
+        """
+        task_id = self.generate_id(module)
+        self._save(TaskRecord(
+            task_id=task_id,
+            module=module,
+            status="queued",
+            created_at=time.time(),
+            input=input_data,
+        ))
+        return task_id
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        """按任务 ID 查询记录（优先命中内存索引）"""
+        with self._cache_lock:
+            record = self._cache.get(task_id)
+            if record is not None:
+                self._cache.move_to_end(task_id)
+                return record
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+
+        data = dict(row)
+        data["input"] = json.loads(data["input"]) if data["input"] else None
+        record = TaskRecord(**data)
+        self._cache_put(record)
+        return record
+
+    def update(self, task_id: str, **fields: Any) -> None:
+        """
+        更新任务记录的字段（记录不存在时忽略）
+
+        Args:
+            task_id: 任务 ID
+            **fields: TaskRecord 字段
+        """
+        record = self.get(task_id)
+        if record is None:
+            return
+        for key, value in fields.items():
+            setattr(record, key, value)
+        self._save(record)
+
+    def delete(self, task_id: str) -> None:
+        """删除任务记录"""
+        with self._cache_lock:
+            self._cache.pop(task_id, None)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def mark_running(self, task_id: str, module: str, input_data: Optional[Dict[str, Any]] = None) -> None:
+        """标记任务开始执行（未登记的任务会自动登记，如脚本直接调用 Agent）"""
+        if self.get(task_id) is None:
+            self._save(TaskRecord(
+                task_id=task_id,
+                module=module,
+                status="queued",
+                created_at=time.time(),
+                input=input_data,
+            ))
+        self.update(task_id, status="running", started_at=time.time(), finished_at=None, error=None)
+
+    def finish(
+        self,
+        task_id: str,
+        success: bool,
+        error: Optional[str] = None,
+        num_turns: int = 0,
+        cost_usd: float = 0,
+        notion_url: Optional[str] = None,
+    ) -> None:
+        """记录任务结束"""
+        self.update(
+            task_id,
+            status="success" if success else "failed",
+            finished_at=time.time(),
+            error=error,
+            num_turns=num_turns,
+            cost_usd=cost_usd,
+            notion_url=notion_url,
+        )
+
 
-# 全局单例
-task_registry = TaskRegistry()
+# 全局单例（与任务队列共用同一个 SQLite 数据库）
+task_registry = TaskRegistry(DATA_DIR / TASK_QUEUE_CONFIG.get("db_file", "tasks.db"))
@@ -1,11 +1,74 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.agents.deepresearch.agent import DeepResearchAgent, run_deepresearch_agent
+from app.agents.deepresearch.config import CONCURRENCY as DEEPRESEARCH_CONCURRENCY
+from app.agents.deepresearch.config import MCP_SERVERS as DEEPRESEARCH_MCP_SERVERS
+from app.agents.newprojectanalyse.agent import run_newprojectanalyse_agent
+from app.agents.newprojectanalyse.config import CONCURRENCY as NEWPROJECTANALYSE_CONCURRENCY
+from app.agents.newprojectanalyse.config import MCP_SERVERS as NEWPROJECTANALYSE_MCP_SERVERS
 from app.api.routes import router
+from app.core.task_queue import task_queue
+from app.services.http_client import close_http_client
+from app.services.mcp_pool import mcp_pool
+from app.services.notion import close_async_clients
+from app.services.notion_buffer import quicknote_buffer
+from app.services.session_pool import session_pool
+
+# 注册任务队列处理函数
+task_queue.register("newprojectanalyse", run_newprojectanalyse_agent, NEWPROJECTANALYSE_CONCURRENCY)
+task_queue.register("deepresearch", run_deepresearch_agent, DEEPRESEARCH_CONCURRENCY)
+
+
+logger = logging.getLogger(__name__)
+
+# 等待 MCP 服务器就绪的最多次数（每次最长等待服务器的启动超时，之间指数退避）
+WARM_MAX_ATTEMPTS = 5
+
+
+async def warm_session_pool() -> None:
+    """等待 MCP 服务器全部就绪后预启动会话（就绪前 get_options() 使用原始 stdio 配置，与任务运行时不同）"""
+    for attempt in range(WARM_MAX_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(min(2 ** (attempt - 1), 60))
+        if await mcp_pool.start(DEEPRESEARCH_MCP_SERVERS):
+            DeepResearchAgent().warm_session_pool()
+            return
+    logger.warning("deepresearch 的 MCP 服务器未就绪，放弃预启动会话（任务运行时按需启动）")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期
+
+    启动时在后台预热常驻 MCP 服务器和会话池（不等待就绪），再拉起任务队列 worker（继续执行上次未完成的任务）；
+    关闭时停止 worker、写入缓冲中的笔记、关闭会话和 MCP 服务器并释放共享的 HTTP 连接池。
+    """
+    # 服务器就绪前任务使用原始 stdio 配置，启动失败的服务器不拖慢应用启动
+    await mcp_pool.start(NEWPROJECTANALYSE_MCP_SERVERS, wait=False)
+    await mcp_pool.start(DEEPRESEARCH_MCP_SERVERS, wait=False)
+    # 配置固定的 Agent 在后台预启动会话（MCP 服务器就绪后配置才稳定）
+    warm_task = asyncio.create_task(warm_session_pool())
+    await task_queue.start()
+    yield
+    warm_task.cancel()
+    await task_queue.stop()
+    await quicknote_buffer.flush_all()
+    await session_pool.stop()
+    await mcp_pool.stop()
+    await close_async_clients()
+    await close_http_client()
+
 
 app = FastAPI(
     title="Agent API",
     description="工程化的 Agent 服务接口",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # 注册路由
@@ -0,0 +1,99 @@
+"""arXiv 论文辅助函数"""
+import logging
+import re
+import xml.etree.ElementTree as ET
+from typing import NamedTuple, Optional
+
+import httpx
+
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_PDF_URL = "https://arxiv.org/pdf"
+
+# https://arxiv.org/{abs|pdf|html}/{id}[vN][.pdf]，id 为 2401.12345 或 hep-th/9901001 格式
+_ARXIV_URL_PATTERN = re.compile(
+    r"^https?://(?:www\.|export\.)?arxiv\.org/(?:abs|pdf|html)/"
+    r"(\d{4}\.\d{4,5}|[a-z-]+(?:\.[A-Z]{2})?/\d{7})(v\d+)?(?:\.pdf)?/?(?:[?#].*)?$",
+    re.IGNORECASE,
+)
+_ATOM_NS = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+
+
+class ArxivPaper(NamedTuple):
+    """论文元数据"""
+    arxiv_id: str  # 含版本号（如 2401.12345v2）
+    title: str
+    authors: list[str]
+    abstract: str
+    published: str  # YYYY-MM-DD
+    updated: str  # YYYY-MM-DD
+    categories: list[str]  # 第一项为主分类
+
+
+def parse_arxiv_url(url: str) -> Optional[str]:
+    """
+    解析 arXiv 论文 URL
+
+    Returns:
+        论文 ID（指定了版本时包含版本号），无法解析时返回 None
+    """
+    match = _ARXIV_URL_PATTERN.match(url.strip())
+    if not match:
+        return None
+    arxiv_id, version = match.groups()
+    return arxiv_id + (version or "")
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return " ".join((element.text or "").split()) if element is not None else ""
+
+
+async def fetch_arxiv_metadata(arxiv_id: str, timeout: float = 10) -> Optional[ArxivPaper]:
+    """
+    通过 arXiv API 获取论文元数据
+
+    Args:
+        arxiv_id: 论文 ID
+        timeout: 请求超时（秒）
+
+    Returns:
+        ArxivPaper，请求失败或论文不存在时返回 None
+    """
+    try:
+        response = await get_http_client().get(
+            ARXIV_API_URL, params={"id_list": arxiv_id, "max_results": 1}, timeout=timeout
+        )
+    except httpx.HTTPError as e:
+        logger.warning(f"arXiv API 请求失败 {arxiv_id}: {e}")
+        return None
+    if response.status_code != 200:
+        logger.warning(f"arXiv API 请求失败 {arxiv_id}: HTTP {response.status_code}")
+        return None
+
+    try:
+        entry = ET.fromstring(response.content).find("atom:entry", _ATOM_NS)
+    except ET.ParseError as e:
+        logger.warning(f"arXiv API 响应解析失败 {arxiv_id}: {e}")
+        return None
+    # 不存在的 ID 返回一条只有 id 的错误条目
+    if entry is None or entry.find("atom:title", _ATOM_NS) is None:
+        return None
+
+    entry_id = _text(entry.find("atom:id", _ATOM_NS))
+    primary = entry.find("arxiv:primary_category", _ATOM_NS)
+    categories = [c.get("term", "") for c in entry.findall("atom:category", _ATOM_NS)]
+    if primary is not None and primary.get("term") in categories:
+        categories.remove(primary.get("term"))
+        categories.insert(0, primary.get("term"))
+    return ArxivPaper(
+        arxiv_id=entry_id.rsplit("/abs/", 1)[-1] or arxiv_id,
+        title=_text(entry.find("atom:title", _ATOM_NS)),
+        authors=[_text(a.find("atom:name", _ATOM_NS)) for a in entry.findall("atom:author", _ATOM_NS)],
+        abstract=_text(entry.find("atom:summary", _ATOM_NS)),
+        published=_text(entry.find("atom:published", _ATOM_NS))[:10],
+        updated=_text(entry.find("atom:updated", _ATOM_NS))[:10],
+        categories=[c for c in categories if c],
+    )
@@ -0,0 +1,123 @@
+"""磁盘 LRU 缓存"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLRUCache:
+    """
+    基于目录的 JSON 磁盘缓存
+
+    - 每个 key 对应一个文件，文件名为 key 的 SHA-256
+    - 写入使用临时文件 + 原子替换，读取中途不会看到半写入的数据
+    - 以文件 mtime 作为最近访问时间，总大小超过上限时淘汰最久未访问的条目
+    - 读取时可指定最大存活时间，过期条目视为未命中
+    - 统计命中/未命中次数
+
+    方法均为同步文件 IO，异步代码中应通过 asyncio.to_thread 调用。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存 key
+            max_age: 最大存活时间（秒），超过视为未命中；None 表示不过期
+
+        Returns:
+            缓存值，未命中返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            value = entry["value"]
+            expired = max_age is not None and time.time() - entry["created_at"] > max_age
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            value, expired = None, True
+
+        with self._lock:
+            if expired:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if expired:
+            return None
+
+        try:
+            os.utime(path)  # 刷新最近访问时间
+        except FileNotFoundError:
+            pass
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """写入缓存，并在超出大小上限时淘汰旧条目"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        """删除缓存条目"""
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰条目，直到总大小不超过上限"""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                logger.info(f"缓存淘汰: {path.name} ({size} 字节)")
+
+    def stats(self) -> dict:
+        """返回命中统计 {"hits", "misses", "hit_rate"}"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,438 @@
+"""GitHub 仓库辅助函数"""
+import asyncio
+import base64
+import logging
+import os
+import re
+from typing import Any, NamedTuple, Optional
+from urllib.parse import quote
+
+import httpx
+
+from app.services.disk_cache import DiskLRUCache
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# https://github.com/{owner}/{repo}[.git][/tree/{ref}[/{subpath}]]
+_GITHUB_REPO_PATTERN = re.compile(
+    r'^https?://(?:www\.)?github\.com/([\w.-]+)/([\w.-]+?)(?:\.git)?'
+    r'(?:/tree/([^/?#]+)(?:/([^?#]*))?)?/?(?:[?#].*)?$',
+    re.IGNORECASE,
+)
+# 单个文件：github.com/{owner}/{repo}/{blob|raw}/{ref}/{path}、raw.githubusercontent.com、gist 的 raw 链接
+_GITHUB_BLOB_PATTERN = re.compile(
+    r'^https?://(?:www\.)?github\.com/([\w.-]+)/([\w.-]+)/(?:blob|raw)/([^?#]+)', re.IGNORECASE
+)
+_GITHUB_RAW_PATTERN = re.compile(
+    r'^https?://(?:raw|gist)\.githubusercontent\.com/[^?#]+', re.IGNORECASE
+)
+# https://gist.github.com/[{user}/]{id}
+_GIST_PATTERN = re.compile(
+    r'^https?://gist\.github\.com/(?:[\w-]+/)?([0-9a-f]{7,})/?(?:[?#].*)?$', re.IGNORECASE
+)
+
+_SHA_PATTERN = re.compile(r"[0-9a-f]{40}")
+
+LS_REMOTE_TIMEOUT = 15  # git ls-remote 超时（秒）
+GITHUB_API_URL = "https://api.github.com"
+
+
+class GitHubRepo(NamedTuple):
+    """GitHub 仓库定位信息"""
+    owner: str
+    repo: str
+    ref: Optional[str] = None  # 分支/标签，None 表示默认分支
+    subpath: str = ""  # /tree/{ref}/ 之后的子目录
+
+    @property
+    def clone_url(self) -> str:
+        return f"https://github.com/{self.owner}/{self.repo}.git"
+
+    @property
+    def web_url(self) -> str:
+        """规范化的仓库 URL（保留 /tree/{ref}/{subpath}，去掉查询参数和锚点）"""
+        url = f"https://github.com/{self.owner}/{self.repo}"
+        if self.ref:
+            url += f"/tree/{self.ref}"
+            if self.subpath:
+                url += f"/{self.subpath}"
+        return url
+
+
+def parse_github_repo_url(url: str) -> Optional[GitHubRepo]:
+    """
+    解析 GitHub 仓库 URL
+
+    Returns:
+        GitHubRepo，无法解析时返回 None
+    """
+    match = _GITHUB_REPO_PATTERN.match(url.strip())
+    if not match:
+        return None
+    owner, repo, ref, subpath = match.groups()
+    return GitHubRepo(owner, repo, ref, (subpath or "").strip("/"))
+
+
+def github_raw_url(url: str) -> Optional[str]:
+    """
+    GitHub 单个文件的 URL 转换为原始内容 URL
+
+    Returns:
+        raw.githubusercontent.com（或 gist.githubusercontent.com）URL，不是单个文件时返回 None
+    """
+    url = url.strip()
+    match = _GITHUB_BLOB_PATTERN.match(url)
+    if match:
+        owner, repo, path = match.groups()
+        return f"https://raw.githubusercontent.com/{owner}/{repo}/{path}"
+    match = _GITHUB_RAW_PATTERN.match(url)
+    return match.group(0) if match else None
+
+
+def parse_gist_url(url: str) -> Optional[str]:
+    """
+    解析 Gist URL
+
+    Returns:
+        Gist ID，无法解析时返回 None
+    """
+    match = _GIST_PATTERN.match(url.strip())
+    return match.group(1) if match else None
+
+
+async def _git_ls_remote(repo: GitHubRepo, ref: Optional[str], *options: str) -> Optional[str]:
+    """执行 git ls-remote [options] {clone_url} [ref]（不克隆仓库），失败或超时时返回 None"""
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    patterns = [ref] if ref else []
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "git", "ls-remote", *options, repo.clone_url, *patterns,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=env,
+        )
+    except OSError as e:
+        logger.warning(f"无法执行 git ls-remote: {e}")
+        return None
+
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=LS_REMOTE_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.warning(f"git ls-remote 超时: {repo.clone_url} {ref or ''}")
+        return None
+    except asyncio.CancelledError:
+        # 调用方整体超时（如 UrlResolver）时不留下 git 进程
+        if proc.returncode is None:
+            proc.kill()
+        raise
+
+    if proc.returncode != 0:
+        return None
+    return stdout.decode("utf-8", errors="replace")
+
+
+def _parse_ls_remote(output: str) -> dict[str, str]:
+    """解析 ls-remote 输出为 {ref 全名: sha}"""
+    refs = {}
+    for line in output.splitlines():
+        sha, _, name = line.partition("\t")
+        if _SHA_PATTERN.fullmatch(sha) and name:
+            refs[name] = sha
+    return refs
+
+
+async def resolve_repo_ref(repo: GitHubRepo) -> GitHubRepo:
+    """
+    按远端分支和标签拆分 /tree/ 之后的 ref 和子目录
+
+    URL 中分支名可能含斜杠（/tree/release/1.x/src 中 ref 为 release/1.x），
+    正则只能按第一个斜杠拆分；这里用 git ls-remote --heads --tags 取最长的匹配前缀。
+    没有子目录（不存在歧义）、ref 为提交 SHA 或列出失败时原样返回。
+    """
+    if not repo.ref or not repo.subpath or _SHA_PATTERN.fullmatch(repo.ref):
+        return repo
+    output = await _git_ls_remote(repo, None, "--heads", "--tags")
+    if output is None:
+        return repo
+
+    full = f"{repo.ref}/{repo.subpath}"
+    best = None
+    for name in _parse_ls_remote(output):
+        short = name.removesuffix("^{}").split("/", 2)[-1]
+        if (full == short or full.startswith(short + "/")) and (best is None or len(short) > len(best)):
+            best = short
+    if best is None or best == repo.ref:
+        return repo
+    return repo._replace(ref=best, subpath=full[len(best):].strip("/"))
+
+
+async def resolve_commit_sha(repo: GitHubRepo) -> Optional[str]:
+    """
+    通过 git ls-remote 解析仓库当前提交 SHA（不克隆仓库）
+
+    ref 需已按 resolve_repo_ref 拆分；只接受完全匹配的分支或标签
+    （ls-remote 的模式按后缀匹配，main 也会匹配 refs/heads/x/main）。
+
+    Args:
+        repo: GitHub 仓库定位信息
+
+    Returns:
+        40 位提交 SHA，解析失败（私有仓库、网络错误、ref 不存在）时返回 None
+    """
+    if repo.ref and _SHA_PATTERN.fullmatch(repo.ref):
+        return repo.ref
+    output = await _git_ls_remote(repo, repo.ref or "HEAD")
+    if output is None:
+        return None
+
+    refs = _parse_ls_remote(output)
+    if not repo.ref:
+        return refs.get("HEAD")
+    # 与 git clone --branch 一致：分支优先；附注标签取其指向的提交（refs/tags/x^{}）
+    for name in (f"refs/heads/{repo.ref}", f"refs/tags/{repo.ref}^{{}}", f"refs/tags/{repo.ref}"):
+        if name in refs:
+            return refs[name]
+    return None
+
+
+async def resolve_default_branch(repo: GitHubRepo) -> Optional[str]:
+    """
+    通过 git ls-remote --symref 解析仓库默认分支（不消耗 GitHub API 限额）
+
+    Returns:
+        默认分支名，解析失败时返回 None
+    """
+    output = await _git_ls_remote(repo, "HEAD", "--symref")
+    for line in (output or "").splitlines():
+        # ref: refs/heads/main\tHEAD
+        if line.startswith("ref: refs/heads/") and line.endswith("\tHEAD"):
+            return line[len("ref: refs/heads/"):-len("\tHEAD")]
+    return None
+
+
+async def github_api_get(
+    path: str,
+    cache: Optional[DiskLRUCache] = None,
+    token: str = "",
+    timeout: float = 10,
+) -> Optional[Any]:
+    """
+    请求 GitHub REST API（ETag 条件请求）
+
+    缓存中有上次的响应时带 If-None-Match 请求，304 直接返回缓存内容
+    （304 响应不消耗 API 速率限额）。
+
+    Args:
+        path: API 路径（如 /repos/owner/repo）
+        cache: 响应缓存，None 表示不缓存
+        token: GitHub token，为空时匿名请求
+        timeout: 请求超时（秒）
+
+    Returns:
+        解析后的 JSON，请求失败时返回 None（响应不是有效 JSON 时返回缓存内容或 None）
+    """
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    cached = await asyncio.to_thread(cache.get, path) if cache else None
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+
+    try:
+        response = await get_http_client().get(f"{GITHUB_API_URL}{path}", headers=headers, timeout=timeout)
+    except httpx.HTTPError as e:
+        logger.warning(f"GitHub API 请求失败 {path}: {e}")
+        return None
+    if response.status_code == 304 and cached:
+        return cached["data"]
+    if response.status_code != 200:
+        logger.warning(f"GitHub API 请求失败 {path}: HTTP {response.status_code}")
+        return None
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        # HTML 错误页或被截断的响应；有上次的缓存时继续使用
+        logger.warning(f"GitHub API 响应不是有效的 JSON {path}: {e}")
+        return cached["data"] if cached else None
+    if cache and response.headers.get("etag"):
+        await asyncio.to_thread(cache.set, path, {"etag": response.headers["etag"], "data": data})
+    return data
+
+
+def _repo_api_path(repo: GitHubRepo) -> str:
+    # 仓库名大小写不敏感，统一小写使 API 缓存 key 一致
+    return f"/repos/{repo.owner}/{repo.repo}".lower()
+
+
+async def fetch_repo_info(
+    repo: GitHubRepo,
+    cache: Optional[DiskLRUCache] = None,
+    token: str = "",
+    timeout: float = 10,
+) -> Optional[dict]:
+    """
+    获取仓库元数据（/repos/{owner}/{repo}，含 star、fork 数和仓库大小 size，单位 KB）
+
+    Returns:
+        GitHub API 的仓库对象，请求失败时返回 None
+    """
+    data = await github_api_get(_repo_api_path(repo), cache, token, timeout)
+    return data if isinstance(data, dict) else None
+
+
+async def fetch_repo_stats(
+    repo: GitHubRepo,
+    cache: Optional[DiskLRUCache] = None,
+    token: str = "",
+    timeout: float = 10,
+    info: Optional[dict] = None,
+) -> Optional[dict]:
+    """
+    获取仓库统计信息（star、fork 数和最后提交日期，两个请求并发执行）
+
+    Args:
+        repo: GitHub 仓库定位信息
+        cache: API 响应缓存
+        token: GitHub token
+        timeout: 请求超时（秒）
+        info: 已获取的仓库元数据（fetch_repo_info），传入时不再重复请求
+
+    Returns:
+        {"stars", "forks", "last_commit"}，仓库信息获取失败时返回 None；
+        只有提交信息获取失败时 last_commit 为 "N/A"。
+        指定了子目录时 last_commit 为该子目录的最后提交日期
+    """
+    commits_path = f"{_repo_api_path(repo)}/commits?per_page=1"
+    if repo.ref:
+        commits_path += f"&sha={quote(repo.ref, safe='')}"
+    if repo.subpath:
+        commits_path += f"&path={quote(repo.subpath)}"
+    if info is None:
+        info, commits = await asyncio.gather(
+            fetch_repo_info(repo, cache, token, timeout),
+            github_api_get(commits_path, cache, token, timeout),
+        )
+    else:
+        commits = await github_api_get(commits_path, cache, token, timeout)
+    if not isinstance(info, dict):
+        return None
+
+    last_commit = "N/A"
+    if isinstance(commits, list) and commits:
+        date = commits[0].get("commit", {}).get("committer", {}).get("date") or ""
+        last_commit = date[:10] or "N/A"
+    return {
+        "stars": info.get("stargazers_count", 0),
+        "forks": info.get("forks_count", 0),
+        "last_commit": last_commit,
+    }
+
+
+async def fetch_readme(
+    repo: GitHubRepo,
+    cache: Optional[DiskLRUCache] = None,
+    token: str = "",
+    timeout: float = 10,
+) -> Optional[tuple[str, str]]:
+    """
+    通过 API 获取 README（仓库根目录，指定了子目录时为该子目录的 README），不需要克隆
+
+    Returns:
+        (path, text)，不存在或请求失败时返回 None
+    """
+    path = f"{_repo_api_path(repo)}/readme"
+    if repo.subpath:
+        path += f"/{quote(repo.subpath)}"
+    if repo.ref:
+        path += f"?ref={quote(repo.ref, safe='')}"
+    data = await github_api_get(path, cache, token, timeout)
+    if not isinstance(data, dict) or data.get("encoding") != "base64":
+        return None
+    try:
+        text = base64.b64decode(data.get("content") or "").decode("utf-8", errors="replace")
+    except ValueError:
+        return None
+    return data.get("path") or "README.md", text
+
+
+async def fetch_repo_listing(
+    repo: GitHubRepo,
+    cache: Optional[DiskLRUCache] = None,
+    token: str = "",
+    timeout: float = 10,
+) -> Optional[list[dict]]:
+    """
+    通过 API 列出仓库根目录（或子目录）下的条目，不需要克隆
+
+    Returns:
+        [{"name", "path", "type", ...}]（type 为 file/dir/symlink/submodule），请求失败时返回 None
+    """
+    path = f"{_repo_api_path(repo)}/contents"
+    if repo.subpath:
+        path += f"/{quote(repo.subpath)}"
+    if repo.ref:
+        path += f"?ref={quote(repo.ref, safe='')}"
+    data = await github_api_get(path, cache, token, timeout)
+    return data if isinstance(data, list) else None
+
+
+async def fetch_raw_text(
+    raw_url: str, timeout: float = 15, max_bytes: int = 1024 * 1024
+) -> Optional[tuple[str, bool]]:
+    """
+    获取文本文件内容（流式读取，最多 max_bytes 字节）
+
+    Args:
+        raw_url: 原始内容 URL
+        timeout: 请求超时（秒）
+        max_bytes: 最多读取的字节数，超出部分丢弃
+
+    Returns:
+        (text, 是否被截断)，请求失败或为二进制文件时返回 None
+    """
+    chunks = []
+    size = 0
+    truncated = False
+    try:
+        async with get_http_client().stream("GET", raw_url, timeout=timeout) as response:
+            if response.status_code != 200:
+                logger.warning(f"获取文件失败 {raw_url}: HTTP {response.status_code}")
+                return None
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    truncated = True
+                    break
+    except httpx.HTTPError as e:
+        logger.warning(f"获取文件失败 {raw_url}: {e}")
+        return None
+
+    data = b"".join(chunks)[:max_bytes]
+    # 开头出现 NUL 字节视为二进制文件
+    if b"\x00" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace"), truncated
+
+
+async def fetch_gist(
+    gist_id: str,
+    cache: Optional[DiskLRUCache] = None,
+    token: str = "",
+    timeout: float = 10,
+) -> Optional[dict]:
+    """
+    获取 Gist 的描述和文件内容（单个文件超过 1 MB 时 API 返回截断的内容，truncated 为 true）
+
+    Returns:
+        GitHub API 的 Gist 对象，请求失败时返回 None
+    """
+    data = await github_api_get(f"/gists/{gist_id}", cache, token, timeout)
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,39 @@
+"""共享的网页请求 HTTP 客户端"""
+from typing import Optional
+
+import httpx
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36 agent-api/1.0"
+)
+
+# 连接池配置（抓取网页、验证缓存共用）
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    获取进程内共享的异步 HTTP 客户端
+
+    复用连接池和 TLS 会话，同一站点的多次请求不必重新握手。
+    自动跟随重定向；超时由调用方按请求指定。
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=POOL_LIMITS,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """关闭共享客户端（应用关闭时调用）"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
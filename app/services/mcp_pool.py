@@ -0,0 +1,416 @@
+"""常驻 MCP 服务器池"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from claude_agent_sdk import create_sdk_mcp_server, tool
+
+from app.config import MCP_POOL_CONFIG
+from app.services.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def _field(obj: Any, name: str, legacy_name: str) -> Any:
+    """读取 mcp 类型的字段（mcp 2.x 为 snake_case，1.x 为 camelCase）"""
+    value = getattr(obj, name, None)
+    return value if value is not None else getattr(obj, legacy_name, None)
+
+
+class ToolResultCache:
+    """
+    MCP 工具结果缓存
+
+    - 结果按 key_fn(参数) 存入磁盘缓存，有效期内相同 key 的调用直接返回缓存结果
+    - 相同 key 的并发调用只转发一次，其余调用等待同一结果
+    - 错误结果不缓存
+    """
+
+    def __init__(self, cache: DiskLRUCache, ttl: float, key_fn: Callable[[Dict[str, Any]], str]):
+        """
+        Args:
+            cache: 磁盘缓存
+            ttl: 缓存有效期（秒）
+            key_fn: 由工具参数生成缓存 key
+        """
+        self.cache = cache
+        self.ttl = ttl
+        self.key_fn = key_fn
+        self.merged = 0  # 合并到进行中调用的次数
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def call(self, args: Dict[str, Any], fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        读取缓存，未命中时调用 fetch() 并写入缓存
+
+        Args:
+            args: 工具参数
+            fetch: 实际调用工具的协程函数
+        """
+        key = self.key_fn(args)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.merged += 1
+            return await asyncio.shield(inflight)
+
+        # 读取磁盘缓存前先登记，读取期间到达的相同调用也会合并
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._lookup(key, args)
+            if result is None:
+                result = await self._fetch_and_store(key, args, fetch)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _lookup(self, key: str, args: Dict[str, Any]) -> Optional[dict]:
+        """读取有效的缓存结果，子类可覆盖（如先向源站确认内容未变化）"""
+        return await asyncio.to_thread(self.cache.get, key, self.ttl)
+
+    async def _fetch_and_store(
+        self, key: str, args: Dict[str, Any], fetch: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """调用工具并缓存非错误结果，子类可覆盖"""
+        result = await fetch()
+        if not result.get("is_error"):
+            await asyncio.to_thread(self.cache.set, key, result)
+        return result
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "merged": self.merged}
+
+
+class PooledMcpServer:
+    """
+    单个常驻的 stdio MCP 服务器
+
+    由一个 supervisor 协程负责启动、健康检查和崩溃后重启；
+    客户端会话支持并发请求，多个 Agent 任务共享同一个服务器进程。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: Dict[str, Any],
+        health_check_interval: float,
+        startup_timeout: float,
+        call_timeout: float,
+    ):
+        """
+        Args:
+            name: 服务器名称（即 mcp_servers 中的 key，决定工具名前缀 mcp__{name}__）
+            config: stdio 服务器配置（command / args / env）
+            health_check_interval: 健康检查间隔（秒）
+            startup_timeout: 启动超时（秒）
+            call_timeout: 单次工具调用超时（秒）
+        """
+        self.name = name
+        self.config = config
+        self.health_check_interval = health_check_interval
+        self.startup_timeout = startup_timeout
+        self.call_timeout = call_timeout
+
+        self._session = None
+        self._tools: list = []
+        self._ready = asyncio.Event()
+        self._supervisor: Optional[asyncio.Task] = None
+
+        # 统计
+        self.startup_ms: Optional[float] = None
+        self.starts = 0
+        self.failures = 0
+        self.calls = 0
+        self.call_errors = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        """启动 supervisor（重复调用无副作用）"""
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self._supervise())
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """等待服务器就绪"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _supervise(self) -> None:
+        """启动服务器并保持运行，异常退出后按指数退避重启"""
+        backoff = 1.0
+        while True:
+            try:
+                await self._run_once()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"MCP 服务器 {self.name} 异常退出，{backoff:.0f} 秒后重启: {e}")
+            finally:
+                self._ready.clear()
+                self._session = None
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _run_once(self) -> None:
+        """启动一次服务器进程，就绪后定期健康检查，检查失败时抛出异常"""
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        params = StdioServerParameters(
+            command=self.config["command"],
+            args=list(self.config.get("args", [])),
+            env={**os.environ, **self.config.get("env", {})},
+        )
+        start = time.perf_counter()
+        async with AsyncExitStack() as stack:
+            read, write = await stack.enter_async_context(stdio_client(params))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await asyncio.wait_for(session.initialize(), timeout=self.startup_timeout)
+            result = await asyncio.wait_for(session.list_tools(), timeout=self.startup_timeout)
+
+            self._tools = list(result.tools)
+            self._session = session
+            self.startup_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.starts += 1
+            self._ready.set()
+            logger.info(
+                f"MCP 服务器 {self.name} 已就绪: {len(self._tools)} 个工具, "
+                f"启动耗时 {self.startup_ms} ms"
+            )
+
+            while True:
+                await asyncio.sleep(self.health_check_interval)
+                await asyncio.wait_for(session.send_ping(), timeout=self.call_timeout)
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> dict:
+        """
+        调用工具
+
+        Returns:
+            SDK 工具返回格式 {"content": [...], "is_error": bool}
+        """
+        if not await self.wait_ready(self.startup_timeout):
+            return {
+                "content": [{"type": "text", "text": f"MCP 服务器 {self.name} 不可用"}],
+                "is_error": True,
+            }
+
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self._session.call_tool(tool_name, arguments),
+                timeout=self.call_timeout,
+            )
+        except Exception:
+            self.call_errors += 1
+            raise
+        finally:
+            latency = (time.perf_counter() - start) * 1000
+            self.calls += 1
+            self.total_latency_ms += latency
+            self.max_latency_ms = max(self.max_latency_ms, latency)
+
+        is_error = bool(_field(result, "is_error", "isError"))
+        if is_error:
+            self.call_errors += 1
+        return {
+            "content": [item.model_dump(by_alias=True, exclude_none=True) for item in result.content],
+            "is_error": is_error,
+        }
+
+    def as_sdk_server(self, tool_caches: Optional[Dict[str, ToolResultCache]] = None):
+        """
+        生成转发到本服务器的进程内 MCP 服务器配置（工具名与原服务器一致）
+
+        Args:
+            tool_caches: {工具名: 结果缓存}，配置了缓存的工具先查缓存再转发
+        """
+        tool_caches = tool_caches or {}
+
+        def make_tool(upstream):
+            cache = tool_caches.get(upstream.name)
+
+            async def handler(args: dict) -> dict:
+                if cache is None:
+                    return await self.call_tool(upstream.name, args)
+                return await cache.call(args, lambda: self.call_tool(upstream.name, args))
+
+            schema = _field(upstream, "input_schema", "inputSchema") or {"type": "object"}
+            return tool(upstream.name, upstream.description or "", schema)(handler)
+
+        return create_sdk_mcp_server(name=self.name, tools=[make_tool(t) for t in self._tools])
+
+    def stats(self) -> dict:
+        """返回状态和延迟统计"""
+        return {
+            "ready": self.ready,
+            "tools": len(self._tools),
+            "startup_ms": self.startup_ms,
+            "starts": self.starts,
+            "failures": self.failures,
+            "calls": self.calls,
+            "call_errors": self.call_errors,
+            "avg_latency_ms": round(self.total_latency_ms / self.calls, 1) if self.calls else None,
+            "max_latency_ms": round(self.max_latency_ms, 1) if self.calls else None,
+        }
+
+    async def stop(self) -> None:
+        """停止 supervisor 和服务器进程"""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+            self._supervisor = None
+
+
+class McpServerPool:
+    """
+    常驻 MCP 服务器池
+
+    - 每个 stdio 服务器配置只启动一个进程，按配置内容去重，所有 Agent 任务共享
+    - 服务器就绪后，Agent 的 mcp_servers 中对应条目替换为进程内转发服务器，
+      Claude Code 不再为每个任务重新 npx 启动
+    - 未就绪（启动中、重启中）时保留原配置，由 Claude Code 自行启动，任务不受影响
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        health_check_interval: float = 30,
+        startup_timeout: float = 60,
+        call_timeout: float = 120,
+    ):
+        self.enabled = enabled
+        self.health_check_interval = health_check_interval
+        self.startup_timeout = startup_timeout
+        self.call_timeout = call_timeout
+        self._servers: Dict[str, PooledMcpServer] = {}
+        self._tool_caches: Dict[str, Dict[str, ToolResultCache]] = {}
+
+    def set_tool_cache(self, server_name: str, tool_name: str, cache: ToolResultCache) -> None:
+        """
+        为指定服务器的工具配置结果缓存（经池转发的调用生效）
+
+        Args:
+            server_name: 服务器名称（mcp_servers 中的 key）
+            tool_name: 工具名称（不含 mcp__{server}__ 前缀）
+            cache: 结果缓存
+        """
+        self._tool_caches.setdefault(server_name, {})[tool_name] = cache
+
+    @staticmethod
+    def _is_stdio(config: Dict[str, Any]) -> bool:
+        return config.get("type", "stdio") == "stdio" and "command" in config
+
+    @staticmethod
+    def _key(name: str, config: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+        return f"{name}:{digest[:16]}"
+
+    def _get_or_create(self, name: str, config: Dict[str, Any]) -> PooledMcpServer:
+        key = self._key(name, config)
+        server = self._servers.get(key)
+        if server is None:
+            server = PooledMcpServer(
+                name, config,
+                health_check_interval=self.health_check_interval,
+                startup_timeout=self.startup_timeout,
+                call_timeout=self.call_timeout,
+            )
+            self._servers[key] = server
+        server.start()
+        return server
+
+    async def start(self, mcp_servers: Dict[str, Dict[str, Any]], wait: bool = True) -> bool:
+        """
+        预热服务器
+
+        Args:
+            mcp_servers: mcp_servers 配置（可合并多个 Agent 的配置）
+            wait: 是否等待全部就绪（超时不报错，服务器继续在后台启动）
+
+        Returns:
+            服务器是否全部就绪（此后 get_mcp_servers() 的结果不再变化）
+        """
+        if not self.enabled:
+            return True
+        servers = [
+            self._get_or_create(name, config)
+            for name, config in mcp_servers.items()
+            if self._is_stdio(config)
+        ]
+        if wait and servers:
+            await asyncio.gather(*(s.wait_ready(self.startup_timeout) for s in servers))
+        return all(s.ready for s in servers)
+
+    def get_mcp_servers(self, mcp_servers: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        将 mcp_servers 配置中已就绪的 stdio 服务器替换为共享的转发服务器
+
+        需要在事件循环中调用（首次遇到的配置会在后台开始启动）。
+
+        Args:
+            mcp_servers: Agent 的 mcp_servers 配置
+
+        Returns:
+            可直接传给 ClaudeAgentOptions.mcp_servers 的配置
+        """
+        if not self.enabled:
+            return dict(mcp_servers)
+        result: Dict[str, Any] = {}
+        for name, config in mcp_servers.items():
+            if not isinstance(config, dict) or not self._is_stdio(config):
+                result[name] = config
+                continue
+            server = self._get_or_create(name, config)
+            result[name] = (
+                server.as_sdk_server(self._tool_caches.get(name)) if server.ready else config
+            )
+        return result
+
+    def stats(self) -> Dict[str, dict]:
+        """返回各服务器的状态、延迟统计和工具结果缓存命中率"""
+        result = {}
+        for key, server in self._servers.items():
+            stats = server.stats()
+            caches = self._tool_caches.get(server.name)
+            if caches:
+                stats["caches"] = {name: cache.stats() for name, cache in caches.items()}
+            result[key] = stats
+        return result
+
+    async def stop(self) -> None:
+        """停止所有服务器"""
+        await asyncio.gather(*(s.stop() for s in self._servers.values()))
+        self._servers.clear()
+
+
+# 全局 MCP 服务器池
+mcp_pool = McpServerPool(
+    enabled=MCP_POOL_CONFIG.get("enabled", True),
+    health_check_interval=MCP_POOL_CONFIG.get("health_check_interval", 30),
+    startup_timeout=MCP_POOL_CONFIG.get("startup_timeout", 60),
+    call_timeout=MCP_POOL_CONFIG.get("call_timeout", 120),
+)
@@ -1,20 +1,96 @@
 """Notion API 服务封装"""
+import asyncio
 import json
+import random
 import re
 import time
 import logging
 
-from notion_client import Client
-from notion_client.errors import APIResponseError
+import httpx
+from notion_client import AsyncClient, Client
+from notion_client.errors import (
+    APIErrorCode,
+    APIResponseError,
+    HTTPResponseError,
+    RequestTimeoutError,
+)
+
+from app.config import NOTION_BURST, NOTION_MAX_RETRIES, NOTION_RATE_LIMIT
+from app.services.rate_limiter import RateLimiterRegistry
 
 logger = logging.getLogger(__name__)
 
+# 进程级共享限流器：同一 Integration Token 的所有请求共用一个令牌桶
+notion_rate_limiters = RateLimiterRegistry(NOTION_RATE_LIMIT, NOTION_BURST)
+
+# 可重试的 Notion API 错误码（限流、冲突、服务端错误）
+RETRYABLE_ERROR_CODES = {
+    APIErrorCode.RateLimited,
+    APIErrorCode.ConflictError,
+    APIErrorCode.InternalServerError,
+    APIErrorCode.ServiceUnavailable,
+    APIErrorCode.GatewayTimeout,
+}
+
+BASE_RETRY_DELAY = 1  # 指数退避基准延迟（秒）
+MAX_RETRY_DELAY = 30  # 单次退避上限（秒）
+
 
 class NotionWriteError(Exception):
     """Notion 写入失败异常"""
     pass
 
 
+def is_retryable_error(error: Exception) -> bool:
+    """
+    判断 Notion 操作错误是否值得重试
+
+    429、409、5xx、请求超时和网络错误可重试；
+    400 校验错误、401/403 权限错误、404 等永久性错误直接失败。
+    代理或负载均衡返回的非 Notion 格式错误（UnknownHTTPResponseError，如 HTML 502）按状态码判断。
+    """
+    if isinstance(error, APIResponseError) and error.code in RETRYABLE_ERROR_CODES:
+        return True
+    if isinstance(error, HTTPResponseError):
+        return error.status >= 500 or error.status == 429
+    if isinstance(error, RequestTimeoutError):
+        return True
+    if isinstance(error, httpx.TransportError):
+        return True
+    return False
+
+
+def _parse_retry_after(error: Exception) -> float | None:
+    """解析 Retry-After 响应头（秒），不存在或无效时返回 None"""
+    headers = getattr(error, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def get_retry_delay(error: Exception, attempt: int) -> float:
+    """
+    计算下次重试前的等待时间
+
+    优先使用服务端返回的 Retry-After，否则使用带抖动的指数退避。
+
+    Args:
+        error: 本次失败的异常
+        attempt: 已失败的次数（从 0 开始）
+    """
+    retry_after = _parse_retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_DELAY)
+    delay = min(BASE_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
 class BlockBuilder:
     """Notion 块类型构建辅助类"""
 
@@ -203,42 +279,49 @@ class BlockBuilder:
             }
         }
 
+    @staticmethod
+    def link_to_page(page_id: str) -> dict:
+        """构建页面链接块"""
+        return {
+            "object": "block",
+            "type": "link_to_page",
+            "link_to_page": {"type": "page_id", "page_id": page_id}
+        }
+
 
 class NotionService:
     """Notion API 封装服务"""
 
-    MAX_RETRIES = 3
-    RETRY_DELAYS = [1, 2, 4]  # 指数退避（秒）
+    MAX_RETRIES = NOTION_MAX_RETRIES
     MAX_BLOCKS_PER_REQUEST = 100  # Notion API 限制
 
     def __init__(self, token: str):
-        """初始化 Notion Client"""
-        self.client = Client(auth=token)
+        """初始化 Notion Client（关闭 SDK 内置重试，统一由 _retry_operation 处理）"""
+        self.client = Client(auth=token, retry=False)
+        self.limiter = notion_rate_limiters.get(token)
 
     def _retry_operation(self, operation, *args, **kwargs):
-        """带重试的操作执行"""
+        """带限流和重试的操作执行"""
         last_error = None
         for attempt in range(self.MAX_RETRIES):
+            self.limiter.acquire()
             try:
                 return operation(*args, **kwargs)
-            except APIResponseError as e:
-                last_error = e
-                logger.warning(
-                    f"Notion API 错误 (尝试 {attempt + 1}/{self.MAX_RETRIES}): {e}"
-                )
-                if attempt < self.MAX_RETRIES - 1:
-                    delay = self.RETRY_DELAYS[attempt]
-                    logger.info(f"等待 {delay} 秒后重试...")
-                    time.sleep(delay)
             except Exception as e:
                 last_error = e
+                if not is_retryable_error(e):
+                    logger.error(f"Notion 操作失败（不可重试）: {e}")
+                    raise NotionWriteError(f"Notion 操作失败: {e}") from e
+
                 logger.warning(
-                    f"非 API 错误 (尝试 {attempt + 1}/{self.MAX_RETRIES}): {e}"
+                    f"Notion 可重试错误 (尝试 {attempt + 1}/{self.MAX_RETRIES}): {e}"
                 )
                 if attempt < self.MAX_RETRIES - 1:
-                    # 非 API 错误使用较短的重试延迟
-                    delay = 1
-                    logger.info(f"等待 {delay} 秒后重试...")
+                    delay = get_retry_delay(e, attempt)
+                    if _parse_retry_after(e) is not None:
+                        # 429 时暂停整个 token 的令牌桶，避免其他任务继续撞限流
+                        self.limiter.penalize(delay)
+                    logger.info(f"等待 {delay:.1f} 秒后重试...")
                     time.sleep(delay)
 
         raise NotionWriteError(
@@ -315,6 +398,266 @@ class NotionService:
         logger.info("块追加成功")
 
 
+# 异步客户端连接池配置
+ASYNC_POOL_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5)
+
+# 按 token 缓存的异步客户端（进程内共享，复用底层连接池）
+_async_clients: dict[str, AsyncClient] = {}
+
+
+def get_async_client(token: str) -> AsyncClient:
+    """
+    获取指定 token 的共享异步 Notion Client
+
+    同一 token 的所有调用复用同一个 httpx 连接池，避免每次写入都重新握手。
+
+    Args:
+        token: Notion Integration Token
+
+    Returns:
+        AsyncClient 实例
+    """
+    client = _async_clients.get(token)
+    if client is None:
+        http_client = httpx.AsyncClient(limits=ASYNC_POOL_LIMITS)
+        # 关闭 SDK 内置重试，统一由 AsyncNotionService 限流和重试
+        client = AsyncClient(auth=token, client=http_client, retry=False)
+        _async_clients[token] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    """关闭所有共享的异步客户端（应用关闭时调用）"""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+class AsyncNotionService:
+    """
+    Notion API 异步封装服务
+
+    与 NotionService 接口一致，但不会阻塞事件循环，供 Agent 和 API 路由使用。
+    同步的 NotionService 保留给脚本等非异步场景。
+    """
+
+    MAX_RETRIES = NotionService.MAX_RETRIES
+    MAX_BLOCKS_PER_REQUEST = NotionService.MAX_BLOCKS_PER_REQUEST
+
+    def __init__(self, token: str):
+        """获取共享的异步 Notion Client 和该 token 的限流器"""
+        self.client = get_async_client(token)
+        self.limiter = notion_rate_limiters.get(token)
+
+    async def _retry_operation(self, operation, *args, **kwargs):
+        """带限流和重试的异步操作执行"""
+        last_error = None
+        for attempt in range(self.MAX_RETRIES):
+            await self.limiter.acquire_async()
+            try:
+                return await operation(*args, **kwargs)
+            except Exception as e:
+                last_error = e
+                if not is_retryable_error(e):
+                    logger.error(f"Notion 操作失败（不可重试）: {e}")
+                    raise NotionWriteError(f"Notion 操作失败: {e}") from e
+
+                logger.warning(
+                    f"Notion 可重试错误 (尝试 {attempt + 1}/{self.MAX_RETRIES}): {e}"
+                )
+                if attempt < self.MAX_RETRIES - 1:
+                    delay = get_retry_delay(e, attempt)
+                    if _parse_retry_after(e) is not None:
+                        # 429 时暂停整个 token 的令牌桶，避免其他任务继续撞限流
+                        self.limiter.penalize(delay)
+                    logger.info(f"等待 {delay:.1f} 秒后重试...")
+                    await asyncio.sleep(delay)
+
+        raise NotionWriteError(
+            f"Notion 操作在 {self.MAX_RETRIES} 次重试后失败: {last_error}"
+        ) from last_error
+
+    async def create_page(
+        self,
+        parent_page_id: str,
+        title: str,
+        blocks: list[dict]
+    ) -> str:
+        """
+        创建新页面并写入内容
+
+        Args:
+            parent_page_id: 父页面 ID
+            title: 页面标题
+            blocks: Notion 块列表（已转换为 Notion API 格式）
+
+        Returns:
+            新页面 ID
+        """
+        logger.info(f"创建 Notion 页面: {title}，共 {len(blocks)} 个块")
+
+        # 分批处理：首批用于创建页面，剩余批次追加
+        first_batch = blocks[:self.MAX_BLOCKS_PER_REQUEST]
+        remaining_blocks = blocks[self.MAX_BLOCKS_PER_REQUEST:]
+
+        async def _create():
+            return await self.client.pages.create(
+                parent={"page_id": parent_page_id},
+                properties={
+                    "title": [{"text": {"content": title}}]
+                },
+                children=first_batch
+            )
+
+        result = await self._retry_operation(_create)
+        page_id = result["id"]
+        page_url = result.get("url", "")
+        logger.info(f"页面创建成功: {page_id}, URL: {page_url}")
+
+        # 追加剩余块（同一页面的追加必须保持顺序）
+        if remaining_blocks:
+            logger.info(f"需追加 {len(remaining_blocks)} 个块")
+            try:
+                for i in range(0, len(remaining_blocks), self.MAX_BLOCKS_PER_REQUEST):
+                    batch = remaining_blocks[i:i + self.MAX_BLOCKS_PER_REQUEST]
+                    await self.append_blocks(page_id, batch)
+            except BaseException:
+                # 不留下只写了一部分的页面
+                await self.archive_page(page_id)
+                raise
+
+        return page_id
+
+    async def archive_page(self, page_id: str) -> None:
+        """
+        归档页面（移入回收站，子页面一并移入），用于清理写入失败的页面
+
+        尽力而为：归档失败只记录日志，不覆盖原来的错误。
+        """
+        async def _archive():
+            return await self.client.pages.update(page_id=page_id, archived=True)
+
+        try:
+            await self._retry_operation(_archive)
+            logger.info(f"已归档写入失败的页面: {page_id}")
+        except Exception as e:
+            logger.error(f"归档页面 {page_id} 失败，需手动删除: {e}")
+
+    async def append_blocks(
+        self,
+        page_id: str,
+        blocks: list[dict]
+    ) -> None:
+        """
+        向现有页面追加块内容
+
+        Args:
+            page_id: 页面 ID
+            blocks: Notion 块列表
+        """
+        logger.info(f"向页面 {page_id} 追加 {len(blocks)} 个块")
+
+        async def _append():
+            return await self.client.blocks.children.append(
+                block_id=page_id,
+                children=blocks
+            )
+
+        await self._retry_operation(_append)
+        logger.info("块追加成功")
+
+    async def create_page_with_subpages(
+        self,
+        parent_page_id: str,
+        title: str,
+        blocks: list[dict],
+        min_blocks: int = MAX_BLOCKS_PER_REQUEST,
+    ) -> str:
+        """
+        创建页面，长内容按 heading_1 拆分为并发写入的子页面
+
+        根页面保留第一个 heading_1 之前的内容，并追加指向各章节子页面的目录；
+        每个 heading_1 章节成为根页面下的一个子页面，各子页面并发写入，
+        总耗时取决于最大的章节而不是总块数。
+        内容不超过 min_blocks 或不足两个章节时，退化为普通 create_page。
+        任一子页面或目录写入失败时归档根页面后抛出异常，不留下不完整的报告。
+
+        Args:
+            parent_page_id: 父页面 ID
+            title: 页面标题
+            blocks: Notion 块列表（已转换为 Notion API 格式）
+            min_blocks: 触发拆分的最小块数
+
+        Returns:
+            根页面 ID
+        """
+        preamble, sections = split_blocks_by_heading(blocks)
+        if len(blocks) <= min_blocks or len(sections) < 2:
+            return await self.create_page(parent_page_id, title, blocks)
+
+        logger.info(f"内容共 {len(blocks)} 个块，拆分为 {len(sections)} 个子页面并发写入")
+        root_page_id = await self.create_page(parent_page_id, title, preamble)
+
+        try:
+            # 标题加序号，保证子页面在 Notion 中按章节顺序可读
+            results = await asyncio.gather(
+                *[
+                    self.create_page(root_page_id, f"{i:02d}. {heading}", section_blocks)
+                    for i, (heading, section_blocks) in enumerate(sections, start=1)
+                ],
+                return_exceptions=True,
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+
+            # gather 按提交顺序返回，目录与章节序号一致（与子页面完成先后无关）
+            toc_blocks = [BlockBuilder.heading(2, "目录")]
+            toc_blocks.extend(BlockBuilder.link_to_page(page_id) for page_id in results)
+            await self.append_blocks(root_page_id, toc_blocks)
+        except BaseException:
+            # 归档根页面（已创建的子页面随之移入回收站），重试时不会留下半成品和重复副本
+            await self.archive_page(root_page_id)
+            raise
+
+        return root_page_id
+
+
+def notion_page_url(page_id: str) -> str:
+    """根据页面 ID 生成 Notion 页面访问地址"""
+    return f"https://www.notion.so/{page_id.replace('-', '')}"
+
+
+def _block_plain_text(block: dict) -> str:
+    """提取 Notion 块的纯文本内容"""
+    rich_text = block.get(block.get("type", ""), {}).get("rich_text", [])
+    return "".join(item.get("text", {}).get("content", "") for item in rich_text)
+
+
+def split_blocks_by_heading(blocks: list[dict]) -> tuple[list[dict], list[tuple[str, list[dict]]]]:
+    """
+    按 heading_1 边界拆分 Notion 块列表
+
+    Args:
+        blocks: Notion API 格式的块列表
+
+    Returns:
+        tuple: (第一个 heading_1 之前的块, [(章节标题, 章节内容块), ...])
+        章节内容块不包含 heading_1 本身（标题用作子页面标题）
+    """
+    preamble: list[dict] = []
+    sections: list[tuple[str, list[dict]]] = []
+    for block in blocks:
+        if block.get("type") == "heading_1":
+            sections.append((_block_plain_text(block), []))
+        elif sections:
+            sections[-1][1].append(block)
+        else:
+            preamble.append(block)
+    return preamble, sections
+
+
 def parse_agent_output(output: str) -> dict:
     """
     从 Agent 输出中提取 JSON
@@ -0,0 +1,127 @@
+"""Notion 写入合并缓冲（write-behind）"""
+import asyncio
+import logging
+from collections import OrderedDict
+
+from app.config import get_agent_config
+from app.core.task_registry import generate_task_id
+from app.services.notion import AsyncNotionService, NotionWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class NotionWriteBuffer:
+    """
+    Notion 追加写入缓冲区
+
+    在短时间窗口内收集写往同一页面的块，窗口结束后合并为一次
+    append_blocks 调用（每批最多 100 块），按提交顺序写入。
+    submit() 立即返回写入 ID，可通过 get_status() 查询写入结果。
+    """
+
+    MAX_BLOCKS_PER_REQUEST = AsyncNotionService.MAX_BLOCKS_PER_REQUEST
+    MAX_TRACKED = 1000  # 最多保留的写入状态条数
+
+    def __init__(self, flush_interval: float = 2.0):
+        """
+        Args:
+            flush_interval: 合并窗口（秒），窗口内的写入合并为一批
+        """
+        self.flush_interval = flush_interval
+        # (token, page_id) -> [(write_id, block), ...]
+        self._pending: dict[tuple[str, str], list[tuple[str, dict]]] = {}
+        self._timers: dict[tuple[str, str], asyncio.Task] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self._flushing: set[asyncio.Task] = set()
+        self._status: OrderedDict[str, dict] = OrderedDict()
+
+    def submit(self, token: str, page_id: str, block: dict) -> str:
+        """
+        提交一个待追加的块
+
+        Args:
+            token: Notion Integration Token
+            page_id: 目标页面 ID
+            block: Notion 块（API 格式）
+
+        Returns:
+            写入 ID
+        """
+        write_id = generate_task_id("quicknote")
+        key = (token, page_id)
+        pending = self._pending.setdefault(key, [])
+        pending.append((write_id, block))
+        self._set_status(write_id, "pending")
+
+        if len(pending) >= self.MAX_BLOCKS_PER_REQUEST:
+            # 已攒满一批，不必等待窗口结束
+            timer = self._timers.pop(key, None)
+            if timer:
+                timer.cancel()
+            self._start_flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+        return write_id
+
+    def get_status(self, write_id: str) -> dict | None:
+        """查询写入状态 {"status": pending|written|failed, "error": str|None}"""
+        return self._status.get(write_id)
+
+    def _set_status(self, write_id: str, status: str, error: str | None = None) -> None:
+        """记录写入状态，超出上限时淘汰最早的记录"""
+        self._status[write_id] = {"status": status, "error": error}
+        self._status.move_to_end(write_id)
+        while len(self._status) > self.MAX_TRACKED:
+            self._status.popitem(last=False)
+
+    def _start_flush(self, key: tuple[str, str]) -> asyncio.Task:
+        """启动写入任务并记录在 _flushing 中，flush_all 会等待其完成"""
+        task = asyncio.create_task(self._flush(key))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+        return task
+
+    async def _flush_later(self, key: tuple[str, str]) -> None:
+        """等待合并窗口结束后写入"""
+        await asyncio.sleep(self.flush_interval)
+        # 离开 _timers 后写入仍可被 flush_all 等待
+        self._timers.pop(key, None)
+        await self._start_flush(key)
+
+    async def _flush(self, key: tuple[str, str]) -> None:
+        """将 key 下所有待写入的块分批追加到 Notion"""
+        pending = self._pending.pop(key, [])
+        if not pending:
+            return
+
+        token, page_id = key
+        # 同一页面的批次串行写入，保证笔记顺序
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            notion = AsyncNotionService(token)
+            for i in range(0, len(pending), self.MAX_BLOCKS_PER_REQUEST):
+                batch = pending[i:i + self.MAX_BLOCKS_PER_REQUEST]
+                try:
+                    await notion.append_blocks(page_id, [block for _, block in batch])
+                    status, error = "written", None
+                except NotionWriteError as e:
+                    logger.error(f"合并写入 {len(batch)} 个块到页面 {page_id} 失败: {e}")
+                    status, error = "failed", str(e)
+                for write_id, _ in batch:
+                    self._set_status(write_id, status, error)
+
+    async def flush_all(self) -> None:
+        """立即写入所有缓冲内容（应用关闭时调用）"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        await asyncio.gather(*self._flushing, *[self._flush(key) for key in list(self._pending)])
+
+
+_quicknote_config = get_agent_config("quicknote")
+
+# quicknote 全局写入缓冲
+quicknote_buffer = NotionWriteBuffer(
+    flush_interval=_quicknote_config.get("flush_interval", 2.0),
+)
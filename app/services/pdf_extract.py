@@ -0,0 +1,156 @@
+"""本地 PDF 下载与文本提取（流式下载，逐页提取）"""
+import asyncio
+import tempfile
+from dataclasses import dataclass
+from typing import IO
+
+import httpx
+
+from app.services.http_client import get_http_client
+from app.services.web_extract import ExtractionError, declared_length
+
+# 下载内容超过该大小时写入临时文件，不占用内存
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+@dataclass
+class ExtractedPdf:
+    """提取结果"""
+    url: str  # 跟随重定向后的最终 URL
+    title: str  # PDF 元数据中的标题，可能为空
+    text: str  # 按页拼接的正文
+    pages: int  # 总页数
+    extracted_pages: int  # 实际提取的页数
+    pdf_bytes: int
+
+    def to_prompt(self) -> str:
+        """生成写入 prompt 的文档内容"""
+        header = [f"URL: {self.url}"]
+        if self.title:
+            header.append(f"标题: {self.title}")
+        header.append(f"页数: {self.pages}")
+        text = self.text
+        if self.extracted_pages < self.pages:
+            text += f"\n…（只提取了前 {self.extracted_pages} 页）"
+        return "\n".join(header) + "\n\n" + text
+
+
+async def download_to_file(url: str, file: IO[bytes], timeout: float, max_bytes: int) -> str:
+    """
+    流式下载到文件对象（超过 max_bytes 时放弃）
+
+    Returns:
+        跟随重定向后的最终 URL
+
+    Raises:
+        ExtractionError: 请求失败、非 PDF 内容或文件过大
+    """
+    try:
+        async with get_http_client().stream(
+            "GET", url, timeout=timeout, headers={"Accept": "application/pdf"}
+        ) as response:
+            if response.status_code != 200:
+                raise ExtractionError(f"HTTP {response.status_code}")
+            content_type = response.headers.get("content-type", "")
+            if "pdf" not in content_type and "octet-stream" not in content_type:
+                raise ExtractionError(f"非 PDF 内容: {content_type or '未知类型'}")
+            declared = declared_length(response.headers)
+            if declared > max_bytes:
+                raise ExtractionError(f"PDF 过大: {declared} 字节")
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ExtractionError(f"PDF 超过 {max_bytes} 字节")
+                file.write(chunk)
+            return str(response.url)
+    except httpx.HTTPError as e:
+        raise ExtractionError(f"请求失败: {e}") from e
+
+
+def extract_pdf_text(file: IO[bytes], max_pages: int, max_chars: int) -> tuple[str, str, int, int]:
+    """
+    逐页提取 PDF 文本，达到页数或字符数上限时停止
+
+    Returns:
+        tuple: (title, text, 总页数, 提取的页数)
+
+    Raises:
+        ExtractionError: 未安装 pypdf、文件损坏或加密
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ExtractionError("未安装 pypdf，无法在本地提取 PDF") from e
+
+    try:
+        reader = PdfReader(file)
+        if reader.is_encrypted:
+            raise ExtractionError("PDF 已加密")
+        title = ((reader.metadata or {}).get("/Title") or "").strip()
+        total = len(reader.pages)
+        parts = []
+        size = 0
+        extracted = 0
+        for page in reader.pages[:max_pages]:
+            text = (page.extract_text() or "").strip()
+            extracted += 1
+            if text:
+                parts.append(text)
+                size += len(text)
+            if size >= max_chars:
+                break
+    except ExtractionError:
+        raise
+    except Exception as e:
+        # 损坏的 PDF 可能抛出各种异常（不只是 PyPdfError）
+        raise ExtractionError(f"PDF 解析失败: {e}") from e
+
+    text = "\n\n".join(parts)
+    if len(text) > max_chars:
+        text = text[:max_chars] + "\n…（正文过长，已截断）"
+    return str(title), text, total, extracted
+
+
+async def fetch_and_extract_pdf(
+    url: str,
+    timeout: float = 30,
+    max_bytes: int = 30 * 1024 * 1024,
+    max_pages: int = 50,
+    max_chars: int = 60000,
+    min_text_chars: int = 500,
+) -> ExtractedPdf:
+    """
+    下载 PDF 并在本地提取文本
+
+    Args:
+        url: PDF URL
+        timeout: 请求超时（秒）
+        max_bytes: 文件最大字节数
+        max_pages: 最多提取的页数
+        max_chars: 最多提取的字符数
+        min_text_chars: 正文最少字符数，更短时视为提取失败（多为扫描件）
+
+    Returns:
+        ExtractedPdf
+
+    Raises:
+        ExtractionError: 下载失败、文件过大、解析失败或没有可提取的文本
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as file:
+        final_url = await download_to_file(url, file, timeout, max_bytes)
+        pdf_bytes = file.tell()
+        file.seek(0)
+        title, text, pages, extracted = await asyncio.to_thread(
+            extract_pdf_text, file, max_pages, max_chars
+        )
+    if len(text) < min_text_chars:
+        raise ExtractionError(f"PDF 正文过短（{len(text)} 字符），可能是扫描件")
+    return ExtractedPdf(
+        url=final_url,
+        title=title,
+        text=text,
+        pages=pages,
+        extracted_pages=extracted,
+        pdf_bytes=pdf_bytes,
+    )
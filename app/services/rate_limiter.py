@@ -0,0 +1,92 @@
+"""进程内令牌桶限流器"""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+
+    以 rate 个/秒的速度补充令牌，最多积累 capacity 个。
+    采用预约机制：令牌不足时直接预支并返回需要等待的时间，
+    因此并发调用者按到达顺序排队，不会在令牌补充时一拥而上。
+
+    同时提供同步 acquire() 和异步 acquire_async()，
+    内部状态由线程锁保护，可在线程和协程间共享。
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError(f"rate 必须大于 0，收到: {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        # 令牌数计算到的时刻；暂停期间位于未来，之后的预约从暂停结束时刻依次排开
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated_at:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+    def _reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return self._updated_at - now + wait
+
+    def penalize(self, seconds: float) -> None:
+        """
+        暂停发放令牌（如收到 429 Retry-After 时）
+
+        对共享同一个桶的所有调用者生效；暂停期间不补充令牌，
+        排队的调用者从暂停结束时刻起按速率依次放行，不会同时醒来。
+
+        Args:
+            seconds: 暂停时长（秒）
+        """
+        with self._lock:
+            now = time.monotonic()
+            until = now + seconds
+            if until <= self._updated_at:
+                return
+            self._refill(now)
+            # 暂停结束时最多放行一个请求，其余按速率排开
+            self._tokens = min(self._tokens, 1.0)
+            self._updated_at = until
+
+    def acquire(self) -> None:
+        """同步获取一个令牌（阻塞当前线程）"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """异步获取一个令牌（不阻塞事件循环）"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class RateLimiterRegistry:
+    """按 key（如 API token）维护进程级共享的令牌桶"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        """获取 key 对应的令牌桶，不存在时创建"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.capacity)
+                self._buckets[key] = bucket
+            return bucket
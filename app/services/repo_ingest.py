@@ -0,0 +1,273 @@
+"""仓库获取：在独立进程中浅克隆、稀疏检出并运行 gitingest（限制并发、耗时和内存）"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.services.repo_mirror import MirrorStore, run_git
+
+logger = logging.getLogger(__name__)
+
+_SHA_PATTERN = re.compile(r"[0-9a-f]{40}")
+# spawn：不继承 API 进程的线程、事件循环和打开的连接
+_mp_context = multiprocessing.get_context("spawn")
+
+
+class IngestLimitError(Exception):
+    """获取任务超过耗时或内存限制，已被终止"""
+    pass
+
+
+class RepoTooLargeError(Exception):
+    """仓库超过大小上限（克隆前根据 GitHub 元数据判断）"""
+    pass
+
+
+def _process_tree_rss(pid: int) -> int:
+    """进程及其所有子进程（git 等）的常驻内存（字节），读取失败时返回 0（仅 Linux）"""
+    total = 0
+    pending = [pid]
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+def _run_job(conn, func: Callable, args: tuple) -> None:
+    """子进程入口：自成进程组（终止时连同 git 子进程一起结束），结果通过管道返回"""
+    os.setpgrp()
+    try:
+        conn.send(("ok", func(*args)))
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+class IngestPool:
+    """
+    有界进程池
+
+    每个任务在新的子进程中执行（spawn），最多 max_workers 个同时运行，其余排队；
+    超过 timeout 或进程树常驻内存超过 max_rss_mb 时终止整个进程组。
+    不复用进程（ProcessPoolExecutor 无法单独终止某个任务，且终止后整个池不可用），
+    文件遍历、模式匹配和内容拼接的 CPU 和内存开销都不进入 API 进程。
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 300, max_rss_mb: int = 1024):
+        """
+        Args:
+            max_workers: 最大并发进程数
+            timeout: 单个任务的最长耗时（秒，含排队后的执行时间，不含排队时间）
+            max_rss_mb: 单个任务进程树的常驻内存上限（MB），0 表示不限制
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self.completed = 0
+        self.failed = 0
+        self.killed = 0
+        self.peak_rss = 0
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        在子进程中执行 func(*args)（func 和参数需可 pickle）
+
+        Raises:
+            IngestLimitError: 超时或超过内存限制
+            RuntimeError: 子进程中的异常或子进程异常退出
+        """
+        async with self._semaphore:
+            return await self._run(func, args)
+
+    async def _run(self, func: Callable, args: tuple) -> Any:
+        recv_conn, send_conn = _mp_context.Pipe(duplex=False)
+        process = _mp_context.Process(target=_run_job, args=(send_conn, func, args), daemon=True)
+        process.start()
+        send_conn.close()
+        # 结果可能很大：在线程中接收，避免子进程写满管道后阻塞
+        receive = asyncio.create_task(asyncio.to_thread(self._receive, recv_conn))
+        deadline = time.monotonic() + self.timeout
+        try:
+            while not receive.done():
+                if time.monotonic() > deadline:
+                    raise IngestLimitError(f"仓库获取超过 {self.timeout:.0f} 秒")
+                rss = _process_tree_rss(process.pid)
+                self.peak_rss = max(self.peak_rss, rss)
+                if self.max_rss and rss > self.max_rss:
+                    raise IngestLimitError(
+                        f"仓库获取内存 {rss // 1024 // 1024} MB 超过上限 {self.max_rss // 1024 // 1024} MB"
+                    )
+                await asyncio.wait({receive}, timeout=0.5)
+        except BaseException as e:
+            self._kill(process)
+            if isinstance(e, IngestLimitError):
+                self.killed += 1
+            raise
+        finally:
+            await asyncio.to_thread(process.join, 5)
+            # 子进程已结束或被终止后，管道关闭使接收线程退出
+            recv_conn.close()
+
+        status, payload = receive.result()
+        if status != "ok":
+            self.failed += 1
+            raise RuntimeError(payload)
+        self.completed += 1
+        return payload
+
+    @staticmethod
+    def _receive(conn) -> tuple[str, Any]:
+        try:
+            return conn.recv()
+        except (EOFError, OSError):
+            return ("error", "仓库获取进程异常退出")
+
+    @staticmethod
+    def _kill(process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "killed": self.killed,
+            "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1),
+        }
+
+
+def sparse_patterns(subpath: str, include: list[str], exclude: list[str]) -> list[str]:
+    """
+    稀疏检出规则（gitignore 语法，non-cone 模式）
+
+    指定子目录时只检出该目录；否则只检出 include 匹配的文件并排除 exclude。
+    gitingest 之后仍按 include/exclude 精确过滤，这里只需是其超集。
+    include 为空时返回空列表（完整检出）。
+    """
+    if subpath:
+        return [f"/{subpath.strip('/')}/"]
+    if not include:
+        return []
+    return list(include) + [f"!{pattern}" for pattern in exclude]
+
+
+def shallow_sparse_clone(
+    clone_url: str, dest: Path, ref: Optional[str], patterns: list[str]
+) -> None:
+    """
+    浅克隆并稀疏检出
+
+    --depth=1 只取一个提交；--filter=blob:none 克隆时不下载文件内容，
+    检出时只按稀疏规则批量获取需要的文件。
+    """
+    is_sha = bool(ref and _SHA_PATTERN.fullmatch(ref))
+    clone_args = ["clone", "--depth=1", "--single-branch", "--no-checkout", "--filter=blob:none"]
+    if ref and not is_sha:
+        clone_args += ["--branch", ref]
+    run_git(*clone_args, clone_url, str(dest))
+    target = "HEAD"
+    if is_sha:
+        run_git("fetch", "--depth=1", "--filter=blob:none", "origin", ref, cwd=dest)
+        target = ref
+    if patterns:
+        run_git("sparse-checkout", "set", "--no-cone", *patterns, cwd=dest)
+    run_git("checkout", target, cwd=dest)
+
+
+def ingest_repo(
+    clone_url: str,
+    name: str,
+    ref: Optional[str],
+    subpath: str,
+    include: list[str],
+    exclude: list[str],
+    max_file_size: int,
+    mirror_root: Optional[str] = None,
+    mirror_max_bytes: int = 0,
+    mirror_watch: tuple[str, ...] = (),
+    mirror_repeat_window: float = 30 * 86400,
+) -> tuple[str, str, str]:
+    """
+    克隆仓库并用 gitingest 生成内容（在 IngestPool 的子进程中执行）
+
+    指定 mirror_root 时，重复获取的仓库从本地 bare 镜像增量更新并检出工作树（见 MirrorStore），
+    首次获取或镜像不可用时浅克隆。
+
+    Args:
+        clone_url: 仓库克隆地址
+        name: 仓库名称（owner/repo，写入概要）
+        ref: 分支、标签或提交 SHA，None 表示默认分支
+        subpath: 只获取的子目录，为空表示整个仓库
+        include: gitingest include 规则
+        exclude: gitingest exclude 规则
+        max_file_size: 单个文件最大字节数，更大的文件跳过
+        mirror_root: 镜像存储目录，None 表示每次浅克隆
+        mirror_max_bytes: 镜像总大小上限（字节）
+        mirror_watch: 首次获取就建立镜像的仓库（owner/repo）
+        mirror_repeat_window: 两次获取间隔不超过该时长（秒）时建立镜像
+
+    Returns:
+        tuple: (summary, tree, content)
+    """
+    from gitingest import ingest_async
+
+    workdir = Path(tempfile.mkdtemp(prefix="ingest-"))
+    dest = workdir / name.replace("/", "-")
+    patterns = sparse_patterns(subpath, include, exclude)
+    store = None
+    if mirror_root:
+        store = MirrorStore(Path(mirror_root), mirror_max_bytes, mirror_watch, mirror_repeat_window)
+        if not store.should_mirror(name):
+            store = None
+    try:
+        if store is not None:
+            try:
+                store.checkout(clone_url, name, dest, ref, patterns)
+            except Exception as e:
+                logger.warning(f"仓库镜像不可用，改为浅克隆 {name}: {e}")
+                store.release(name, dest)
+                store = None
+        if store is None:
+            shallow_sparse_clone(clone_url, dest, ref, patterns)
+        root = dest / subpath if subpath else dest
+        if not root.is_dir():
+            raise FileNotFoundError(f"子目录不存在: {subpath}")
+        summary, tree, content = asyncio.run(ingest_async(
+            str(root),
+            include_patterns=set(include) or None,
+            exclude_patterns=set(exclude) or None,
+            max_file_size=max_file_size,
+        ))
+    finally:
+        if store is not None:
+            store.release(name, dest)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # 本地目录的概要以临时路径开头，替换为仓库信息
+    header = [f"Repository: {name}"]
+    if ref:
+        header.append(f"Ref: {ref}")
+    if subpath:
+        header.append(f"Subpath: {subpath}")
+    summary_lines = [line for line in summary.splitlines() if not line.startswith("Directory: ")]
+    return "\n".join(header + summary_lines) + "\n", tree, content
@@ -0,0 +1,236 @@
+"""本地仓库镜像：按 owner/repo 保存 bare 克隆，重复获取时增量 fetch 并检出到临时工作树"""
+import fcntl
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+GIT_TIMEOUT = 600  # 单个 git 命令的超时（秒），整体耗时由 IngestPool 控制
+_SHA_PATTERN = re.compile(r"[0-9a-f]{40}")
+# bare 克隆默认不配置 fetch refspec；只同步分支和标签（不含 refs/pull/* 等）
+_FETCH_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+
+
+def run_git(*args: str, cwd: Optional[Path] = None) -> str:
+    """执行 git 命令（不交互），返回标准输出"""
+    result = subprocess.run(
+        ["git", "-c", "advice.detachedHead=false", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=GIT_TIMEOUT,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+    return result.stdout
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class MirrorStore:
+    """
+    bare 镜像存储（多进程共享）
+
+    - 首次出现的仓库只记录一次获取（调用方浅克隆）；repeat_window 内再次获取或在 watch 列表中时才建立镜像
+    - 建立镜像：git clone --bare --filter=blob:none，文件内容在检出时按需下载并留在镜像中
+    - 再次获取：git fetch 增量同步分支和标签，git worktree add 检出到临时目录，不再完整克隆
+    - 每个镜像一个锁文件（flock），同一仓库的 fetch、检出和淘汰互斥；进程被终止时锁自动释放
+    - 总大小超过 max_bytes 时按最近使用时间淘汰其他镜像（正在使用的镜像跳过）
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        watch: Iterable[str] = (),
+        repeat_window: float = 30 * 86400,
+    ):
+        """
+        Args:
+            root: 存储目录
+            max_bytes: 镜像总大小上限（字节）
+            watch: 首次获取就建立镜像的仓库（owner/repo）
+            repeat_window: 两次获取间隔不超过该时长（秒）时建立镜像
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.watch = {name.lower() for name in watch}
+        self.repeat_window = repeat_window
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def mirror_path(self, name: str) -> Path:
+        """owner/repo 对应的镜像目录（大小写不敏感）"""
+        owner, repo = name.lower().split("/", 1)
+        return self.root / owner / f"{repo}.git"
+
+    def should_mirror(self, name: str) -> bool:
+        """
+        是否通过镜像获取（已有镜像、在 watch 列表中，或 repeat_window 内获取过）
+
+        首次获取时记录获取时间并返回 False，由调用方浅克隆，只获取一次的仓库不下载完整历史。
+        """
+        if name.lower() in self.watch or self.mirror_path(name).is_dir():
+            return True
+        seen = self.mirror_path(name).with_suffix(".seen")
+        try:
+            if time.time() - seen.stat().st_mtime <= self.repeat_window:
+                return True
+        except OSError:
+            pass
+        seen.parent.mkdir(parents=True, exist_ok=True)
+        seen.touch()
+        return False
+
+    @staticmethod
+    @contextmanager
+    def _flock(lock_path: Path, blocking: bool = True) -> Iterator[bool]:
+        """
+        文件锁（锁文件不删除，避免删除后不同进程锁住不同文件）
+
+        Yields:
+            是否获得锁（blocking=False 时可能为 False）
+        """
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a") as f:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(f, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def lock(self, name: str, blocking: bool = True) -> Iterator[bool]:
+        """锁定 owner/repo 的镜像"""
+        with self._flock(self.mirror_path(name).with_suffix(".lock"), blocking) as locked:
+            yield locked
+
+    def _update(self, clone_url: str, mirror: Path, ref: Optional[str]) -> None:
+        """创建或增量更新镜像（调用方持有锁）"""
+        if not mirror.is_dir():
+            # 先克隆到临时目录再改名，克隆中途被终止不会留下不完整的镜像
+            for stale in mirror.parent.glob(f"{mirror.name}.tmp-*"):
+                shutil.rmtree(stale, ignore_errors=True)
+            tmp = mirror.with_name(f"{mirror.name}.tmp-{os.getpid()}")
+            try:
+                run_git("clone", "--bare", "--filter=blob:none", clone_url, str(tmp))
+                tmp.rename(mirror)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            run_git("fetch", "--prune", "--no-tags", "origin", *_FETCH_REFSPECS, cwd=mirror)
+        # 指定的提交可能不在任何分支上（如已删除的分支），单独获取
+        if ref and _SHA_PATTERN.fullmatch(ref):
+            try:
+                run_git("cat-file", "-e", f"{ref}^{{commit}}", cwd=mirror)
+            except subprocess.CalledProcessError:
+                run_git("fetch", "origin", ref, cwd=mirror)
+
+    def checkout(
+        self, clone_url: str, name: str, dest: Path, ref: Optional[str], patterns: list[str]
+    ) -> None:
+        """
+        更新镜像并检出到 dest（工作树与镜像共享对象，检出后不再依赖锁）
+
+        Args:
+            clone_url: 仓库克隆地址
+            name: owner/repo
+            dest: 工作树目录（不存在）
+            ref: 分支、标签或提交 SHA，None 表示默认分支（HEAD）
+            patterns: 稀疏检出规则，为空表示完整检出
+        """
+        mirror = self.mirror_path(name)
+        with self.lock(name):
+            self._update(clone_url, mirror, ref)
+            # 清理被终止的任务留下的工作树记录
+            run_git("worktree", "prune", cwd=mirror)
+            run_git("worktree", "add", "--detach", "--no-checkout", str(dest), ref or "HEAD", cwd=mirror)
+            if patterns:
+                run_git("sparse-checkout", "set", "--no-cone", *patterns, cwd=dest)
+            # 缺失的文件内容在检出时从远端按需下载，写入镜像的对象库
+            run_git("checkout", "HEAD", cwd=dest)
+            os.utime(mirror)
+        self.evict(keep=mirror)
+
+    def release(self, name: str, dest: Path) -> None:
+        """删除工作树并移除镜像中的工作树记录"""
+        shutil.rmtree(dest, ignore_errors=True)
+        mirror = self.mirror_path(name)
+        with self.lock(name):
+            if mirror.is_dir():
+                try:
+                    run_git("worktree", "prune", cwd=mirror)
+                except (subprocess.SubprocessError, OSError):
+                    pass
+
+    def evict(self, keep: Optional[Path] = None) -> list[str]:
+        """
+        总大小超过上限时按最近使用时间（镜像目录 mtime）删除最旧的镜像
+
+        被其他任务锁定的镜像和 keep 跳过。
+
+        Returns:
+            被删除的镜像（owner/repo）
+        """
+        evicted = []
+        with self._flock(self.root / ".evict.lock", blocking=False) as locked:
+            # 其他进程正在淘汰
+            if not locked:
+                return evicted
+            # 过期的获取记录不再触发建立镜像
+            for seen in self.root.glob("*/*.seen"):
+                try:
+                    if time.time() - seen.stat().st_mtime > self.repeat_window:
+                        seen.unlink()
+                except OSError:
+                    continue
+            mirrors = []
+            for path in self.root.glob("*/*.git"):
+                try:
+                    mirrors.append((path.stat().st_mtime, path, _dir_size(path)))
+                except OSError:
+                    continue
+            total = sum(size for _, _, size in mirrors)
+            for _, path, size in sorted(mirrors, key=lambda m: m[0]):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                name = f"{path.parent.name}/{path.name[:-len('.git')]}"
+                with self.lock(name, blocking=False) as locked:
+                    if not locked:
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                evicted.append(name)
+        if evicted:
+            logger.info(f"淘汰仓库镜像: {evicted}")
+        return evicted
+
+    def stats(self) -> dict:
+        mirrors = list(self.root.glob("*/*.git"))
+        return {
+            "mirrors": len(mirrors),
+            "size_mb": round(sum(_dir_size(m) for m in mirrors) / 1024 / 1024, 1),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 1),
+        }
@@ -0,0 +1,318 @@
+"""仓库文件存储（内存映射 + 文件索引）"""
+import fnmatch
+import json
+import mmap
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+# gitingest 输出中每个文件的头部：
+# ================================================
+# FILE: path/to/file
+# ================================================
+_FILE_HEADER_PATTERN = re.compile(
+    r"^={48}\n(?:FILE|SYMLINK): (.+?)(?: -> .*)?\n={48}\n",
+    re.MULTILINE,
+)
+
+
+_QUANTIFIER_PATTERN = re.compile(r"[*+?]|\{(\d*)(,?)(\d*)\}")
+
+
+class UnsafePatternError(ValueError):
+    """正则表达式可能发生灾难性回溯（嵌套量词或量词作用于分支）"""
+    pass
+
+
+def _quantifier_at(pattern: str, pos: int) -> tuple[int, bool]:
+    """
+    pos 处的量词
+
+    Returns:
+        (量词长度，不是量词时为 0；是否可重复多次，? 和 {0,1} 不算)
+    """
+    match = _QUANTIFIER_PATTERN.match(pattern, pos)
+    if match is None:
+        return 0, False
+    if match.group(0) in ("*", "+"):
+        repeats = True
+    elif match.group(0) == "?":
+        repeats = False
+    else:
+        low, comma, high = match.groups()
+        if not low and not comma:
+            # "{}" 不是量词
+            return 0, False
+        repeats = int(high or low or 0) > 1 if (high or not comma) else True
+    length = match.end() - pos
+    # 非贪婪 / 占有量词的后缀
+    if pattern[pos + length:pos + length + 1] in ("?", "+"):
+        length += 1
+    return length, repeats
+
+
+def _check_backtracking(pattern: str) -> None:
+    """
+    按字符扫描正则表达式，拒绝量词作用于含量词或分支的分组（如 (a+)+、(a|aa)*）
+
+    只做保守的语法检查，不依赖 re 的内部模块；括号不配对等错误交给 re.compile 报告。
+    """
+    # 每层分组: [是否含可重复量词, 是否含分支]
+    stack = [[False, False]]
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "(":
+            stack.append([False, False])
+            i += 1
+            continue
+        if char == "|":
+            stack[-1][1] = True
+            i += 1
+            continue
+        if char == ")" and len(stack) > 1:
+            has_repeat, has_branch = stack.pop()
+            length, repeats = _quantifier_at(pattern, i + 1)
+            if repeats and has_repeat:
+                raise UnsafePatternError("不支持嵌套量词（如 (a+)+），请简化正则表达式")
+            if repeats and has_branch:
+                raise UnsafePatternError("不支持对分支使用量词（如 (a|b)+），请简化正则表达式")
+            stack[-1][0] = stack[-1][0] or has_repeat or repeats
+            stack[-1][1] = stack[-1][1] or has_branch
+            i += 1 + length
+            continue
+        if char == "\\":
+            i += 2
+        elif char == "[":
+            # 字符类：跳到配对的 ]（开头的 ^ 和 ] 属于字符类本身）
+            i += 1
+            if pattern[i:i + 1] == "^":
+                i += 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        else:
+            i += 1
+        length, repeats = _quantifier_at(pattern, i)
+        stack[-1][0] = stack[-1][0] or repeats
+        i += length
+
+
+def compile_safe_pattern(pattern: str, flags: int = 0) -> re.Pattern:
+    """
+    编译正则表达式（bytes），拒绝可能发生灾难性回溯的写法
+
+    Raises:
+        re.error: 正则表达式无效
+        UnsafePatternError: 包含嵌套量词或量词作用于分支
+    """
+    _check_backtracking(pattern)
+    return re.compile(pattern.encode("utf-8"), flags)
+
+
+def split_gitingest_content(content: str) -> list[tuple[str, str]]:
+    """
+    将 gitingest 的文件内容拆分为 (路径, 内容) 列表
+
+    Args:
+        content: gitingest 返回的 content 字符串
+
+    Returns:
+        按原顺序排列的 (path, text) 列表
+    """
+    headers = list(_FILE_HEADER_PATTERN.finditer(content))
+    files = []
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+        # 去掉 gitingest 在每个文件末尾追加的空行
+        text = content[match.end():end]
+        if text.endswith("\n\n"):
+            text = text[:-2]
+        files.append((match.group(1), text))
+    return files
+
+
+class RepoStore:
+    """
+    仓库文件存储
+
+    - 所有文件内容顺序写入同一个数据文件，另存 {路径: (偏移, 长度)} 索引
+    - 读取时通过 mmap 映射数据文件，按需读取文件或字节区间，不把整个仓库载入内存
+    - grep 直接在映射区域上匹配，再按偏移定位所属文件和行号
+
+    用法：RepoStore.build(目录, [(路径, 内容)]) 构建，close() 释放映射，remove() 删除目录。
+    """
+
+    DATA_FILE = "content.bin"
+    INDEX_FILE = "index.json"
+
+    def __init__(self, store_dir: Path):
+        """
+        打开已构建的存储
+
+        Args:
+            store_dir: 存储目录（包含数据文件和索引）
+        """
+        self.store_dir = store_dir
+        with open(store_dir / self.INDEX_FILE, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        # [(path, offset, length)]，按偏移升序
+        self._entries: list[tuple[str, int, int]] = [tuple(e) for e in entries]
+        self._index = {path: (offset, length) for path, offset, length in self._entries}
+
+        self._file = open(store_dir / self.DATA_FILE, "rb")
+        size = store_dir.joinpath(self.DATA_FILE).stat().st_size
+        # 空文件无法 mmap
+        self._mm: Optional[mmap.mmap] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+
+    @classmethod
+    def build(cls, store_dir: Path, files: list[tuple[str, str]]) -> "RepoStore":
+        """
+        构建存储
+
+        Args:
+            store_dir: 存储目录（已存在时覆盖）
+            files: [(path, text)]，如 split_gitingest_content() 的结果
+
+        Returns:
+            已打开的 RepoStore
+        """
+        store_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        offset = 0
+        with open(store_dir / cls.DATA_FILE, "wb") as f:
+            for path, text in files:
+                data = text.encode("utf-8")
+                f.write(data)
+                entries.append((path, offset, len(data)))
+                offset += len(data)
+        with open(store_dir / cls.INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        return cls(store_dir)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._mm.size() if self._mm else 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def list_files(self, pattern: Optional[str] = None) -> list[tuple[str, int]]:
+        """
+        列出文件
+
+        Args:
+            pattern: glob 模式（如 "src/*.py"），为空时列出全部
+
+        Returns:
+            [(path, 字节数)]
+        """
+        return [
+            (path, length)
+            for path, _offset, length in self._entries
+            if not pattern or fnmatch.fnmatch(path, pattern)
+        ]
+
+    def read(self, path: str, offset: int = 0, length: Optional[int] = None) -> Optional[bytes]:
+        """
+        读取文件的字节区间
+
+        Args:
+            path: 文件路径
+            offset: 文件内起始偏移
+            length: 读取字节数，为空时读到文件末尾
+
+        Returns:
+            字节内容，文件不存在时返回 None
+        """
+        entry = self._index.get(path)
+        if entry is None:
+            return None
+        file_offset, file_length = entry
+        offset = max(0, min(offset, file_length))
+        end = file_length if length is None else min(file_length, offset + max(0, length))
+        if self._mm is None or end <= offset:
+            return b""
+        return self._mm[file_offset + offset:file_offset + end]
+
+    def file_size(self, path: str) -> Optional[int]:
+        """文件字节数，文件不存在时返回 None"""
+        entry = self._index.get(path)
+        return entry[1] if entry else None
+
+    def grep(
+        self,
+        pattern: str,
+        path_pattern: Optional[str] = None,
+        max_matches: int = 100,
+        ignore_case: bool = False,
+        regex: bool = False,
+        timeout: Optional[float] = None,
+    ) -> tuple[list[tuple[str, int, str]], bool]:
+        """
+        搜索文件内容（逐个文件搜索，超过 timeout 时在文件之间停止）
+
+        Args:
+            pattern: 搜索内容，regex 为 False 时按字面匹配
+            path_pattern: 限定文件的 glob 模式
+            max_matches: 最多返回的匹配行数
+            ignore_case: 是否忽略大小写
+            regex: 是否按正则表达式搜索
+            timeout: 搜索时间上限（秒），为空时不限制
+
+        Returns:
+            ([(path, 行号, 行内容)], 是否因超时提前停止)
+
+        Raises:
+            re.error: 正则表达式无效
+            UnsafePatternError: 正则表达式可能发生灾难性回溯
+        """
+        if self._mm is None:
+            return [], False
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        compiled = compile_safe_pattern(pattern if regex else re.escape(pattern), flags)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        results: list[tuple[str, int, str]] = []
+        for path, file_offset, file_length in self._entries:
+            if path_pattern and not fnmatch.fnmatch(path, path_pattern):
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                return results, True
+            file_end = file_offset + file_length
+            last_line_no = 0
+            for match in compiled.finditer(self._mm, file_offset, file_end):
+                pos = match.start()
+                line_start = max(self._mm.rfind(b"\n", file_offset, pos) + 1, file_offset)
+                line_end = self._mm.find(b"\n", pos, file_end)
+                if line_end == -1:
+                    line_end = file_end
+                line_no = self._mm[file_offset:line_start].count(b"\n") + 1
+                # 同一行多处匹配只返回一次
+                if line_no == last_line_no:
+                    continue
+                last_line_no = line_no
+
+                line = self._mm[line_start:line_end].decode("utf-8", errors="replace")
+                results.append((path, line_no, line))
+                if len(results) >= max_matches:
+                    return results, False
+        return results, False
+
+    def close(self) -> None:
+        """释放内存映射和文件句柄"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def remove(self) -> None:
+        """关闭并删除存储目录"""
+        self.close()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
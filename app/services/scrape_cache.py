@@ -0,0 +1,154 @@
+"""网页抓取结果缓存（条件请求验证）"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.core.canonical import canonical_url
+from app.services.disk_cache import DiskLRUCache
+from app.services.http_client import get_http_client
+from app.services.mcp_pool import ToolResultCache
+from app.services.web_extract import declared_length
+
+logger = logging.getLogger(__name__)
+
+
+def scrape_cache_key(args: Dict[str, Any]) -> str:
+    """缓存 key：规范化 URL + 其余抓取参数（formats、onlyMainContent 等）"""
+    params = {k: v for k, v in args.items() if k != "url"}
+    return json.dumps(
+        {"url": canonical_url(args.get("url", "")), "params": params},
+        sort_keys=True, ensure_ascii=False,
+    )
+
+
+class ScrapeResultCache(ToolResultCache):
+    """
+    抓取工具（如 firecrawl_scrape）的结果缓存
+
+    - 缓存抓取结果，同时记录源站的 ETag / Last-Modified 和页面内容哈希
+    - 再次抓取同一 URL 时，先向源站发送条件 GET（If-None-Match / If-Modified-Since）：
+      304 或内容哈希不变则直接返回缓存结果，否则重新抓取
+    - fresh_seconds 内验证过的条目不再重复验证；超过 max_age 的条目无论是否变化都重新抓取
+    - 验证请求失败时按未命中处理（宁可重新抓取也不返回可能过期的内容）；
+      源站无法直接访问（无法获取验证信息）或超过 max_bytes 的页面不缓存
+    """
+
+    def __init__(
+        self,
+        cache: DiskLRUCache,
+        max_age: float,
+        fresh_seconds: float = 600,
+        timeout: float = 10,
+        max_bytes: int = 3 * 1024 * 1024,
+        key_fn: Callable[[Dict[str, Any]], str] = scrape_cache_key,
+    ):
+        """
+        Args:
+            cache: 磁盘缓存
+            max_age: 条目最长保留时间（秒）
+            fresh_seconds: 验证结果的有效时间（秒）
+            timeout: 验证请求超时（秒）
+            max_bytes: 验证时读取的页面最大字节数，超过时放弃验证
+            key_fn: 由工具参数生成缓存 key
+        """
+        super().__init__(cache, ttl=max_age, key_fn=key_fn)
+        self.fresh_seconds = fresh_seconds
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.revalidated = 0  # 源站确认未变化的次数
+        self.changed = 0  # 源站内容已变化的次数
+
+    async def _request_validators(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> tuple[int, Optional[Dict[str, Optional[str]]]]:
+        """
+        GET 页面并流式计算内容哈希
+
+        Returns:
+            (状态码, 验证信息)；非 200 或页面超过 max_bytes 时验证信息为 None
+
+        Raises:
+            httpx.HTTPError: 请求失败
+        """
+        async with get_http_client().stream("GET", url, headers=headers, timeout=self.timeout) as response:
+            if response.status_code != 200 or declared_length(response.headers) > self.max_bytes:
+                return response.status_code, None
+            digest = hashlib.sha256()
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > self.max_bytes:
+                    return response.status_code, None
+                digest.update(chunk)
+            return response.status_code, {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "content_hash": digest.hexdigest(),
+            }
+
+    async def _probe(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        """获取页面当前的验证信息，失败时返回 None"""
+        try:
+            _, validators = await self._request_validators(url)
+        except httpx.HTTPError as e:
+            logger.debug(f"获取验证信息失败 {url}: {e}")
+            return None
+        return validators
+
+    async def _is_unchanged(self, url: str, entry: dict) -> bool:
+        """向源站发送条件 GET，判断页面是否未变化"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            status, validators = await self._request_validators(url, headers)
+        except httpx.HTTPError as e:
+            logger.debug(f"验证缓存失败 {url}: {e}")
+            return False
+        if status == 304:
+            return True
+        return validators is not None and validators["content_hash"] == entry.get("content_hash")
+
+    async def _lookup(self, key: str, args: Dict[str, Any]) -> Optional[dict]:
+        entry = await asyncio.to_thread(self.cache.get, key)
+        # 验证通过会重写条目，最长保留时间按首次抓取时间计算
+        if entry is None or time.time() - entry.get("scraped_at", 0) > self.ttl:
+            return None
+        if time.time() - entry.get("validated_at", 0) <= self.fresh_seconds:
+            return entry["result"]
+
+        if not await self._is_unchanged(args.get("url", ""), entry):
+            self.changed += 1
+            return None
+        self.revalidated += 1
+        entry["validated_at"] = time.time()
+        await asyncio.to_thread(self.cache.set, key, entry)
+        return entry["result"]
+
+    async def _fetch_and_store(
+        self, key: str, args: Dict[str, Any], fetch: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        # 验证信息与抓取同时获取（不晚于抓取结果）：抓取期间页面变化时，下次验证会判定为已变化
+        probe = asyncio.create_task(self._probe(args.get("url", "")))
+        try:
+            result = await fetch()
+        except BaseException:
+            probe.cancel()
+            raise
+        validators = await probe
+        if result.get("is_error") or validators is None:
+            return result
+        now = time.time()
+        entry = {"result": result, "scraped_at": now, "validated_at": now, **validators}
+        await asyncio.to_thread(self.cache.set, key, entry)
+        return result
+
+    def stats(self) -> dict:
+        return {**super().stats(), "revalidated": self.revalidated, "changed": self.changed}
@@ -0,0 +1,283 @@
+"""Claude Code 会话池"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from claude_agent_sdk import (
+    ClaudeAgentOptions,
+    ClaudeSDKClient,
+    ConversationResetMessage,
+    ResultMessage,
+)
+from claude_agent_sdk import query as sdk_query
+
+from app.config import SESSION_POOL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RESET_COMMAND = "/clear"
+
+
+@dataclass
+class PooledSession:
+    """池中的一个 Claude Code CLI 进程（持久连接的 ClaudeSDKClient）"""
+    client: ClaudeSDKClient
+    profile: str
+    uses: int = 0
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class ProfileStats:
+    """单个配置的统计"""
+    created: int = 0
+    leased: int = 0
+    reused: int = 0
+    recycled: int = 0
+    discarded: int = 0
+    total_connect_ms: float = 0.0
+
+
+def profile_key(options: ClaudeAgentOptions) -> str:
+    """
+    计算会话配置 key
+
+    模型、工具、subagent、输出格式和 MCP 服务器集合完全相同的任务才能共用会话；
+    进程内 MCP 服务器（sdk 类型）按名称区分。
+    """
+    mcp_servers = {}
+    for name, config in (options.mcp_servers or {}).items():
+        if isinstance(config, dict) and config.get("type") == "sdk":
+            mcp_servers[name] = "sdk"
+        else:
+            mcp_servers[name] = config
+    agents = {
+        name: {"description": a.description, "prompt": a.prompt, "tools": a.tools, "model": a.model}
+        for name, a in (options.agents or {}).items()
+    }
+    data = {
+        "model": options.model,
+        "max_turns": options.max_turns,
+        "permission_mode": options.permission_mode,
+        "system_prompt": options.system_prompt,
+        "tools": options.tools,
+        "allowed_tools": options.allowed_tools,
+        "disallowed_tools": options.disallowed_tools,
+        "output_format": options.output_format,
+        "agents": agents,
+        "mcp_servers": mcp_servers,
+        "cwd": str(options.cwd) if options.cwd else None,
+    }
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class SessionPool:
+    """
+    Claude Code 会话池
+
+    - 按配置（profile_key）分组，每组保持 size 个预先启动的 CLI 进程（空闲 + 租用中）
+    - 任务租用一个会话执行，结束后发送 /clear 重置对话再放回池中；
+      并发超过 size 时临时启动的会话用完即关闭
+    - 会话使用 max_uses 次后回收（断开并由后台补充新进程）；
+      执行出错或重置失败的会话直接丢弃，不再复用
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        size: int = 1,
+        max_uses: int = 20,
+        reset_timeout: float = 30,
+    ):
+        """
+        Args:
+            enabled: 是否启用（关闭时每个任务使用一次性的 query()）
+            size: 每个配置保持的空闲会话数
+            max_uses: 单个会话最多执行的任务数
+            reset_timeout: 重置会话的超时（秒）
+        """
+        self.enabled = enabled
+        self.size = max(0, size)
+        self.max_uses = max(1, max_uses)
+        self.reset_timeout = reset_timeout
+        self._idle: Dict[str, Deque[PooledSession]] = {}
+        self._options: Dict[str, ClaudeAgentOptions] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+        self._leased: Dict[str, int] = {}
+        self._stats: Dict[str, ProfileStats] = {}
+
+    async def _create(self, profile: str) -> PooledSession:
+        """启动一个新会话"""
+        start = time.perf_counter()
+        client = ClaudeSDKClient(options=self._options[profile])
+        await client.connect()
+        stats = self._stats[profile]
+        stats.created += 1
+        stats.total_connect_ms += (time.perf_counter() - start) * 1000
+        return PooledSession(client=client, profile=profile)
+
+    @staticmethod
+    async def _close(session: PooledSession) -> None:
+        try:
+            await session.client.disconnect()
+        except Exception as e:
+            logger.warning(f"关闭会话失败: {e}")
+
+    def _register(self, options: ClaudeAgentOptions) -> str:
+        profile = profile_key(options)
+        self._options[profile] = options
+        self._idle.setdefault(profile, deque())
+        self._stats.setdefault(profile, ProfileStats())
+        self._leased.setdefault(profile, 0)
+        return profile
+
+    def _has_room(self, profile: str) -> bool:
+        """空闲 + 租用中的会话数是否低于 size"""
+        return len(self._idle[profile]) + self._leased[profile] < self.size
+
+    def _schedule_refill(self, profile: str) -> None:
+        """后台补充空闲会话到 size 个"""
+        task = self._refills.get(profile)
+        if task is None or task.done():
+            self._refills[profile] = asyncio.create_task(self._refill(profile))
+
+    async def _refill(self, profile: str) -> None:
+        while self._has_room(profile):
+            try:
+                self._idle[profile].append(await self._create(profile))
+            except Exception as e:
+                logger.warning(f"预启动会话失败: {e}")
+                return
+
+    def warm(self, options: ClaudeAgentOptions) -> None:
+        """为指定配置在后台预启动会话"""
+        if self.enabled and self.size:
+            self._schedule_refill(self._register(options))
+
+    async def acquire(self, options: ClaudeAgentOptions) -> PooledSession:
+        """租用一个会话（没有空闲会话时立即启动新会话）"""
+        profile = self._register(options)
+        stats = self._stats[profile]
+        stats.leased += 1
+        idle = self._idle[profile]
+        self._leased[profile] += 1
+        if idle:
+            stats.reused += 1
+            return idle.popleft()
+        try:
+            return await self._create(profile)
+        except Exception:
+            self._leased[profile] -= 1
+            raise
+
+    async def _reset(self, session: PooledSession) -> bool:
+        """清空会话的对话历史"""
+
+        async def clear() -> bool:
+            await session.client.query(RESET_COMMAND)
+            async for message in session.client.receive_messages():
+                if isinstance(message, (ConversationResetMessage, ResultMessage)):
+                    return True
+            return False
+
+        try:
+            return await asyncio.wait_for(clear(), timeout=self.reset_timeout)
+        except Exception as e:
+            logger.warning(f"重置会话失败: {e}")
+            return False
+
+    async def release(self, session: PooledSession, reusable: bool) -> None:
+        """
+        归还会话
+
+        Args:
+            session: 租用的会话
+            reusable: 任务是否正常结束（异常结束的会话状态不确定，直接丢弃）
+        """
+        session.uses += 1
+        profile = session.profile
+        stats = self._stats[profile]
+        # 判断和重置期间仍计入租用数，避免后台补充同时启动多余的会话
+        room = len(self._idle[profile]) + self._leased[profile] - 1 < self.size
+        reuse = reusable and session.uses < self.max_uses and room and await self._reset(session)
+        self._leased[profile] -= 1
+        if reuse:
+            self._idle[profile].append(session)
+            return
+
+        if not reusable:
+            stats.discarded += 1
+        elif session.uses >= self.max_uses:
+            stats.recycled += 1
+        await self._close(session)
+        self._schedule_refill(profile)
+
+    async def query(
+        self, prompt: str, options: ClaudeAgentOptions, pooled: bool = True
+    ) -> AsyncIterator[Any]:
+        """
+        执行一次查询，用法与 claude_agent_sdk.query() 相同
+
+        Args:
+            prompt: 用户 Prompt
+            options: Agent 配置
+            pooled: 是否使用会话池（配置随任务变化的 Agent 应传 False）
+        """
+        if not (self.enabled and pooled):
+            async for message in sdk_query(prompt=prompt, options=options):
+                yield message
+            return
+
+        session = await self.acquire(options)
+        completed = False
+        try:
+            await session.client.query(prompt)
+            async for message in session.client.receive_response():
+                yield message
+            completed = True
+        finally:
+            await asyncio.shield(self.release(session, reusable=completed))
+
+    def stats(self) -> list[dict]:
+        """返回各配置的会话统计"""
+        result = []
+        for profile, stats in self._stats.items():
+            options = self._options[profile]
+            result.append({
+                "model": options.model,
+                "agents": sorted(options.agents or {}),
+                "mcp_servers": sorted(options.mcp_servers or {}),
+                "idle": len(self._idle[profile]),
+                "leased_now": self._leased[profile],
+                "created": stats.created,
+                "leased": stats.leased,
+                "reused": stats.reused,
+                "recycled": stats.recycled,
+                "discarded": stats.discarded,
+                "avg_connect_ms": round(stats.total_connect_ms / stats.created, 1) if stats.created else None,
+            })
+        return result
+
+    async def stop(self) -> None:
+        """停止预启动任务并关闭所有空闲会话"""
+        for task in self._refills.values():
+            task.cancel()
+        await asyncio.gather(*self._refills.values(), return_exceptions=True)
+        self._refills.clear()
+        sessions = [s for idle in self._idle.values() for s in idle]
+        await asyncio.gather(*(self._close(s) for s in sessions))
+        for idle in self._idle.values():
+            idle.clear()
+
+
+# 全局会话池
+session_pool = SessionPool(
+    enabled=SESSION_POOL_CONFIG.get("enabled", True),
+    size=SESSION_POOL_CONFIG.get("size", 1),
+    max_uses=SESSION_POOL_CONFIG.get("max_uses", 20),
+    reset_timeout=SESSION_POOL_CONFIG.get("reset_timeout", 30),
+)
@@ -0,0 +1,342 @@
+"""本地网页抓取与正文提取（静态页面无需调用 Firecrawl）"""
+import asyncio
+import codecs
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+import httpx
+
+from app.services.http_client import get_http_client
+
+# 不含正文的元素（连同子元素一起跳过）
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "header", "footer", "aside", "form", "button", "select", "dialog",
+}
+# 正文块元素：结束时输出一段文本
+BLOCK_TAGS = {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "pre", "blockquote",
+    "td", "th", "dt", "dd", "figcaption", "div", "section", "article", "main", "tr",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# class / id 命中时视为导航、评论、广告等非正文区域
+_BOILERPLATE_ATTR_PATTERN = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|footer|sidebar|side-bar|comments?|cookie|consent|banner|"
+    r"share|social|related|advert|ads|promo|subscribe|newsletter|breadcrumbs?|popup|modal)($|[\s_-])",
+    re.IGNORECASE,
+)
+# 客户端渲染的空壳页面特征（挂载点 + 提示开启 JavaScript）
+_JS_SHELL_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>|'
+    r"enable javascript|requires javascript|javascript is (required|disabled)",
+    re.IGNORECASE,
+)
+# <meta charset="..."> 或 <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET_PATTERN = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+# 浏览器按超集解码的编码（GB2312 / GBK 页面常混有超出声明范围的字符）
+_ENCODING_SUPERSETS = {"gb2312": "gb18030", "gbk": "gb18030", "ascii": "cp1252", "iso8859-1": "cp1252"}
+
+
+class ExtractionError(Exception):
+    """本地提取失败（需要回退到 Firecrawl）"""
+    pass
+
+
+class UnexpectedContentTypeError(ExtractionError):
+    """响应不是 HTML（如 PDF），content_type 为响应的 Content-Type"""
+
+    def __init__(self, content_type: str):
+        super().__init__(f"非 HTML 内容: {content_type or '未知类型'}")
+        self.content_type = content_type
+
+
+@dataclass
+class _Block:
+    tag: str
+    text: list[str] = field(default_factory=list)
+    link_chars: int = 0
+    in_main: bool = False
+
+
+@dataclass
+class ExtractedPage:
+    """提取结果"""
+    url: str  # 跟随重定向后的最终 URL
+    title: str
+    site_name: str
+    text: str  # Markdown 风格的正文（标题以 # 开头，列表项以 - 开头）
+    html_bytes: int
+
+    def to_prompt(self, max_chars: int) -> str:
+        """生成写入 prompt 的网页内容"""
+        text = self.text if len(self.text) <= max_chars else self.text[:max_chars] + "\n…（正文过长，已截断）"
+        header = [f"URL: {self.url}", f"标题: {self.title}"]
+        if self.site_name:
+            header.append(f"网站: {self.site_name}")
+        return "\n".join(header) + "\n\n" + text
+
+
+class _ArticleParser(HTMLParser):
+    """
+    按块收集可见文本
+
+    跳过脚本、导航、页脚以及 class/id 像导航、评论、广告的区域；
+    记录每个块内链接文字的长度（用于按链接密度过滤菜单），以及是否位于 <article>/<main> 中。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.meta: dict[str, str] = {}
+        self.blocks: list[_Block] = []
+        self._stack: list[tuple[str, bool]] = []  # (tag, 是否跳过)
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._link_depth = 0
+        self._in_title = False
+        self._current = _Block("p")
+
+    def _flush(self, tag: str) -> None:
+        if self._current.text:
+            self._current.tag = tag
+            self.blocks.append(self._current)
+        self._current = _Block("p")
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name")
+            if key and attrs.get("content"):
+                self.meta[key.lower()] = attrs["content"].strip()
+            return
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._current.text.append("\n")
+            return
+        if tag == "title":
+            self._in_title = True
+
+        marker = f"{attrs.get('class') or ''} {attrs.get('id') or ''} {attrs.get('role') or ''}"
+        skip = tag in SKIP_TAGS or bool(_BOILERPLATE_ATTR_PATTERN.search(marker)) or "hidden" in attrs
+        self._stack.append((tag, skip))
+        if skip:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in ("article", "main"):
+            self._main_depth += 1
+        if tag == "a":
+            self._link_depth += 1
+        if tag in BLOCK_TAGS:
+            self._flush(self._current.tag)
+            self._current.tag = tag
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        # 容错：关闭到最近的同名标签（忽略未闭合的 <p>、<li> 等）
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            open_tag, skip = self._stack.pop()
+            if skip:
+                self._skip_depth -= 1
+                continue
+            if self._skip_depth:
+                continue
+            if open_tag == "a":
+                self._link_depth = max(0, self._link_depth - 1)
+            if open_tag in BLOCK_TAGS:
+                self._flush(open_tag)
+            if open_tag in ("article", "main"):
+                self._main_depth = max(0, self._main_depth - 1)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        if self._main_depth and data.strip():
+            self._current.in_main = True
+        self._current.text.append(data)
+        if self._link_depth:
+            self._current.link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush(self._current.tag)
+
+
+def _format_block(block: _Block) -> str:
+    text = re.sub(r"[ \t\r\f\v]+", " ", "".join(block.text))
+    text = "\n".join(line.strip() for line in text.split("\n") if line.strip())
+    if not text:
+        return ""
+    if block.tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+        return "#" * int(block.tag[1]) + " " + " ".join(text.split())
+    if block.tag == "li":
+        return "- " + text
+    if block.tag == "blockquote":
+        return "> " + text
+    return text
+
+
+def extract_article(html: str, url: str = "") -> ExtractedPage:
+    """
+    从 HTML 中提取标题和正文（Readability 风格的启发式）
+
+    1. 跳过脚本、导航、页脚、侧栏、评论、广告等区域
+    2. 页面有 <article>/<main> 且其中正文足够长时只取其中的内容
+    3. 丢弃链接文字占比过半的块（菜单、标签云）和重复块
+
+    Args:
+        html: 页面 HTML
+        url: 页面 URL
+
+    Returns:
+        ExtractedPage
+    """
+    parser = _ArticleParser()
+    parser.feed(html)
+    parser.close()
+
+    blocks = parser.blocks
+    main_blocks = [b for b in blocks if b.in_main]
+    if sum(len("".join(b.text).strip()) for b in main_blocks) >= 500:
+        blocks = main_blocks
+
+    lines = []
+    seen = set()
+    for block in blocks:
+        text = _format_block(block)
+        plain = text.lstrip("#->").strip()
+        if not plain or plain in seen:
+            continue
+        if block.link_chars > 0.5 * len(plain) and block.tag not in ("pre",):
+            continue
+        seen.add(plain)
+        lines.append(text)
+
+    meta = parser.meta
+    title = meta.get("og:title") or " ".join(parser.title.split())
+    return ExtractedPage(
+        url=url,
+        title=title,
+        site_name=meta.get("og:site_name", ""),
+        text="\n\n".join(lines),
+        html_bytes=len(html.encode("utf-8", errors="ignore")),
+    )
+
+
+def looks_like_js_shell(html: str, page: ExtractedPage, min_text_chars: int) -> bool:
+    """
+    判断是否为需要执行 JavaScript 才能渲染内容的空壳页面
+
+    正文过短且 HTML 中有前端框架挂载点、"请开启 JavaScript" 提示，或脚本占据绝大部分体积。
+    """
+    if len(page.text) >= min_text_chars:
+        return False
+    if _JS_SHELL_PATTERN.search(html):
+        return True
+    script_bytes = sum(len(m) for m in re.findall(r"<script\b.*?</script>", html, re.IGNORECASE | re.DOTALL))
+    return script_bytes > 0.5 * len(html)
+
+
+def declared_length(headers: httpx.Headers) -> int:
+    """响应头中的 Content-Length，缺失或格式错误时返回 0（以实际读取的字节数为准）"""
+    try:
+        return max(int(headers.get("content-length") or 0), 0)
+    except ValueError:
+        return 0
+
+
+def detect_encoding(body: bytes, header_charset: str | None) -> str:
+    """
+    确定 HTML 的编码
+
+    依次使用 BOM、响应头中的 charset、页面前 2 KB 中的 <meta charset>，都没有时按 UTF-8 解码。
+    """
+    if body.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if body.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    candidates = [header_charset]
+    match = _META_CHARSET_PATTERN.search(body[:2048])
+    if match:
+        candidates.append(match.group(1).decode("ascii", errors="ignore"))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            name = codecs.lookup(candidate.strip()).name
+        except LookupError:
+            continue
+        return _ENCODING_SUPERSETS.get(name, name)
+    return "utf-8"
+
+
+def _parse_page(body: bytes, header_charset: str | None, url: str, min_text_chars: int) -> ExtractedPage:
+    """解码并提取正文（CPU 密集，在线程中执行）"""
+    html = body.decode(detect_encoding(body, header_charset), errors="replace")
+    page = extract_article(html, url)
+    if looks_like_js_shell(html, page, min_text_chars):
+        raise ExtractionError("页面内容由 JavaScript 渲染")
+    if len(page.text) < min_text_chars:
+        raise ExtractionError(f"正文过短（{len(page.text)} 字符）")
+    return page
+
+
+async def fetch_and_extract(
+    url: str,
+    timeout: float = 15,
+    max_bytes: int = 3 * 1024 * 1024,
+    min_text_chars: int = 500,
+) -> ExtractedPage:
+    """
+    用共享 HTTP 客户端抓取页面并提取正文
+
+    Args:
+        url: 页面 URL
+        timeout: 请求超时（秒）
+        max_bytes: HTML 最大字节数，超过时放弃（多为文件下载或超长页面）
+        min_text_chars: 正文最少字符数，更短时视为提取失败
+
+    Returns:
+        ExtractedPage
+
+    Raises:
+        UnexpectedContentTypeError: 非 HTML 内容（只读取了响应头）
+        ExtractionError: 请求失败、页面过大、JavaScript 渲染的空壳页面或正文过短
+    """
+    client = get_http_client()
+    try:
+        async with client.stream(
+            "GET", url, timeout=timeout, headers={"Accept": "text/html,application/xhtml+xml"}
+        ) as response:
+            if response.status_code != 200:
+                raise ExtractionError(f"HTTP {response.status_code}")
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type:
+                raise UnexpectedContentTypeError(content_type)
+            declared = declared_length(response.headers)
+            if declared > max_bytes:
+                raise ExtractionError(f"页面过大: {declared} 字节")
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ExtractionError(f"页面超过 {max_bytes} 字节")
+                chunks.append(chunk)
+            header_charset = response.charset_encoding
+            final_url = str(response.url)
+    except httpx.HTTPError as e:
+        raise ExtractionError(f"请求失败: {e}") from e
+
+    return await asyncio.to_thread(_parse_page, b"".join(chunks), header_charset, final_url, min_text_chars)